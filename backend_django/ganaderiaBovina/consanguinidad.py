@@ -0,0 +1,161 @@
+# --------------------------------- consanguinidad.py: ---------------------------------
+# Funcionalidad: calcula el coeficiente de consanguinidad (Wright) de los animales a partir de su genealogía:
+# madre (Animal) y padre (Toro). Los toros no tienen progenitores registrados (son fundadores).
+# - Se usa el algoritmo de Meuwissen y Luo (1992): para cada animal se recorren solo sus ascendientes, por lo que
+#   el coste es aproximadamente lineal en el tamaño de la genealogía.
+# - calcular_consanguinidad_rebanyo: recalcula todos los animales (comando "calcular_consanguinidad").
+# - actualizar_consanguinidad: recalcula solo los animales indicados (ej: una cría nueva) y, si se indica, sus
+#   descendientes (ej: se cambia la madre o el padre de un animal). Los ascendientes y descendientes se obtienen
+#   con una única consulta recursiva.
+# El resultado se guarda en Animal.coeficiente_consanguinidad (0 = no consanguíneo, 0.25 = hijo de padre e hija).
+# -----------------------------------------------------------------------------------
+import heapq
+
+from django.db import connection
+
+from .models import Animal
+
+DECIMALES = 6
+TAMANYO_BLOQUE = 1000
+
+
+def _ordenar(pedigri):
+    # Orden en el que los progenitores van antes que sus hijos (profundidad en la genealogía).
+    # Si hubiera un ciclo (datos erróneos), el progenitor que lo cierra se trata como desconocido.
+    profundidad, en_curso = {}, set()
+    for clave in pedigri:
+        pila = [clave]
+        while pila:
+            actual = pila[-1]
+            if actual in profundidad:
+                pila.pop()
+                continue
+            en_curso.add(actual)
+            pendientes = [p for p in pedigri[actual] if p in pedigri and p not in profundidad and p not in en_curso]
+            if pendientes:
+                pila.extend(pendientes)
+                continue
+            profundidad[actual] = 1 + max((profundidad[p] for p in pedigri[actual] if p in profundidad), default=-1)
+            en_curso.discard(actual)
+            pila.pop()
+    return sorted(pedigri, key=profundidad.get)
+
+
+def coeficientes_consanguinidad(pedigri):
+    # pedigri: {clave: (padre, madre)} con None si no se conoce. Devuelve {clave: coeficiente}.
+    orden = _ordenar(pedigri)
+    indice = {clave: i for i, clave in enumerate(orden, start=1)}
+    n = len(orden)
+
+    # Se numeran los animales (0 = desconocido) para trabajar con listas.
+    # Un progenitor numerado después del hijo solo puede venir de un ciclo: se trata como desconocido.
+    sire, dam = [0] * (n + 1), [0] * (n + 1)
+    for clave, i in indice.items():
+        padre, madre = (indice.get(progenitor, 0) for progenitor in pedigri[clave])
+        sire[i] = padre if padre < i else 0
+        dam[i] = madre if madre < i else 0
+
+    f = [0.0] * (n + 1)
+    f[0] = -1.0
+    d = [0.0] * (n + 1)  # Varianza mendeliana de cada animal.
+    l = [0.0] * (n + 1)  # Contribución de cada ascendiente al animal que se calcula.
+    for i in range(1, n + 1):
+        s_i, d_i = sire[i], dam[i]
+        d[i] = 0.5 - 0.25 * (f[s_i] + f[d_i])
+        if not s_i or not d_i:
+            continue
+        # Hermanos completos consecutivos: mismo coeficiente.
+        if s_i == sire[i - 1] and d_i == dam[i - 1]:
+            f[i] = f[i - 1]
+            continue
+
+        # Se recorren los ascendientes del animal del más reciente al más antiguo.
+        l[i] = 1.0
+        diagonal = 0.0
+        pendientes, vistos = [-i], {i}
+        while pendientes:
+            j = -heapq.heappop(pendientes)
+            for progenitor in (sire[j], dam[j]):
+                if progenitor:
+                    l[progenitor] += 0.5 * l[j]
+                    if progenitor not in vistos:
+                        vistos.add(progenitor)
+                        heapq.heappush(pendientes, -progenitor)
+            diagonal += l[j] * l[j] * d[j]
+            l[j] = 0.0
+        f[i] = diagonal - 1.0
+
+    return {clave: round(max(f[i], 0.0), DECIMALES) for clave, i in indice.items()}
+
+
+def _pedigri(filas):
+    # filas: (id, madre_id, padre_id) de los animales. Los toros se añaden como fundadores.
+    pedigri = {}
+    for id_animal, madre_id, padre_id in filas:
+        padre = ('toro', padre_id) if padre_id else None
+        madre = ('animal', madre_id) if madre_id else None
+        pedigri[('animal', id_animal)] = (padre, madre)
+        if padre:
+            pedigri.setdefault(padre, (None, None))
+    return pedigri
+
+
+def _guardar(coeficientes, ids, actuales=None):
+    animales = [Animal(id=id_animal, coeficiente_consanguinidad=coeficientes[('animal', id_animal)])
+                for id_animal in ids
+                if actuales is None or actuales[id_animal] != coeficientes[('animal', id_animal)]]
+    Animal.objects.bulk_update(animales, ['coeficiente_consanguinidad'], batch_size=TAMANYO_BLOQUE)
+    return len(animales)
+
+
+def calcular_consanguinidad_rebanyo():
+    # Se recalculan todos los animales con una consulta y solo se guardan los coeficientes que cambian.
+    filas = list(Animal.objects.values_list('id', 'madre_id', 'padre_id', 'coeficiente_consanguinidad'))
+    coeficientes = coeficientes_consanguinidad(_pedigri(fila[:3] for fila in filas))
+    return _guardar(coeficientes, [fila[0] for fila in filas], {fila[0]: fila[3] for fila in filas})
+
+
+def actualizar_consanguinidad(ids, descendientes=False):
+    # Se recalculan los animales indicados (y sus descendientes) a partir de sus ascendientes.
+    # Devuelve {id: coeficiente} de los animales recalculados.
+    ids = list(ids)
+    if not ids:
+        return {}
+    tabla = connection.ops.quote_name(Animal._meta.db_table)
+    semilla = f"SELECT id FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(ids))})"
+    consulta_descendientes = f"""
+        , descendientes (id) AS (
+            {semilla}
+            UNION
+            SELECT a.id FROM descendientes x JOIN {tabla} a ON a.madre_id = x.id
+        )""" if descendientes else ""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH RECURSIVE ascendientes (id) AS (
+                {semilla}
+                UNION
+                SELECT a.madre_id FROM ascendientes x JOIN {tabla} a ON a.id = x.id WHERE a.madre_id IS NOT NULL
+            ){consulta_descendientes}
+            SELECT a.id, a.madre_id, a.padre_id FROM {tabla} a
+            WHERE a.id IN (SELECT id FROM ascendientes{' UNION SELECT id FROM descendientes' if descendientes else ''})
+        """, ids * (2 if descendientes else 1))
+        filas = cursor.fetchall()
+
+    coeficientes = coeficientes_consanguinidad(_pedigri(filas))
+    if descendientes:
+        # Los descendientes son los animales cuya línea materna pasa por alguno de los indicados.
+        madres = {fila[0]: fila[1] for fila in filas}
+        recalcular = set(ids)
+        for id_animal in madres:
+            linea, actual = [], id_animal
+            while actual is not None and actual not in recalcular and actual not in linea:
+                linea.append(actual)
+                actual = madres.get(actual)
+            if actual in recalcular:
+                recalcular.update(linea)
+    else:
+        recalcular = set(ids)
+    recalcular &= {fila[0] for fila in filas}
+
+    _guardar(coeficientes, recalcular)
+    return {id_animal: coeficientes[('animal', id_animal)] for id_animal in recalcular}
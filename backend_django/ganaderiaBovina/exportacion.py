@@ -0,0 +1,88 @@
+# --------------------------------- exportacion.py: ---------------------------------
+# Funcionalidad: permite descargar los listados en CSV o NDJSON (un objeto JSON por línea):
+# GET /.../?format=csv o GET /.../?format=ndjson (se pueden usar los mismos filtros que en el listado).
+# - Los elementos se obtienen de la base de datos por bloques (.iterator) y se envían a medida que se
+#   serializan (StreamingHttpResponse): la memoria no depende del tamaño del listado y la descarga empieza
+#   inmediatamente.
+# -----------------------------------------------------------------------------------
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+TAMANYO_BLOQUE = 2000
+
+
+# Los valores que no son texto ni números (ej: listas) se escriben en JSON dentro de la celda.
+def _celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, cls=JSONEncoder, ensure_ascii=False)
+    return valor
+
+
+# Permite usar csv.writer para obtener cada línea como texto (en lugar de escribirla en un archivo).
+class _Eco:
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(campos, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(campos)
+    for fila in filas:
+        yield escritor.writerow([_celda(fila.get(campo)) for campo in campos])
+
+
+def lineas_ndjson(filas):
+    for fila in filas:
+        yield json.dumps(fila, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+
+# Los renderers se usan para aceptar "?format=csv" y "?format=ndjson" y para las respuestas que no son
+# listados (ej: errores), que se escriben como una fila.
+class RenderizadorCSV(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        filas = data if isinstance(data, list) else [data]
+        filas = [fila if isinstance(fila, dict) else {'valor': fila} for fila in filas]
+        campos = list(dict.fromkeys(campo for fila in filas for campo in fila))
+        return ''.join(lineas_csv(campos, filas)).encode(self.charset)
+
+
+class RenderizadorNDJSON(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(lineas_ndjson(data if isinstance(data, list) else [data])).encode(self.charset)
+
+
+class ExportarMixin:
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, RenderizadorCSV, RenderizadorNDJSON]
+
+    def list(self, request, *args, **kwargs):
+        formato = getattr(request.accepted_renderer, 'format', None)
+        if formato not in ('csv', 'ndjson'):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        filas = (serializer.to_representation(objeto) for objeto in queryset.iterator(chunk_size=TAMANYO_BLOQUE))
+        if formato == 'csv':
+            contenido = lineas_csv([nombre for nombre, campo in serializer.fields.items() if not campo.write_only], filas)
+        else:
+            contenido = lineas_ndjson(filas)
+
+        respuesta = StreamingHttpResponse(contenido,
+                                          content_type=f"{request.accepted_renderer.media_type}; charset=utf-8")
+        respuesta['Content-Disposition'] = f'attachment; filename="{self.basename}.{formato}"'
+        return respuesta
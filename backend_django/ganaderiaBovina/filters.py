@@ -14,8 +14,32 @@
 import django_filters
 from .models import Animal, Toro, InventarioVT, VTAnimales, ListaInseminaciones, Corral
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
 from django.db.models import Count
 
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Filtro para campos con opciones (choices)
+# --------------------------------------------------------------------------------------------------------------
+# Los campos con opciones (ej: estado, tipo) se filtran por igualdad si el valor es una de las opciones
+# (sin tener en cuenta mayúsculas y minúsculas): la consulta usa el índice del campo y "activa" no devuelve
+# también "Inactiva". Si no es una opción (ej: un trozo del valor), se sigue buscando con icontains.
+# Los campos de texto libre (nombre, responsable) usan icontains con un índice trigram en PostgreSQL
+# (migración 0028_indices_trigram).
+class FiltroOpcion(django_filters.CharFilter):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('lookup_expr', 'icontains')
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        opciones = {opcion.lower(): opcion for opcion, _ in qs.model._meta.get_field(self.field_name).choices or []}
+        opcion = opciones.get(value.strip().lower())
+        if opcion is None:
+            return super().filter(qs, value)
+        return self.get_method(qs)(**{self.field_name: opcion})
+
 # --------------------------------------------------------------------------------------------------------------
 #                                       Filtrado para ANIMAL
 # --------------------------------------------------------------------------------------------------------------
@@ -33,8 +57,8 @@ from django.db.models import Count
 
 class AnimalFilter(django_filters.FilterSet):
     nombre = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
-    tipo = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
-    estado = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
+    tipo = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
+    estado = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
 
     class Meta:
         model = Animal
@@ -67,7 +91,7 @@ class AnimalFilter(django_filters.FilterSet):
 # DELETE /toros/{id}
 
 class ToroFilter(django_filters.FilterSet):
-    estado = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
+    estado = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
     nombre = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
 
     class Meta:
@@ -110,10 +134,17 @@ class CorralFilter(django_filters.FilterSet):
         # Los campos calculados NO se ponen el fields, deben ir abajo.
 
     def filter_min_animales(self, queryset, name, value):
-        return queryset.annotate(num_animales=Count("animales")).filter(num_animales__gte=value)
+        return self.anotar_num_animales(queryset).filter(num_animales__gte=value)
 
     def filter_max_animales(self, queryset, name, value):
-        return queryset.annotate(num_animales=Count("animales")).filter(num_animales__lte=value)
+        return self.anotar_num_animales(queryset).filter(num_animales__lte=value)
+
+    # El número de animales puede estar ya calculado (CorralViewSet.get_queryset).
+    @staticmethod
+    def anotar_num_animales(queryset):
+        if "num_animales" in queryset.query.annotations:
+            return queryset
+        return queryset.annotate(num_animales=Count("animales"))
 
 
 # --------------------------------------------------------------------------------------------------------------
@@ -133,8 +164,8 @@ class CorralFilter(django_filters.FilterSet):
 
 class InventarioVTFilter(django_filters.FilterSet):
     nombre = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
-    tipo = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
-    estado = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
+    tipo = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
+    estado = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
 
     class Meta:
         model = InventarioVT
@@ -157,8 +188,8 @@ class InventarioVTFilter(django_filters.FilterSet):
 # DELETE /vtanimales/{id}
 
 class VTAnimalesFilter(django_filters.FilterSet):
-    tipo = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
-    ruta = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
+    tipo = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
+    ruta = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
     responsable = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
 
     class Meta:
@@ -184,7 +215,7 @@ class VTAnimalesFilter(django_filters.FilterSet):
 # DELETE /listainseminaciones/{id}
 
 class ListaInseminacionesFilter(django_filters.FilterSet):
-    razon = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
+    razon = FiltroOpcion() # Se ignoran las mayúsculas y las minúsculas.
     responsable = django_filters.CharFilter(lookup_expr='icontains') # Se ignoran las mayúsculas y las minúsculas.
 
     class Meta:
@@ -0,0 +1,84 @@
+# --------------------------------- genealogia.py: ---------------------------------
+# Funcionalidad: obtiene el árbol genealógico de un animal con una única consulta recursiva (WITH RECURSIVE)
+# sobre Animal.madre (con índice), junto a los toros (Animal.padre) de cada animal.
+# - arbol_ascendentes: el animal, sus madres, abuelas... y sus padres (toros) hasta N generaciones.
+# - arbol_descendientes: el animal, sus hijos, nietos... (y el toro padre de cada uno) hasta N generaciones.
+# Se devuelve una estructura compacta de nodos y aristas:
+#   {"raiz": "animal-1",
+#    "nodos": [{"clave": "animal-1", "modelo": "animal", "id": 1, "codigo": ..., "generacion": 0, ...}, ...],
+#    "aristas": [{"desde": "animal-2", "hasta": "animal-1", "relacion": "madre"}, ...]}
+# "generacion" es la distancia al animal (positiva en los ascendientes y negativa en los descendientes).
+# -----------------------------------------------------------------------------------
+from django.db import connection
+
+from .models import Animal, Toro
+
+MAX_GENERACIONES = 20
+
+
+def _consulta(recursion):
+    animal = connection.ops.quote_name(Animal._meta.db_table)
+    toro = connection.ops.quote_name(Toro._meta.db_table)
+    return f"""
+        WITH RECURSIVE arbol (id, generacion) AS (
+            SELECT id, 0 FROM {animal} WHERE id = %s
+            UNION ALL
+            {recursion.format(animal=animal)}
+        )
+        SELECT a.id, a.codigo, a.nombre, a.tipo, a.estado, a.madre_id, arbol.generacion,
+               t.id, t.codigo, t.nombre, t.estado
+        FROM arbol
+        JOIN {animal} a ON a.id = arbol.id
+        LEFT JOIN {toro} t ON t.id = a.padre_id
+        ORDER BY arbol.generacion, a.id
+    """
+
+
+# Madre de cada animal del árbol (se para al llegar al número de generaciones).
+CONSULTA_ASCENDENTES = _consulta("""
+            SELECT a.madre_id, arbol.generacion + 1
+            FROM arbol JOIN {animal} a ON a.id = arbol.id
+            WHERE a.madre_id IS NOT NULL AND arbol.generacion < %s
+""")
+
+# Hijos de cada animal del árbol (se para al llegar al número de generaciones).
+CONSULTA_DESCENDIENTES = _consulta("""
+            SELECT a.id, arbol.generacion + 1
+            FROM arbol JOIN {animal} a ON a.madre_id = arbol.id
+            WHERE arbol.generacion < %s
+""")
+
+
+def _grafo(id_animal, generaciones, consulta, sentido):
+    with connection.cursor() as cursor:
+        cursor.execute(consulta, [id_animal, generaciones])
+        filas = cursor.fetchall()
+
+    nodos, aristas = {}, []
+    ids_animales = {fila[0] for fila in filas}
+    for (id_a, codigo, nombre, tipo, estado, madre_id, generacion,
+         id_t, codigo_t, nombre_t, estado_t) in filas:
+        clave = f"animal-{id_a}"
+        nodos[clave] = {"clave": clave, "modelo": "animal", "id": id_a, "codigo": codigo, "nombre": nombre,
+                        "tipo": tipo, "estado": estado, "generacion": generacion * sentido}
+
+        # El toro está una generación por encima del animal. En los ascendientes se muestra hasta el límite
+        # indicado y en los descendientes es el otro progenitor de cada cría (no el del animal).
+        if id_t is not None and (generacion < generaciones if sentido > 0 else generacion > 0):
+            clave_toro = f"toro-{id_t}"
+            nodos.setdefault(clave_toro, {"clave": clave_toro, "modelo": "toro", "id": id_t, "codigo": codigo_t,
+                                          "nombre": nombre_t, "estado": estado_t,
+                                          "generacion": generacion * sentido + 1})
+            aristas.append({"desde": clave_toro, "hasta": clave, "relacion": "padre"})
+        if madre_id in ids_animales:
+            aristas.append({"desde": f"animal-{madre_id}", "hasta": clave, "relacion": "madre"})
+
+    return {"raiz": f"animal-{id_animal}", "nodos": list(nodos.values()), "aristas": aristas}
+
+
+def arbol_ascendentes(id_animal, generaciones):
+    return _grafo(id_animal, generaciones, CONSULTA_ASCENDENTES, 1)
+
+
+def arbol_descendientes(id_animal, generaciones):
+    return _grafo(id_animal, generaciones, CONSULTA_DESCENDIENTES, -1)
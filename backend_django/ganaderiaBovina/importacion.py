@@ -0,0 +1,258 @@
+# --------------------------------- importacion.py: ---------------------------------
+# Funcionalidad: importa un archivo .csv con animales, toros, vacunas/tratamientos suministrados o inseminaciones
+# directamente en PostgreSQL (para ganaderías con muchos datos). Solo funciona con PostgreSQL.
+# 1º Las filas se copian con COPY a una tabla temporal (todas las columnas como texto). El archivo se lee
+#    por bloques, por lo que la memoria no depende del número de filas.
+# 2º Se validan todas las filas a la vez con SQL: campos obligatorios, formato, opciones (choices), rangos de los
+#    validadores del modelo, códigos repetidos y relaciones (FK) indicadas por su código (ej: corral = "CORRAL-1").
+# 3º Si no hay errores, se insertan en la tabla del modelo con un único INSERT ... SELECT. Los elementos cuyo
+#    código ya existe no se modifican (se pueden repetir importaciones).
+# Todo se hace en una transacción: si hay algún error no se importa ninguna fila.
+# Observación: son datos históricos, por lo que no se descuenta el inventario (unidades o cantidad de semen).
+# -----------------------------------------------------------------------------------
+import csv
+
+from django.core.validators import MinValueValidator, MaxValueValidator, MaxLengthValidator
+from django.db import connection, transaction, DatabaseError
+
+from .models import Animal, Toro, VTAnimales, ListaInseminaciones, registrar_codigo
+
+MODELOS_IMPORTACION = {
+    'animales': Animal,
+    'toros': Toro,
+    'vtanimales': VTAnimales,
+    'listainseminaciones': ListaInseminaciones,
+}
+
+# Formato del código de cada modelo.
+FORMATO_CODIGO = {
+    Animal: r'^(V|C)-[0-9]+$',
+    Toro: r'^T-[0-9]+$',
+    VTAnimales: r'^VTA-[0-9]+$',
+    ListaInseminaciones: r'^I-[0-9]+$',
+}
+
+# Formato (expresión regular) de los valores según el tipo de campo.
+FORMATO_TIPO = {
+    'IntegerField': r'^-?[0-9]+(\.0+)?$',
+    'FloatField': r'^-?[0-9]+(\.[0-9]+)?$',
+    'DecimalField': r'^-?[0-9]+(\.[0-9]+)?$',
+    'DateField': r'^[0-9]{4}-[0-9]{2}-[0-9]{2}$',
+    'TimeField': r'^[0-9]{2}:[0-9]{2}(:[0-9]{2})?$',
+    'BooleanField': r'^(true|false|t|f|1|0|yes|no|si|sí)$',
+}
+
+DELIMITADORES = {',': "','", ';': "';'", '\t': "E'\\t'"}
+MAX_ERRORES = 100
+TABLA_TEMPORAL = 'importacion_datos'
+TAMANYO_BLOQUE = 1024 * 1024
+
+
+class ErrorImportacion(Exception):
+    def __init__(self, mensaje, errores=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+
+
+def importar_csv(nombre_modelo, fichero, delimitador=','):
+    # fichero: archivo de texto abierto (la primera línea son los nombres de los campos).
+    # Devuelve {"filas": ..., "insertados": ..., "omitidos": ...}.
+    if connection.vendor != 'postgresql':
+        raise ErrorImportacion("La importación de datos solo está disponible con PostgreSQL.")
+    modelo = MODELOS_IMPORTACION.get(nombre_modelo)
+    if modelo is None:
+        raise ErrorImportacion(f"Modelo no válido. Opciones: {', '.join(MODELOS_IMPORTACION)}.")
+    if delimitador not in DELIMITADORES:
+        raise ErrorImportacion("El delimitador debe ser ',', ';' o un tabulador.")
+
+    campos = {campo.name: campo for campo in modelo._meta.concrete_fields if not campo.primary_key}
+    # Los campos no editables (ej: coeficiente_consanguinidad) se calculan y no se pueden importar.
+    columnas = _leer_cabecera(fichero, delimitador, {nombre: campo for nombre, campo in campos.items() if campo.editable})
+    presentes = [campos[columna] for columna in columnas]
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # La tabla temporal puede existir si la importación anterior se hizo en la misma transacción.
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA_TEMPORAL}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {TABLA_TEMPORAL} (fila bigserial, existe boolean NOT NULL DEFAULT false, "
+                + ", ".join(f"{_q(columna)} text" for columna in columnas) + ") ON COMMIT DROP"
+            )
+            _copiar(cursor, f"COPY {TABLA_TEMPORAL} ({', '.join(_q(c) for c in columnas)}) FROM STDIN "
+                            f"WITH (FORMAT csv, DELIMITER {DELIMITADORES[delimitador]})", fichero)
+            cursor.execute(f"SELECT count(*) FROM {TABLA_TEMPORAL}")
+            filas = cursor.fetchone()[0]
+
+            errores = _validar(cursor, modelo, presentes)
+            if errores:
+                raise ErrorImportacion("No se ha importado ninguna fila. Revise los errores.", errores)
+
+            insertados = _insertar(cursor, modelo, campos, columnas)
+
+            # Se actualizan los contadores de los códigos con el mayor código importado de cada prefijo.
+            cursor.execute(f"SELECT split_part(codigo, '-', 1), max(CAST(split_part(codigo, '-', 2) AS bigint)) "
+                           f"FROM {TABLA_TEMPORAL} GROUP BY 1")
+            for prefijo, numero in cursor.fetchall():
+                registrar_codigo(f"{prefijo}-{numero}")
+    except DatabaseError as e:
+        # Ej: una fecha con el formato correcto pero que no existe (2025-02-30).
+        raise ErrorImportacion("No se ha importado ninguna fila.", [{"fila": None, "campo": None, "error": str(e)}])
+
+    return {"filas": filas, "insertados": insertados, "omitidos": filas - insertados}
+
+
+def _q(nombre):
+    return connection.ops.quote_name(nombre)
+
+
+def _leer_cabecera(fichero, delimitador, campos):
+    linea = fichero.readline().lstrip('\ufeff')
+    columnas = [columna.strip() for columna in next(csv.reader([linea], delimiter=delimitador), [])]
+    desconocidas = [columna for columna in columnas if columna not in campos]
+    if desconocidas:
+        raise ErrorImportacion(f"Columnas no válidas: {', '.join(desconocidas)}. "
+                               f"Columnas disponibles: {', '.join(campos)}.")
+    if len(set(columnas)) != len(columnas):
+        raise ErrorImportacion("Hay columnas repetidas en la cabecera.")
+    obligatorias = [nombre for nombre, campo in campos.items()
+                    if nombre not in columnas and not campo.null and not campo.has_default()]
+    if 'codigo' not in columnas:
+        obligatorias.insert(0, 'codigo')
+    if obligatorias:
+        raise ErrorImportacion(f"Faltan columnas obligatorias: {', '.join(obligatorias)}.")
+    return columnas
+
+
+# COPY con psycopg2 (copy_expert) o psycopg 3 (copy), leyendo el archivo por bloques.
+def _copiar(cursor, sql, fichero):
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(sql, fichero, size=TAMANYO_BLOQUE)
+        return
+    with cursor.copy(sql) as copia:
+        while bloque := fichero.read(TAMANYO_BLOQUE):
+            copia.write(bloque)
+
+
+def _comprobaciones(modelo, campos):
+    # Lista de (campo, condición SQL que cumplen las filas con errores, parámetros, mensaje).
+    comprobaciones = []
+    for campo in campos:
+        valor = f"NULLIF(s.{_q(campo.name)}, '')"
+        tipo = campo.get_internal_type()
+        formato = FORMATO_TIPO.get(tipo)
+
+        if not campo.null and not campo.has_default():
+            comprobaciones.append((campo.name, f"{valor} IS NULL", [], "Campo obligatorio."))
+
+        if campo.is_relation:
+            tabla = _q(campo.related_model._meta.db_table)
+            condicion = f"{valor} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {tabla} r WHERE r.codigo = {valor})"
+            if campo.related_model is modelo:
+                # Ej: la madre puede estar en el mismo archivo.
+                condicion += f" AND NOT EXISTS (SELECT 1 FROM {TABLA_TEMPORAL} s2 WHERE s2.codigo = {valor})"
+            comprobaciones.append((campo.name, condicion, [], "No existe ningún elemento con ese código."))
+            continue
+
+        if formato:
+            comprobaciones.append((campo.name, f"{valor} !~* %s", [formato], "Formato no válido."))
+        if campo.choices:
+            opciones = [opcion for opcion, _ in campo.choices]
+            comprobaciones.append((campo.name, f"{valor} NOT IN ({', '.join(['%s'] * len(opciones))})", opciones,
+                                   f"Valor no válido. Opciones: {', '.join(opciones)}."))
+        if campo.unique:
+            comprobaciones.append((campo.name, f"{valor} IN (SELECT {_q(campo.name)} FROM {TABLA_TEMPORAL} "
+                                               f"GROUP BY 1 HAVING count(*) > 1)", [], "Valor repetido en el archivo."))
+        if campo.unique and campo.name != 'codigo':
+            # El valor ya lo tiene otro elemento (las filas cuyo código ya existe no se importan).
+            tabla = _q(modelo._meta.db_table)
+            columna = f"t.{_q(campo.column)}" if tipo in ('CharField', 'TextField') else f"CAST(t.{_q(campo.column)} AS text)"
+            comprobaciones.append((campo.name, f"{valor} IS NOT NULL "
+                                               f"AND NOT EXISTS (SELECT 1 FROM {tabla} t WHERE t.codigo = s.codigo) "
+                                               f"AND EXISTS (SELECT 1 FROM {tabla} t WHERE {columna} = {valor})", [],
+                                   "Ya existe otro elemento con este valor."))
+
+        # Rangos de los validadores del modelo (solo si el formato es correcto).
+        numero = f"CAST({valor} AS numeric)"
+        for validador in campo.validators:
+            if isinstance(validador, MinValueValidator) and formato:
+                comprobaciones.append((campo.name, f"{valor} ~* %s AND {numero} < %s", [formato, validador.limit_value],
+                                       f"Debe ser mayor o igual que {validador.limit_value}."))
+            elif isinstance(validador, MaxValueValidator) and formato:
+                comprobaciones.append((campo.name, f"{valor} ~* %s AND {numero} > %s", [formato, validador.limit_value],
+                                       f"Debe ser menor o igual que {validador.limit_value}."))
+            elif isinstance(validador, MaxLengthValidator):
+                comprobaciones.append((campo.name, f"length({valor}) > %s", [validador.limit_value],
+                                       f"Como máximo {validador.limit_value} caracteres."))
+        if tipo == 'DecimalField':
+            limite = 10 ** (campo.max_digits - campo.decimal_places)
+            comprobaciones.append((campo.name, f"{valor} ~* %s AND abs({numero}) >= %s", [formato, limite],
+                                   f"Debe ser menor que {limite} (en valor absoluto)."))
+
+    comprobaciones.append(('codigo', "coalesce(s.codigo, '') !~ %s", [FORMATO_CODIGO[modelo]], "Formato de código no válido."))
+    if modelo is Animal and any(campo.name == 'tipo' for campo in campos):
+        comprobaciones.append(('codigo', "split_part(s.codigo, '-', 1) <> "
+                                         "(CASE WHEN s.tipo = 'Ternero' THEN 'C' ELSE 'V' END)", [],
+                               "El código de una vaca empieza por V- y el de un ternero por C-."))
+    return comprobaciones
+
+
+def _validar(cursor, modelo, campos):
+    errores = []
+    for campo, condicion, parametros, mensaje in _comprobaciones(modelo, campos):
+        cursor.execute(f"SELECT s.fila FROM {TABLA_TEMPORAL} s WHERE {condicion} ORDER BY s.fila LIMIT %s",
+                       [*parametros, MAX_ERRORES - len(errores)])
+        # La fila 1 del archivo es la cabecera.
+        errores += [{"fila": fila + 1, "campo": campo, "error": mensaje} for (fila,) in cursor.fetchall()]
+        if len(errores) >= MAX_ERRORES:
+            break
+    return sorted(errores, key=lambda error: error["fila"])
+
+
+def _insertar(cursor, modelo, campos, columnas):
+    tabla = _q(modelo._meta.db_table)
+    cursor.execute(f"UPDATE {TABLA_TEMPORAL} s SET existe = true FROM {tabla} t WHERE t.codigo = s.codigo")
+
+    destino, valores, uniones, parametros, autorreferencias = [], [], [], [], []
+    for nombre, campo in campos.items():
+        valor = f"NULLIF(s.{_q(nombre)}, '')"
+        if nombre not in columnas:
+            if not campo.has_default():
+                continue
+            expresion, parametros_campo = "%s", [campo.get_db_prep_save(campo.get_default(), connection)]
+        elif campo.is_relation and campo.related_model is modelo:
+            # Se asigna después de insertar (ej: la madre puede estar en el mismo archivo).
+            autorreferencias.append(campo)
+            continue
+        elif campo.is_relation:
+            alias = f"fk_{len(uniones)}"
+            uniones.append(f"LEFT JOIN {_q(campo.related_model._meta.db_table)} {alias} ON {alias}.codigo = {valor}")
+            expresion, parametros_campo = f"{alias}.id", []
+        else:
+            tipo_bd = campo.db_type(connection)
+            if campo.get_internal_type() == 'IntegerField':
+                expresion = f"CAST(CAST({valor} AS numeric) AS {tipo_bd})"
+            elif campo.get_internal_type() == 'BooleanField':
+                expresion = f"CAST(replace(replace(lower({valor}), 'sí', 'yes'), 'si', 'yes') AS boolean)"
+            else:
+                expresion = f"CAST({valor} AS {tipo_bd})"
+            parametros_campo = []
+            if campo.has_default():
+                expresion = f"COALESCE({expresion}, %s)"
+                parametros_campo = [campo.get_db_prep_save(campo.get_default(), connection)]
+        destino.append(_q(campo.column))
+        valores.append(expresion)
+        parametros += parametros_campo
+
+    cursor.execute(
+        f"INSERT INTO {tabla} ({', '.join(destino)}) SELECT {', '.join(valores)} FROM {TABLA_TEMPORAL} s "
+        f"{' '.join(uniones)} WHERE NOT s.existe ON CONFLICT DO NOTHING",
+        parametros
+    )
+    insertados = cursor.rowcount
+
+    for campo in autorreferencias:
+        cursor.execute(
+            f"UPDATE {tabla} t SET {_q(campo.column)} = r.id FROM {TABLA_TEMPORAL} s "
+            f"JOIN {tabla} r ON r.codigo = NULLIF(s.{_q(campo.name)}, '') WHERE t.codigo = s.codigo AND NOT s.existe"
+        )
+    return insertados
@@ -0,0 +1,213 @@
+# --------------------------------- lotes.py: ---------------------------------
+# Funcionalidad: permite crear varios elementos (animales, vacunas/tratamientos suministrados o inseminaciones)
+# en una única petición: POST /.../lote/ con una lista de elementos.
+# - Todos los elementos se validan con el serializer de la vista (many=True) y, además, se hacen las
+#   comprobaciones que afectan a todo el lote con una única consulta (ej: duplicados o vacunas en el último año).
+# - El número de consultas no depende del tamaño del lote: las relaciones (FK) se obtienen con una consulta
+#   (in_bulk) por modelo y los campos únicos (ej: código, nombre) se comprueban con una consulta (__in) por campo.
+# - Los códigos se reservan de una sola vez (reservar_codigos) para cada prefijo.
+# - El inventario (unidades/cantidad de semen) se descuenta con una única actualización para todo el lote.
+# - Se guarda con bulk_create dentro de una transacción: o se crean todos los elementos o no se crea ninguno.
+# Si hay errores, se devuelven indicando la posición (índice) del elemento en la lista.
+# -----------------------------------------------------------------------------------
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction, IntegrityError
+from rest_framework import status, serializers
+from rest_framework.decorators import action
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+from . import stock
+from .models import reservar_codigos, registrar_codigo, separar_codigo
+
+
+# Se lanza dentro de la transacción para deshacer todos los cambios del lote.
+class ErrorLote(Exception):
+    def __init__(self, errores):
+        super().__init__("Errores en el lote.")
+        self.errores = errores
+
+
+# Validación de una lista con el serializer de un elemento. Cada elemento tiene sus datos originales en
+# "initial_data" (ej: AnimalSerializer.validate_codigo usa el tipo indicado).
+class ListaLoteSerializer(serializers.ListSerializer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Campos únicos del elemento: {campo: mensaje}. Se comprueban para todo el lote (CrearEnLoteMixin).
+        self.campos_unicos = {}
+
+    def run_child_validation(self, data):
+        self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._precargar_relaciones(data)
+            self._quitar_validadores_unicos()
+        return super().to_internal_value(data)
+
+    def _precargar_relaciones(self, filas):
+        # Los elementos relacionados (FK) de todo el lote se obtienen con una consulta por campo (in_bulk) y cada
+        # elemento se busca después en memoria, en lugar de hacer una consulta por elemento.
+        for nombre, campo in self.child.fields.items():
+            if campo.read_only or not isinstance(campo, PrimaryKeyRelatedField) or campo.pk_field:
+                continue
+            queryset = campo.get_queryset()
+            pk = queryset.model._meta.pk
+            valores = set()
+            for fila in filas:
+                valor = fila.get(nombre) if isinstance(fila, dict) else None
+                if valor in (None, '') or isinstance(valor, bool):
+                    continue
+                try:
+                    valores.add(pk.to_python(valor))
+                except DjangoValidationError:
+                    pass
+            campo.to_internal_value = self._buscar_relacion(campo, pk, queryset.in_bulk(valores))
+
+    @staticmethod
+    def _buscar_relacion(campo, pk, objetos):
+        # Mismos errores que PrimaryKeyRelatedField.to_internal_value.
+        def buscar(valor):
+            if isinstance(valor, bool):
+                campo.fail('incorrect_type', data_type=type(valor).__name__)
+            try:
+                clave = pk.to_python(valor)
+            except DjangoValidationError:
+                campo.fail('incorrect_type', data_type=type(valor).__name__)
+            if clave not in objetos:
+                campo.fail('does_not_exist', pk_value=valor)
+            return objetos[clave]
+        return buscar
+
+    def _quitar_validadores_unicos(self):
+        # Los UniqueValidator hacen una consulta por elemento: se quitan y se comprueban para todo el lote.
+        for nombre, campo in self.child.fields.items():
+            unicos = [validador for validador in campo.validators if isinstance(validador, UniqueValidator)]
+            if unicos:
+                self.campos_unicos[campo.source] = unicos[0].message
+                campo.validators = [validador for validador in campo.validators if validador not in unicos]
+
+
+class CrearEnLoteMixin:
+    # Prefijo del código de los elementos (ej: "VTA") o función que lo obtiene a partir de los datos validados
+    # de un elemento (ej: "V" o "C" según el tipo del animal). Es obligatorio en las vistas que usan el mixin.
+    prefijo_lote = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.prefijo_lote is None:
+            raise TypeError(f"{cls.__name__} debe indicar el prefijo del código (prefijo_lote).")
+
+    # Inventario que se descuenta al crear cada elemento (None si no se descuenta nada):
+    # (campo FK del elemento, campo con la cantidad disponible, mensaje si no hay suficiente cantidad).
+    stock_lote = None
+
+    # Comprobaciones que afectan a todo el lote. Devuelve {índice: {campo: [errores]}}.
+    def validar_lote(self, filas):
+        return {}
+
+    # Acciones después de guardar los elementos del lote (bulk_create no ejecuta save() ni las señales).
+    def despues_de_crear_lote(self, objetos):
+        pass
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def crear_lote(self, request):
+        if not isinstance(request.data, list) or not request.data:
+            return Response({"ERROR": "Debe enviar una lista con los elementos que se quieren crear."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        contexto = {**self.get_serializer_context(), 'lote': True}
+        serializer = ListaLoteSerializer(child=self.get_serializer_class()(), data=request.data, context=contexto)
+        if not serializer.is_valid():
+            errores = {i: error for i, error in enumerate(serializer.errors) if error}
+        else:
+            errores = self._validar_unicos(serializer.validated_data, serializer.campos_unicos)
+            for i, error in self.validar_lote(serializer.validated_data).items():
+                errores.setdefault(i, {}).update(error)
+
+        if errores:
+            return self._respuesta_errores(errores)
+
+        modelo = self.get_serializer_class().Meta.model
+        try:
+            with transaction.atomic():
+                self._descontar_stock(serializer.validated_data)
+                objetos = [modelo(**datos) for datos in serializer.validated_data]
+                self._asignar_codigos(objetos, serializer.validated_data)
+                modelo.objects.bulk_create(objetos)
+                self.despues_de_crear_lote(objetos)
+        except ErrorLote as e:
+            return self._respuesta_errores(e.errores)
+        except IntegrityError as e:
+            # Ej: otro usuario ha creado a la vez un elemento con el mismo código o nombre.
+            return Response({"ERROR": "No se ha creado ningún elemento.", "MOTIVO DEL ERROR": str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer_class()(objetos, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _respuesta_errores(self, errores):
+        return Response({
+            "ERROR": "No se ha creado ningún elemento. Revise los errores de cada elemento.",
+            "errores": [{"indice": i, "errores": errores[i]} for i in sorted(errores)],
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def _validar_unicos(self, filas, campos_unicos):
+        # Los campos únicos (ej: código y nombre) no se pueden repetir dentro del lote ni existir en la base de datos
+        # (una consulta por campo).
+        modelo = self.get_serializer_class().Meta.model
+        errores = {}
+        for campo, mensaje in campos_unicos.items():
+            valores = {fila[campo] for fila in filas if fila.get(campo)}
+            if not valores:
+                continue
+            existentes = set(modelo.objects.filter(**{f"{campo}__in": valores}).values_list(campo, flat=True))
+            repetidos = Counter(fila.get(campo) for fila in filas if fila.get(campo))
+            for i, fila in enumerate(filas):
+                if fila.get(campo) in existentes:
+                    errores.setdefault(i, {})[campo] = [mensaje]
+                elif fila.get(campo) and repetidos[fila[campo]] > 1:
+                    errores.setdefault(i, {})[campo] = [f"El valor '{fila[campo]}' está repetido en el lote."]
+        return errores
+
+    def _asignar_codigos(self, objetos, filas):
+        # Se reservan de una vez los códigos de los elementos que no lo indican (una consulta por prefijo) y se
+        # actualiza el contador con el mayor código indicado a mano.
+        sin_codigo = defaultdict(list)
+        maximos = {}
+        for objeto, datos in zip(objetos, filas):
+            if not objeto.codigo:
+                prefijo = self.prefijo_lote if isinstance(self.prefijo_lote, str) else self.prefijo_lote(datos)
+                sin_codigo[prefijo].append(objeto)
+            else:
+                partes = separar_codigo(objeto.codigo)
+                if partes and partes[1] > maximos.get(partes[0], (0, ''))[0]:
+                    maximos[partes[0]] = (partes[1], objeto.codigo)
+
+        for _, codigo in maximos.values():
+            registrar_codigo(codigo)
+        for prefijo, pendientes in sin_codigo.items():
+            for objeto, codigo in zip(pendientes, reservar_codigos(prefijo, len(pendientes))):
+                objeto.codigo = codigo
+
+    def _descontar_stock(self, filas):
+        if not self.stock_lote:
+            return
+        campo_fk, campo_cantidad, mensaje = self.stock_lote
+
+        # Cantidad que se usa de cada elemento del inventario en todo el lote.
+        usados = Counter(fila[campo_fk].pk for fila in filas if fila.get(campo_fk))
+        if not usados:
+            return
+        modelo_stock = self.get_serializer_class().Meta.model._meta.get_field(campo_fk).related_model
+
+        # Una única actualización para todos los elementos del inventario usados en el lote.
+        sin_stock = stock.descontar_lote(modelo_stock, campo_cantidad, usados)
+        if sin_stock:
+            raise ErrorLote({
+                i: {campo_fk: [mensaje(fila[campo_fk])]}
+                for i, fila in enumerate(filas) if fila.get(campo_fk) and fila[campo_fk].pk in sin_stock
+            })
@@ -0,0 +1,192 @@
+# --------------------------------- benchmark_indices.py: ---------------------------------
+# Funcionalidad: muestra el plan de ejecución (EXPLAIN) y el tiempo de las consultas más habituales de los
+# filtros (filters.py) sin y con los índices de los modelos (Meta.indexes y los trigram de la migración 0028) sobre
+# un rebaño sintético grande.
+# - Todo se hace dentro de una transacción que se deshace al terminar: los datos sintéticos y los índices
+#   eliminados no se guardan.
+# - IMPORTANTE: mientras se ejecuta, la transacción bloquea las tablas de los animales, toros, vacunas/tratamientos
+#   e inseminaciones (en PostgreSQL, DROP INDEX toma un bloqueo ACCESS EXCLUSIVE hasta el final): cualquier
+#   lectura o escritura de la API sobre esas tablas espera a que termine. Por eso, se debe ejecutar sobre otra base
+#   de datos (--base-datos, un alias de settings.DATABASES, ej: una copia) o indicar --confirmar para usar la
+#   base de datos principal.
+# - Las consultas se miden con y sin índices alternando el orden en cada repetición (la caché afecta a ambas igual).
+# Ej: ./run.sh benchmark_indices --animales 100000 --base-datos benchmark
+# -----------------------------------------------------------------------------------
+import random
+import time
+from datetime import date, time as hora, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from ganaderiaBovina.models import Animal, Toro, Corral, InventarioVT, VTAnimales, ListaInseminaciones
+
+MODELOS_CON_INDICES = [Animal, Toro, VTAnimales, ListaInseminaciones]
+
+
+class Command(BaseCommand):
+
+    # Se añade una breve descripción de lo que hace este comando.
+    help = "Compara el plan de ejecución de las consultas de los filtros sin y con índices (rebaño sintético)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animales', type=int, default=50000, help="Número de animales del rebaño sintético.")
+        parser.add_argument('--repeticiones', type=int, default=4,
+                            help="Veces que se ejecuta cada consulta con y sin índices (alternando el orden).")
+        parser.add_argument('--base-datos', default=DEFAULT_DB_ALIAS,
+                            help="Alias de la base de datos (settings.DATABASES) sobre la que se ejecuta.")
+        parser.add_argument('--confirmar', action='store_true',
+                            help="Permite ejecutarlo sobre la base de datos principal (bloquea sus tablas).")
+
+    def handle(self, *args, **options):
+        self.base_datos = options['base_datos']
+        if self.base_datos not in connections:
+            raise CommandError(f"La base de datos '{self.base_datos}' no está definida en settings.DATABASES.")
+        if self.base_datos == DEFAULT_DB_ALIAS and not options['confirmar']:
+            raise CommandError(
+                "El benchmark bloquea las tablas de los animales, toros, vacunas/tratamientos e inseminaciones "
+                "mientras se ejecuta. Indique otra base de datos (--base-datos) o --confirmar para usar la principal."
+            )
+        self.conexion = connections[self.base_datos]
+
+        with transaction.atomic(using=self.base_datos):
+            referencias = self.crear_rebanyo(options['animales'])
+            consultas = self.consultas(referencias)
+            con_indices, sin_indices = self.medir_alternando(consultas, options['repeticiones'])
+
+            for nombre in consultas:
+                self.stdout.write(f"\n=== {nombre} ===")
+                for titulo, resultados in [("Sin índices", sin_indices), ("Con índices", con_indices)]:
+                    plan, segundos = resultados[nombre]
+                    self.stdout.write(f"--- {titulo}: {segundos * 1000:.2f} ms")
+                    self.stdout.write(plan)
+
+            # Se deshacen los datos sintéticos.
+            transaction.set_rollback(True, using=self.base_datos)
+
+    # Se crea un rebaño sintético con bulk_create (sin códigos, ya que no se guardan).
+    def crear_rebanyo(self, num_animales):
+        aleatorio = random.Random(0)
+        inicio = date(2015, 1, 1)
+        bd = self.base_datos
+
+        corrales = Corral.objects.using(bd).bulk_create([Corral(nombre=f"Benchmark corral {i}") for i in range(20)])
+        toros = Toro.objects.using(bd).bulk_create([
+            Toro(nombre=f"Benchmark toro {i}", estado=aleatorio.choice(['Vivo', 'Vivo', 'Muerte', 'Otros']),
+                 cantidad_semen=aleatorio.randint(0, 50), transmision_leche=Decimal(aleatorio.randint(-50, 90)),
+                 celulas_somaticas=Decimal('0.50'), calidad_patas=Decimal('5.00'), calidad_ubres=Decimal('5.00'),
+                 grasa=0.16, proteinas=0.07)
+            for i in range(max(num_animales // 500, 10))
+        ])
+        inventario = InventarioVT.objects.using(bd).bulk_create([
+            InventarioVT(nombre=f"Benchmark vacuna {i}", tipo=aleatorio.choice(['Vacuna', 'Tratamiento']),
+                         unidades=1000, estado='Activa')
+            for i in range(30)
+        ])
+
+        estados = [estado for estado, _ in Animal.ESTADOS_CHOICES]
+        animales = Animal.objects.using(bd).bulk_create([
+            Animal(nombre=f"Benchmark vaca {i}", tipo=aleatorio.choice(['Vaca', 'Vaca', 'Vaca', 'Ternero']),
+                   estado=aleatorio.choice(estados), fecha_nacimiento=inicio + timedelta(days=aleatorio.randint(0, 3650)),
+                   corral=aleatorio.choice(corrales), celulas_somaticas=aleatorio.randint(50000, 2000000),
+                   produccion_leche=aleatorio.uniform(0, 60), calidad_patas=Decimal('5.00'),
+                   calidad_ubres=Decimal('5.00'), grasa=aleatorio.uniform(2.5, 6), proteinas=aleatorio.uniform(2.8, 4))
+            for i in range(num_animales)
+        ], batch_size=5000)
+
+        # Varios responsables distintos, para que el filtro de texto (icontains) sea selectivo.
+        VTAnimales.objects.using(bd).bulk_create([
+            VTAnimales(id_animal=aleatorio.choice(animales), inventario_vt=aleatorio.choice(inventario),
+                       fecha_inicio=fecha, fecha_finalizacion=fecha, tipo='Vacuna',
+                       responsable=f"Benchmark {aleatorio.randint(0, 999)}")
+            for fecha in (inicio + timedelta(days=aleatorio.randint(0, 3650)) for _ in range(num_animales * 2))
+        ], batch_size=5000)
+        ListaInseminaciones.objects.using(bd).bulk_create([
+            ListaInseminaciones(id_vaca=aleatorio.choice(animales), id_toro=aleatorio.choice(toros),
+                                fecha_inseminacion=inicio + timedelta(days=aleatorio.randint(0, 3650)),
+                                hora_inseminacion=hora(aleatorio.randint(0, 23)), responsable="Benchmark")
+            for _ in range(num_animales * 2)
+        ], batch_size=5000)
+
+        self.analizar()
+        return {'animal': animales[len(animales) // 2], 'vt': inventario[0]}
+
+    # Consultas que generan los filtros y ordenaciones de la API.
+    def consultas(self, referencias):
+        bd = self.base_datos
+        return {
+            "animales/?estado=Vacía&tipo=Vaca":
+                Animal.objects.using(bd).filter(estado='Vacía', tipo='Vaca'),
+            "animales/?fecha_nacimiento__gte=...&fecha_nacimiento__lte=...":
+                Animal.objects.using(bd).filter(fecha_nacimiento__gte=date(2020, 1, 1),
+                                                fecha_nacimiento__lte=date(2020, 1, 31)),
+            "animales/?ordering=-produccion_leche&page_size=50":
+                Animal.objects.using(bd).order_by('-produccion_leche')[:50],
+            "animales/?nombre=... (icontains)":
+                Animal.objects.using(bd).filter(nombre__icontains='vaca 1234'),
+            "toros/?estado=Vivo":
+                Toro.objects.using(bd).filter(estado='Vivo'),
+            "vtanimales: misma vacuna al mismo animal en los últimos 365 días":
+                VTAnimales.objects.using(bd).filter(id_animal=referencias['animal'],
+                                                    inventario_vt=referencias['vt'],
+                                                    fecha_inicio__gte=date(2023, 1, 1)),
+            "vtanimales/?responsable=... (icontains)":
+                VTAnimales.objects.using(bd).filter(responsable__icontains='benchmark 123'),
+            "listainseminaciones/?fecha_inseminacion__gte=...":
+                ListaInseminaciones.objects.using(bd).filter(fecha_inseminacion__gte=date(2024, 12, 1))
+                .order_by('fecha_inseminacion', 'hora_inseminacion')[:50],
+            "listainseminaciones/?id_vaca=...":
+                ListaInseminaciones.objects.using(bd).filter(id_vaca=referencias['animal'])
+                .order_by('fecha_inseminacion'),
+        }
+
+    # Cada repetición mide las consultas con y sin índices, alternando cuál va primero. Los índices se eliminan
+    # dentro de un savepoint y se recuperan al deshacerlo. Se devuelve el plan y el menor tiempo de cada consulta.
+    def medir_alternando(self, consultas, repeticiones):
+        tiempos = {True: {nombre: [] for nombre in consultas}, False: {nombre: [] for nombre in consultas}}
+        planes = {True: {}, False: {}}
+
+        # Se ejecutan una vez antes de medir, para que los datos estén en la caché en ambos casos.
+        for consulta in consultas.values():
+            list(consulta.all())
+
+        for repeticion in range(max(repeticiones, 1)):
+            for con_indices in ([True, False] if repeticion % 2 == 0 else [False, True]):
+                if con_indices:
+                    self.medir(consultas, tiempos[True], planes[True])
+                    continue
+                savepoint = transaction.savepoint(using=self.base_datos)
+                self.eliminar_indices()
+                self.medir(consultas, tiempos[False], planes[False])
+                transaction.savepoint_rollback(savepoint, using=self.base_datos)
+
+        return tuple(
+            {nombre: (planes[con_indices][nombre], min(tiempos[con_indices][nombre])) for nombre in consultas}
+            for con_indices in (True, False)
+        )
+
+    def medir(self, consultas, tiempos, planes):
+        for nombre, consulta in consultas.items():
+            inicio = time.perf_counter()
+            list(consulta.all())
+            tiempos[nombre].append(time.perf_counter() - inicio)
+            planes.setdefault(nombre, consulta.explain())
+
+    # Se eliminan los índices de Meta.indexes y los trigram (solo existen en PostgreSQL, migración 0028).
+    # DROP INDEX es transaccional (PostgreSQL y SQLite): los índices vuelven al deshacer el savepoint.
+    def eliminar_indices(self):
+        quote_name = self.conexion.ops.quote_name
+        with self.conexion.cursor() as cursor:
+            for modelo in MODELOS_CON_INDICES:
+                indices = {indice.name for indice in modelo._meta.indexes}
+                restricciones = self.conexion.introspection.get_constraints(cursor, modelo._meta.db_table)
+                indices |= {nombre for nombre in restricciones if nombre.endswith('_trgm_idx')}
+                for indice in sorted(indices):
+                    cursor.execute(f"DROP INDEX {quote_name(indice)}")
+        self.analizar()
+
+    # Se actualizan las estadísticas para que el planificador tenga en cuenta los datos sintéticos.
+    def analizar(self):
+        with self.conexion.cursor() as cursor:
+            cursor.execute("ANALYZE")
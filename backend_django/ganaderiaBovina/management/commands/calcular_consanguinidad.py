@@ -0,0 +1,18 @@
+# --------------------------------- calcular_consanguinidad.py: ---------------------------------
+# Funcionalidad: recalcula el coeficiente de consanguinidad de todos los animales a partir de su genealogía
+# (ej: después de importar datos, ya que las importaciones no calculan el coeficiente de cada animal).
+# -----------------------------------------------------------------------------------
+
+from django.core.management.base import BaseCommand
+
+from ganaderiaBovina.consanguinidad import calcular_consanguinidad_rebanyo
+
+
+class Command(BaseCommand):
+
+    # Se añade una breve descripción de lo que hace este comando.
+    help = "Recalcula el coeficiente de consanguinidad de todos los animales (algoritmo de Meuwissen y Luo)."
+
+    def handle(self, *args, **kwargs):
+        actualizados = calcular_consanguinidad_rebanyo()
+        self.stdout.write(f"Se ha actualizado el coeficiente de consanguinidad de {actualizados} animales.")
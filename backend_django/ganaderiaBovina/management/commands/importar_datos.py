@@ -0,0 +1,32 @@
+# --------------------------------- importar_datos.py: ---------------------------------
+# Funcionalidad: importa un archivo .csv en la base de datos (solo PostgreSQL) usando COPY (ver importacion.py).
+# Ej: ./run.sh importar_datos animales animales.csv --delimitador ";"
+# -----------------------------------------------------------------------------------
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ganaderiaBovina.importacion import importar_csv, ErrorImportacion, MODELOS_IMPORTACION
+
+
+class Command(BaseCommand):
+
+    # Se añade una breve descripción de lo que hace este comando.
+    help = "Importa un archivo .csv de animales, toros, vtanimales o listainseminaciones (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=list(MODELOS_IMPORTACION))
+        parser.add_argument('ruta', help="Ruta del archivo .csv (la primera línea son los nombres de los campos).")
+        parser.add_argument('--delimitador', default=',', help="Delimitador de las columnas (',', ';' o '\\t').")
+
+    def handle(self, *args, **options):
+        delimitador = '\t' if options['delimitador'] == '\\t' else options['delimitador']
+        try:
+            with open(options['ruta'], encoding='utf-8', newline='') as fichero:
+                resultado = importar_csv(options['modelo'], fichero, delimitador)
+        except ErrorImportacion as e:
+            for error in e.errores:
+                self.stderr.write(f"Fila {error['fila']} ({error['campo']}): {error['error']}")
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Filas: {resultado['filas']}. Insertadas: {resultado['insertados']}. "
+                          f"Omitidas (ya existían): {resultado['omitidos']}.")
@@ -0,0 +1,18 @@
+# --------------------------------- refrescar_entrenamiento_cria.py: ---------------------------------
+# Funcionalidad: se encarga de volver a generar la tabla EntrenamientoCria (conjunto de datos de la
+# simulación de crías) a partir de los animales con madre y padre y de los toros.
+# -----------------------------------------------------------------------------------
+
+from django.core.management.base import BaseCommand
+
+from ganaderiaBovina.simulacionCria import refrescar_entrenamiento_cria
+
+
+class Command(BaseCommand):
+
+    # Se añade una breve descripción de lo que hace este comando.
+    help = "Genera de nuevo la tabla de entrenamiento de la simulación de crías a partir de los animales y toros."
+
+    def handle(self, *args, **kwargs):
+        num_filas = refrescar_entrenamiento_cria()
+        self.stdout.write(f"La tabla de entrenamiento de la simulación de crías tiene {num_filas} crías.")
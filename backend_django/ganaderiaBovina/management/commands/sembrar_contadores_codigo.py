@@ -0,0 +1,25 @@
+# --------------------------------- sembrar_contadores_codigo.py: ---------------------------------
+# Funcionalidad: se encarga de calcular los contadores de los códigos (ContadorCodigo) a partir de los
+# códigos que ya existen en la base de datos (ej: después de importar datos o de añadir filas a mano).
+# Un contador nunca disminuye, para no volver a entregar códigos que ya se han utilizado.
+# -----------------------------------------------------------------------------------
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ganaderiaBovina.models import ContadorCodigo, modelos_por_prefijo, maximo_codigo_existente
+
+
+class Command(BaseCommand):
+
+    # Se añade una breve descripción de lo que hace este comando.
+    help = "Calcula los contadores de los códigos (V, C, T, CORRAL, VT, VTA, I) a partir de los datos existentes."
+
+    def handle(self, *args, **kwargs):
+        for prefijo in modelos_por_prefijo():
+            maximo = maximo_codigo_existente(prefijo)
+            with transaction.atomic():
+                contador, _ = ContadorCodigo.objects.select_for_update().get_or_create(prefijo=prefijo)
+                contador.ultimo = max(contador.ultimo, maximo)
+                contador.save(update_fields=['ultimo'])
+            self.stdout.write(f"Contador {prefijo}: {contador.ultimo}")
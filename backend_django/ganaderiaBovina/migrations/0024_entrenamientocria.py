@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0023_perfil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntrenamientoCria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_vaca', models.CharField(max_length=10)),
+                ('id_toro', models.CharField(max_length=10)),
+                ('id_cria', models.CharField(max_length=10, unique=True)),
+                ('celulas_somaticas', models.FloatField()),
+                ('produccion_leche', models.FloatField()),
+                ('calidad_patas', models.FloatField()),
+                ('calidad_ubres', models.FloatField()),
+                ('grasa', models.FloatField()),
+                ('proteinas', models.FloatField()),
+                ('cs_vaca', models.FloatField()),
+                ('pl_vaca', models.FloatField()),
+                ('pa_vaca', models.FloatField()),
+                ('u_vaca', models.FloatField()),
+                ('g_vaca', models.FloatField()),
+                ('pr_vaca', models.FloatField()),
+                ('cs_toro', models.FloatField()),
+                ('pl_toro', models.FloatField()),
+                ('pa_toro', models.FloatField()),
+                ('u_toro', models.FloatField()),
+                ('g_toro', models.FloatField()),
+                ('pr_toro', models.FloatField()),
+            ],
+        ),
+    ]
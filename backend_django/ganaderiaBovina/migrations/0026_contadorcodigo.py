@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0025_trabajosimulacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorCodigo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(max_length=10, unique=True)),
+                ('ultimo', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0026_contadorcodigo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['estado', 'tipo'], name='animal_estado_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['fecha_nacimiento'], name='animal_fecha_nacimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['fecha_eliminacion'], name='animal_fecha_eliminacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['produccion_leche'], name='animal_produccion_leche_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listainseminaciones',
+            index=models.Index(fields=['fecha_inseminacion', 'hora_inseminacion'], name='insem_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listainseminaciones',
+            index=models.Index(fields=['id_vaca', 'fecha_inseminacion'], name='insem_vaca_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='toro',
+            index=models.Index(fields=['estado'], name='toro_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='toro',
+            index=models.Index(fields=['transmision_leche'], name='toro_transmision_leche_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vtanimales',
+            index=models.Index(fields=['id_animal', 'inventario_vt', 'fecha_inicio'], name='vtanimales_animal_vt_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vtanimales',
+            index=models.Index(fields=['fecha_inicio'], name='vtanimales_fecha_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Índices trigram (pg_trgm) para los filtros de texto libre con icontains (filters.py).
+# Django traduce "campo__icontains" en PostgreSQL a UPPER("campo"::text) LIKE UPPER('%valor%'), por lo que el
+# índice GIN se crea sobre esa misma expresión. Solo se aplica en PostgreSQL (en SQLite no hace nada).
+
+from django.db import migrations
+
+# (modelo, campo, nombre del índice)
+INDICES_TRIGRAM = [
+    ('animal', 'nombre', 'animal_nombre_trgm_idx'),
+    ('toro', 'nombre', 'toro_nombre_trgm_idx'),
+    ('corral', 'nombre', 'corral_nombre_trgm_idx'),
+    ('inventariovt', 'nombre', 'inventariovt_nombre_trgm_idx'),
+    ('vtanimales', 'responsable', 'vtanimales_responsable_trgm_idx'),
+    ('listainseminaciones', 'responsable', 'insem_responsable_trgm_idx'),
+]
+
+
+def crear_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote_name = schema_editor.quote_name
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for modelo, campo, indice in INDICES_TRIGRAM:
+        tabla = apps.get_model('ganaderiaBovina', modelo)._meta.db_table
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote_name(indice)} ON {quote_name(tabla)} "
+            f"USING gin (UPPER({quote_name(campo)}::text) gin_trgm_ops)"
+        )
+
+
+def eliminar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, indice in INDICES_TRIGRAM:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(indice)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0027_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_trigram, eliminar_indices_trigram),
+    ]
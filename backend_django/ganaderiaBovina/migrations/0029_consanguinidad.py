@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0028_indices_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='coeficiente_consanguinidad',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['coeficiente_consanguinidad'], name='animal_consanguinidad_idx'),
+        ),
+    ]
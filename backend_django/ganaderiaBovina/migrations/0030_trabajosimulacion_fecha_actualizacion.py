@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0029_consanguinidad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajosimulacion',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
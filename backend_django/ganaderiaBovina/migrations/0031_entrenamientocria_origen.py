@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ganaderiaBovina', '0030_trabajosimulacion_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrenamientocria',
+            name='origen',
+            field=models.CharField(choices=[('Animales', 'Animales'), ('API', 'API')], default='Animales', max_length=10),
+        ),
+    ]
@@ -12,7 +12,8 @@
 # -----------------------------------------------------------------------------------
 
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest
 from decimal import Decimal
 from django.contrib.auth.models import User
 
@@ -21,102 +22,112 @@ from django.contrib.auth.models import User
 # ---------------------------------------------------------------------------------------------------------------------------------
 
 
-def generar_codigo_animal(tipo):
-    prefijo = 'V' if tipo == 'Vaca' else 'C'
-    codigos = Animal.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
+# --------------------------------------------------------------------------------------------------------------
+#                                       Generación de CÓDIGOS (ej: "V-x", "T-x", "CORRAL-x")
+#
+# Cada prefijo tiene un contador (ContadorCodigo) con el último número que se ha entregado.
+# Para obtener un nuevo código se bloquea la fila del contador (select_for_update), se incrementa y se guarda,
+# por lo que el coste no depende del número de filas de la tabla y dos inserciones a la vez no obtienen el mismo código.
+# - Si el contador no existe, se crea a partir del mayor código que ya hay en la tabla (solo la primera vez).
+# - Si se guarda un elemento con un código indicado a mano, se actualiza el contador si ese número es mayor.
+# - Comando "manage.py sembrar_contadores_codigo": vuelve a calcular todos los contadores a partir de los datos.
+# --------------------------------------------------------------------------------------------------------------
 
-    max_num = 0
-    for cod in codigos:
-        try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
+class ContadorCodigo(models.Model):
+    prefijo = models.CharField(max_length=10, unique=True)
+    ultimo = models.IntegerField(default=0)
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
+    def __str__(self):
+        return f"{self.prefijo}-{self.ultimo}"
 
-def generar_codigo_toro():
-    prefijo = 'T'
-    codigos = Toro.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
 
-    max_num = 0
-    for cod in codigos:
-        try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
+def modelos_por_prefijo():
+    # Prefijo del código --> modelo que lo utiliza.
+    return {
+        'V': Animal, 'C': Animal, 'T': Toro, 'CORRAL': Corral,
+        'VT': InventarioVT, 'VTA': VTAnimales, 'I': ListaInseminaciones,
+    }
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
 
+def separar_codigo(codigo):
+    # "V-12" --> ("V", 12). Si el código no tiene el formato "PREFIJO-número", se devuelve None.
+    prefijo, _, numero = (codigo or '').rpartition('-')
+    if not prefijo or not numero.isdigit():
+        return None
+    return prefijo, int(numero)
 
-def generar_codigo_inseminaciones():
-    prefijo = 'I'
-    codigos = ListaInseminaciones.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
 
+def maximo_codigo_existente(prefijo):
+    # Mayor número de los códigos de la tabla que empiezan por "PREFIJO-" (se recorren todos los códigos).
+    modelo = modelos_por_prefijo()[prefijo]
     max_num = 0
-    for cod in codigos:
+    for cod in modelo.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True).iterator():
+        partes = separar_codigo(cod)
+        if partes and partes[0] == prefijo and partes[1] > max_num:
+            max_num = partes[1]
+    return max_num
+
+
+def _bloquear_contador(prefijo, minimo=0):
+    # Se bloquea la fila del contador. Solo si todavía no existe se recorre la tabla para obtener el mayor código.
+    try:
+        return ContadorCodigo.objects.select_for_update().get(prefijo=prefijo)
+    except ContadorCodigo.DoesNotExist:
+        ultimo = max(maximo_codigo_existente(prefijo), minimo)
         try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
+            with transaction.atomic():
+                return ContadorCodigo.objects.create(prefijo=prefijo, ultimo=ultimo)
+        except IntegrityError:
+            # Otra petición lo ha creado a la vez: se bloquea el que ya existe.
+            return ContadorCodigo.objects.select_for_update().get(prefijo=prefijo)
+
+
+def reservar_codigos(prefijo, cantidad=1):
+    # Se reservan "cantidad" códigos consecutivos del prefijo indicado (ej: para crear varios elementos a la vez).
+    with transaction.atomic():
+        contador = _bloquear_contador(prefijo)
+        primero = contador.ultimo + 1
+        contador.ultimo += cantidad
+        contador.save(update_fields=['ultimo'])
+    return [f"{prefijo}-{numero}" for numero in range(primero, primero + cantidad)]
+
+
+def registrar_codigo(codigo):
+    # Se indica un código a mano (ej: "V-100"): el contador no puede entregar un número menor o igual.
+    partes = separar_codigo(codigo)
+    if not partes or partes[0] not in modelos_por_prefijo():
+        return
+    prefijo, numero = partes
+    if not ContadorCodigo.objects.filter(prefijo=prefijo).update(ultimo=Greatest('ultimo', numero)):
+        # Si el contador todavía no existe, se crea (el código aún puede no estar guardado en la tabla).
+        with transaction.atomic():
+            contador = _bloquear_contador(prefijo, numero)
+            if contador.ultimo < numero:
+                contador.ultimo = numero
+                contador.save(update_fields=['ultimo'])
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
 
+def generar_codigo_animal(tipo):
+    prefijo = 'V' if tipo == 'Vaca' else 'C'
+    return reservar_codigos(prefijo)[0]
 
-def generar_codigo_inventariovt():
-    prefijo = 'VT'
-    codigos = InventarioVT.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
-    max_num = 0
-    for cod in codigos:
-        try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
+def generar_codigo_toro():
+    return reservar_codigos('T')[0]
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
 
-def generar_codigo_corral():
-    prefijo = 'CORRAL'
-    codigos = Corral.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
-    max_num = 0
-    for cod in codigos:
-        try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
+def generar_codigo_inseminaciones():
+    return reservar_codigos('I')[0]
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
 
+def generar_codigo_inventariovt():
+    return reservar_codigos('VT')[0]
 
-def generar_codigo_vtanimales():
-    prefijo = 'VTA'
-    codigos = VTAnimales.objects.filter(codigo__startswith=f"{prefijo}-").values_list('codigo', flat=True)
+def generar_codigo_corral():
+    return reservar_codigos('CORRAL')[0]
 
-    max_num = 0
-    for cod in codigos:
-        try:
-            num = int(cod.split('-')[1])
-            if num > max_num:
-                max_num = num
-        except (IndexError, ValueError):
-            continue
 
-    siguiente = max_num + 1
-    return f"{prefijo}-{siguiente}"
+def generar_codigo_vtanimales():
+    return reservar_codigos('VTA')[0]
 
 # --------------------------------------------------------------------------------------------------------------
 #                                       Modelo de CORRAL
@@ -142,6 +153,8 @@ class Corral(models.Model):
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = generar_codigo_corral()
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
         super().save(*args, **kwargs)
     def __str__(self):
         return f"{self.codigo} {self.nombre}"
@@ -233,9 +246,33 @@ class Animal(models.Model):
     fecha_eliminacion = models.DateField(null=True, blank=True)  # Se añade fecha de eliminación si hay eliminación de "Vendida" o "Muerta"
     comentario = models.TextField(blank=True, null=True) # Se añade comentario si hay eliminación de "Vendida" o "Muerta"
 
+    # Coeficiente de consanguinidad (Wright) calculado a partir de la genealogía (consanguinidad.py).
+    # No se indica a mano: se recalcula al crear el animal o al cambiar su madre o su padre.
+    coeficiente_consanguinidad = models.FloatField(default=0, editable=False)
+
+    # Índices para los filtros y ordenaciones más usados (filters.py y views.py): animales vivos de un tipo
+    # (estado y tipo), rangos de fechas y ordenación por producción de leche.
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'tipo'], name='animal_estado_tipo_idx'),
+            models.Index(fields=['fecha_nacimiento'], name='animal_fecha_nacimiento_idx'),
+            models.Index(fields=['fecha_eliminacion'], name='animal_fecha_eliminacion_idx'),
+            models.Index(fields=['produccion_leche'], name='animal_produccion_leche_idx'),
+            models.Index(fields=['coeficiente_consanguinidad'], name='animal_consanguinidad_idx'),
+        ]
+
+    # Se guardan la madre y el padre con los que se ha cargado el animal, para saber si cambian al guardarlo.
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._progenitores_guardados = (instancia.__dict__.get('madre_id'), instancia.__dict__.get('padre_id'))
+        return instancia
+
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = generar_codigo_animal(self.tipo)
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
         super().save(*args, **kwargs)
     def __str__(self):
         return f"{self.codigo}"
@@ -283,6 +320,8 @@ class InventarioVT(models.Model):
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = generar_codigo_inventariovt()
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
 
         if not self.estado:
             self.estado = "Activa"
@@ -332,6 +371,13 @@ class VTAnimales(models.Model):
     # Ya que hay una relación entre el tipo (Tratamiento/Vacuna), nombre (del Tratamiento/Vacuna)
     inventario_vt = models.ForeignKey(InventarioVT, null=True, blank=True, on_delete=models.PROTECT)
 
+    # Índices: historial de un animal con una vacuna/tratamiento (comprobación de los 365 días) y rangos de fechas.
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_animal', 'inventario_vt', 'fecha_inicio'], name='vtanimales_animal_vt_fecha_idx'),
+            models.Index(fields=['fecha_inicio'], name='vtanimales_fecha_inicio_idx'),
+        ]
+
 
     # Dosis indica lo que se le va a suministrar al animal
     # dosis = models.IntegerField()
@@ -355,6 +401,8 @@ class VTAnimales(models.Model):
 
         if not self.codigo:
             self.codigo = generar_codigo_vtanimales()
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
         super().save(*args, **kwargs)
 
         # -------------------------------------------------------------------------------------------------------- MIRAR NOMBRE
@@ -396,9 +444,18 @@ class ListaInseminaciones(models.Model):
     es_sexado = models.BooleanField(default=True, null=False, blank=False)
     responsable = models.CharField(max_length=100)
 
+    # Índices: rangos de fechas de inseminación (ordenadas por fecha y hora) y el historial de cada vaca.
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_inseminacion', 'hora_inseminacion'], name='insem_fecha_hora_idx'),
+            models.Index(fields=['id_vaca', 'fecha_inseminacion'], name='insem_vaca_fecha_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = generar_codigo_inseminaciones()
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
         super().save(*args, **kwargs)
     def __str__(self):
         return f"{self.codigo} - {self.tipo}"
@@ -460,6 +517,13 @@ class Toro(models.Model):
 
     comentario = models.TextField(null=True, blank=True)
 
+    # Índices: toros vivos (simulación de crías) y ordenación por transmisión de leche.
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado'], name='toro_estado_idx'),
+            models.Index(fields=['transmision_leche'], name='toro_transmision_leche_idx'),
+        ]
+
     # ---------------------  OBSERVACIÓN: ----------------------------------------------------------------------------
     # Para el TORO no se va a almacenar la fecha de eliminación, ya que los datos del toro solamente
     # se utilizan para realizar la simulación de las crías. Además, no se tiene ni la fecha de nacimiento del mismo.
@@ -471,10 +535,98 @@ class Toro(models.Model):
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = generar_codigo_toro() # Para generar el código secuencial.
+        elif self._state.adding:
+            registrar_codigo(self.codigo)
         super().save(*args, **kwargs)
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
 
+# --------------------------------------------------------------------------------------------------------------
+#                                       Modelo de ENTRENAMIENTOCRIA (Conjunto de datos de la simulación de crías)
+#
+# Tabla "materializada" con los datos de entrenamiento del modelo de simulación de crías: cada fila es una
+# cría (Animal con madre y padre) junto a las características de su madre (Animal) y de su padre (Toro).
+# Se obtiene directamente de las tablas Animal y Toro y se vuelve a generar con
+# "refrescar_entrenamiento_cria" (simulacionCria.py o comando "manage.py refrescar_entrenamiento_cria").
+# Las crías añadidas con la API (POST /reentrenar-cria/) no tienen un Animal detrás: se guardan con el origen
+# "API" y se mantienen al volver a generar la tabla.
+# Los nombres de los campos son los mismos que las columnas del archivo .csv del conjunto de datos.
+# --------------------------------------------------------------------------------------------------------------
+
+class EntrenamientoCria(models.Model):
+    ORIGENES_CHOICES = [
+        ('Animales', 'Animales'), # Generada a partir de Animal y Toro (refrescar_entrenamiento_cria).
+        ('API', 'API') # Añadida con POST /reentrenar-cria/.
+    ]
+    origen = models.CharField(max_length=10, choices=ORIGENES_CHOICES, default='Animales')
+
+    # Códigos de la madre ("V-x"), del padre ("T-x") y de la cría ("C-x" o "V-x").
+    id_vaca = models.CharField(max_length=10)
+    id_toro = models.CharField(max_length=10)
+    id_cria = models.CharField(max_length=10, unique=True)
+
+    # Características de la cría (salida del modelo).
+    celulas_somaticas = models.FloatField()
+    produccion_leche = models.FloatField()
+    calidad_patas = models.FloatField()
+    calidad_ubres = models.FloatField()
+    grasa = models.FloatField()
+    proteinas = models.FloatField()
+
+    # Características de la madre (entrada del modelo).
+    cs_vaca = models.FloatField()
+    pl_vaca = models.FloatField()
+    pa_vaca = models.FloatField()
+    u_vaca = models.FloatField()
+    g_vaca = models.FloatField()
+    pr_vaca = models.FloatField()
+
+    # Características del padre (entrada del modelo).
+    cs_toro = models.FloatField()
+    pl_toro = models.FloatField()
+    pa_toro = models.FloatField()
+    u_toro = models.FloatField()
+    g_toro = models.FloatField()
+    pr_toro = models.FloatField()
+
+    def __str__(self):
+        return f"{self.id_cria} ({self.id_vaca} x {self.id_toro})"
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Modelo de TRABAJOSIMULACION (Simulaciones de crías en segundo plano)
+#
+# Cada fila es una simulación de la matriz de crías que se ejecuta fuera de la petición (trabajosSimulacion.py).
+# Se guardan los parámetros, el estado, el progreso y el resultado, para poder consultarlo las veces que sea necesario.
+# --------------------------------------------------------------------------------------------------------------
+
+class TrabajoSimulacion(models.Model):
+    ESTADOS_CHOICES = [
+        ('Pendiente', 'Pendiente'),
+        ('En curso', 'En curso'),
+        ('Completado', 'Completado'),
+        ('Error', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trabajos_simulacion')
+    estado = models.CharField(max_length=15, choices=ESTADOS_CHOICES, default='Pendiente')
+    parametros = models.JSONField()
+
+    # Progreso (porcentaje [%] comprendido entre 0 y 100)
+    progreso = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(100)])
+
+    # Clave de la respuesta ("matriz_cria" o "asignacion_cria") y resultado de la simulación.
+    tipo_resultado = models.CharField(max_length=20, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Última vez que el hilo que ejecuta el trabajo ha indicado que sigue activo (al empezar y con cada progreso).
+    fecha_actualizacion = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Simulación {self.id} ({self.estado})"
+
 # --------------------------------------------------------------------------------------------------------------
 #                                       Modelo de PERFIL
 #
@@ -0,0 +1,32 @@
+# --------------------------------- paginacion.py: ---------------------------------
+# Funcionalidad: paginación por cursor (keyset) de los listados (GET /.../).
+# - Es opcional: solo se pagina si la URL incluye "cursor" o "page_size" (ej: /animales/?page_size=100).
+#   Sin ellos se devuelve la lista completa, como hasta ahora (el frontend no cambia).
+# - Cada página se obtiene con "WHERE campo > último valor ORDER BY campo LIMIT n" sobre un campo con índice,
+#   por lo que el tiempo de respuesta no depende de cuántas páginas se hayan recorrido (no usa OFFSET).
+# - La respuesta paginada es {"next": url, "previous": url, "results": [...]}.
+# -----------------------------------------------------------------------------------
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+
+
+class PaginacionCursor(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    # Orden por defecto: los más recientes primero (clave primaria, siempre con índice).
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params \
+                and self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    # Se respeta "?ordering=..." si la vista lo permite. Si no se indica, se usa el campo único e indexado
+    # de la vista ("ordering_cursor") y no la ordenación por defecto, que puede no ser única.
+    def get_ordering(self, request, queryset, view):
+        if OrderingFilter in getattr(view, 'filter_backends', []) and 'ordering' in request.query_params:
+            return super().get_ordering(request, queryset, view)
+        ordering = getattr(view, 'ordering_cursor', self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
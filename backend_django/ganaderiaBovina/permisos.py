@@ -26,4 +26,13 @@ class EsEmpleado(BasePermission):
         )
 
 class PermisosPorModelo(DjangoModelPermissions):
-    message = "No tiene permiso para realizar esta acción."
\ No newline at end of file
+    message = "No tiene permiso para realizar esta acción."
+
+    # Por defecto, el permiso depende del método HTTP (ej: POST --> add_<modelo>). Las acciones que no crean
+    # elementos (ej: POST /animales/eliminar-lote/) indican sus permisos en la vista:
+    # permisos_por_accion = {"nombre de la acción": ["ganaderiaBovina.delete_animal", ...]}
+    def has_permission(self, request, view):
+        permisos = getattr(view, 'permisos_por_accion', {}).get(getattr(view, 'action', None))
+        if permisos is None:
+            return super().has_permission(request, view)
+        return bool(request.user and request.user.is_authenticated and request.user.has_perms(permisos))
\ No newline at end of file
@@ -1,19 +1,36 @@
 # cargar_conjunto_de_datos.py
+# Carga los toros, vacas y crías del conjunto de datos (.csv) en la base de datos.
+# - El .csv se lee y se agrupa una sola vez (un registro por toro, vaca y cría).
+# - Los códigos que ya existen se obtienen por bloques de códigos (TAMANYO_CONSULTA) y solo se crean los que faltan.
+# - Se guarda con bulk_create por bloques dentro de una transacción. Se puede ejecutar varias veces:
+#   los animales que ya existen no se modifican ni se duplican (ignore_conflicts).
 
 import pandas as pd
 import random
 from datetime import date, timedelta
-from ganaderiaBovina.models import Animal, Toro, Corral
 
-def cargar_dataset():
-    ruta = "backend_django/ganaderiaBovina/cria_ganado_dataset_05_03_25.csv"
-    df = pd.read_csv(ruta, delimiter=";")
+from django.db import transaction
+
+from ganaderiaBovina.consanguinidad import calcular_consanguinidad_rebanyo
+from ganaderiaBovina.models import Animal, Toro, Corral, registrar_codigo, separar_codigo
+
+RUTA_DATASET = "backend_django/ganaderiaBovina/cria_ganado_dataset_05_03_25.csv"
+TAMANYO_BLOQUE = 2000
+# Número máximo de códigos de cada consulta "codigo IN (...)": con conjuntos de datos grandes, una única consulta
+# superaría el límite de parámetros de algunas bases de datos (ej: SQLite) y sería más lenta de planificar.
+TAMANYO_CONSULTA = 5000
+
 
-    # Se genera un corral para almacenar los datos.
-    corral_principal, _ = Corral.objects.get_or_create(codigo="CORRAL-1", defaults={"nombre": "Corral principal"})
+def buscar_por_codigos(modelo, codigos, *campos, flat=False):
+    # Devuelve los campos indicados de los elementos del modelo cuyos códigos estén en la lista (una consulta
+    # por cada bloque de TAMANYO_CONSULTA códigos).
+    for inicio in range(0, len(codigos), TAMANYO_CONSULTA):
+        bloque = codigos[inicio:inicio + TAMANYO_CONSULTA]
+        yield from modelo.objects.filter(codigo__in=bloque).values_list(*campos, flat=flat)
 
-    toros_unicos = df["id_toro"].unique()
-    vacas_unicas = df["id_vaca"].unique()
+
+def cargar_dataset(ruta=RUTA_DATASET, tamanyo_bloque=TAMANYO_BLOQUE):
+    df = pd.read_csv(ruta, delimiter=";")
 
     # Se genera una fecha de nacimiento aleatoria (comprendida entre 2017 y 2025 [abril] para las vacas)
     def fecha_nacimiento_aleatoria():
@@ -22,72 +39,98 @@ def cargar_dataset():
         dias = (fin - inicio).days
         return inicio + timedelta(days=random.randint(0, dias))
 
-    # Para indicar cuantos animales se han añadido.
-    num_toros = 0
-    num_vacas = 0
-    num_crias = 0
-    # Se van agregando los toros.
-    for codigo_toro in toros_unicos:
-        if not Toro.objects.filter(codigo=codigo_toro).exists():
-            Toro.objects.create(
-                codigo=codigo_toro,
-                nombre=f"Toro {codigo_toro}",
+    # Un registro por toro, por vaca y por cría (se queda el primero, como antes con .iloc[0]).
+    toros_df = df.drop_duplicates("id_toro")
+    vacas_df = df.drop_duplicates("id_vaca")
+    crias_df = df.drop_duplicates("id_cria")
+
+    with transaction.atomic():
+        # Se genera un corral para almacenar los datos.
+        corral_principal, _ = Corral.objects.get_or_create(codigo="CORRAL-1", defaults={"nombre": "Corral principal"})
+
+        # Se van agregando los toros.
+        codigos_toros = toros_df["id_toro"].tolist()
+        toros_existentes = set(buscar_por_codigos(Toro, codigos_toros, "codigo", flat=True))
+        toros = [
+            Toro(
+                codigo=fila.id_toro,
+                nombre=f"Toro {fila.id_toro}",
                 estado="Vivo",
                 cantidad_semen=random.randint(10, 50),
-                celulas_somaticas=df[df["id_toro"] == codigo_toro]["cs_toro"].iloc[0],
-                transmision_leche=df[df["id_toro"] == codigo_toro]["pl_toro"].iloc[0],
-                calidad_patas=df[df["id_toro"] == codigo_toro]["pa_toro"].iloc[0],
-                calidad_ubres=df[df["id_toro"] == codigo_toro]["u_toro"].iloc[0],
-                grasa=df[df["id_toro"] == codigo_toro]["g_toro"].iloc[0],
-                proteinas=df[df["id_toro"] == codigo_toro]["pr_toro"].iloc[0]
+                celulas_somaticas=fila.cs_toro,
+                transmision_leche=fila.pl_toro,
+                calidad_patas=fila.pa_toro,
+                calidad_ubres=fila.u_toro,
+                grasa=fila.g_toro,
+                proteinas=fila.pr_toro
             )
-            num_toros = num_toros + 1
+            for fila in toros_df.itertuples(index=False) if fila.id_toro not in toros_existentes
+        ]
+        Toro.objects.bulk_create(toros, batch_size=tamanyo_bloque, ignore_conflicts=True)
 
-    # Se van agregando las vacas.
-    for codigo_vaca in vacas_unicas:
-        if not Animal.objects.filter(codigo=codigo_vaca).exists():
-            Animal.objects.create(
-                codigo=codigo_vaca,
+        # Se van agregando las vacas.
+        codigos_animales = vacas_df["id_vaca"].tolist() + crias_df["id_cria"].tolist()
+        animales_existentes = set(buscar_por_codigos(Animal, codigos_animales, "codigo", flat=True))
+        vacas = [
+            Animal(
+                codigo=fila.id_vaca,
                 tipo="Vaca",
-                nombre=f"Vaca {codigo_vaca}",
+                nombre=f"Vaca {fila.id_vaca}",
                 estado="Vacía",
                 fecha_nacimiento=fecha_nacimiento_aleatoria(),
                 corral=corral_principal,
-                celulas_somaticas=df[df["id_vaca"] == codigo_vaca]["cs_vaca"].iloc[0],
-                produccion_leche=df[df["id_vaca"] == codigo_vaca]["pl_vaca"].iloc[0],
-                calidad_patas=df[df["id_vaca"] == codigo_vaca]["pa_vaca"].iloc[0],
-                calidad_ubres=df[df["id_vaca"] == codigo_vaca]["u_vaca"].iloc[0],
-                grasa=df[df["id_vaca"] == codigo_vaca]["g_vaca"].iloc[0],
-                proteinas=df[df["id_vaca"] == codigo_vaca]["pr_vaca"].iloc[0]
+                celulas_somaticas=fila.cs_vaca,
+                produccion_leche=fila.pl_vaca,
+                calidad_patas=fila.pa_vaca,
+                calidad_ubres=fila.u_vaca,
+                grasa=fila.g_vaca,
+                proteinas=fila.pr_vaca
             )
-            num_vacas = num_vacas + 1
-
-    # Se van agregando las crías (terneros) de las vacas y toros.
-    for _, fila in df.iterrows():
-        codigo_cria = fila["id_cria"]
-        if not Animal.objects.filter(codigo=codigo_cria).exists():
-            madre = Animal.objects.filter(codigo=fila["id_vaca"]).first()
-            padre = Toro.objects.filter(codigo=fila["id_toro"]).first()
-            if madre and padre:
-                Animal.objects.create(
-                    codigo=codigo_cria,
-                    tipo="Ternero",
-                    nombre=f"Ternero {codigo_cria}",
-                    estado="Joven",
-                    fecha_nacimiento=fecha_nacimiento_aleatoria(),
-                    corral=corral_principal,
-                    celulas_somaticas=fila["celulas_somaticas"],
-                    produccion_leche=fila["produccion_leche"],
-                    calidad_patas=fila["calidad_patas"],
-                    calidad_ubres=fila["calidad_ubres"],
-                    grasa=fila["grasa"],
-                    proteinas=fila["proteinas"],
-                    madre=madre,
-                    padre=padre
-                )
-                num_crias = num_crias + 1
+            for fila in vacas_df.itertuples(index=False) if fila.id_vaca not in animales_existentes
+        ]
+        Animal.objects.bulk_create(vacas, batch_size=tamanyo_bloque, ignore_conflicts=True)
+
+        # Identificadores de los reproductores (por bloques de códigos).
+        id_toros = dict(buscar_por_codigos(Toro, codigos_toros, "codigo", "id"))
+        id_vacas = dict(buscar_por_codigos(Animal, vacas_df["id_vaca"].tolist(), "codigo", "id"))
+
+        # Se van agregando las crías (terneros) de las vacas y toros.
+        crias = [
+            Animal(
+                codigo=fila.id_cria,
+                tipo="Ternero",
+                nombre=f"Ternero {fila.id_cria}",
+                estado="Joven",
+                fecha_nacimiento=fecha_nacimiento_aleatoria(),
+                corral=corral_principal,
+                celulas_somaticas=fila.celulas_somaticas,
+                produccion_leche=fila.produccion_leche,
+                calidad_patas=fila.calidad_patas,
+                calidad_ubres=fila.calidad_ubres,
+                grasa=fila.grasa,
+                proteinas=fila.proteinas,
+                madre_id=id_vacas[fila.id_vaca],
+                padre_id=id_toros[fila.id_toro]
+            )
+            for fila in crias_df.itertuples(index=False)
+            if fila.id_cria not in animales_existentes and fila.id_vaca in id_vacas and fila.id_toro in id_toros
+        ]
+        Animal.objects.bulk_create(crias, batch_size=tamanyo_bloque, ignore_conflicts=True)
+
+        # bulk_create no llama a save(): se actualizan los contadores con el mayor código de cada prefijo.
+        maximos = {}
+        for codigo in codigos_toros + codigos_animales:
+            partes = separar_codigo(codigo)
+            if partes and partes[1] > maximos.get(partes[0], (0, ""))[0]:
+                maximos[partes[0]] = (partes[1], codigo)
+        for _, codigo in maximos.values():
+            registrar_codigo(codigo)
+
+        # bulk_create tampoco ejecuta las señales: se calcula la consanguinidad de los animales nuevos.
+        calcular_consanguinidad_rebanyo()
 
     print("Se ha realizado con éxito la carga de los datos. Se han añadido:")
-    print(f"Toros: {num_toros}")
-    print(f"Vacas: {num_vacas}")
-    print(f"Crías: {num_crias}")
\ No newline at end of file
+    print(f"Toros: {len(toros)}")
+    print(f"Vacas: {len(vacas)}")
+    print(f"Crías: {len(crias)}")
+    return {"toros": len(toros), "vacas": len(vacas), "crias": len(crias)}
@@ -11,11 +11,13 @@
 # -----------------------------------------------------------------------------------
 import re
 from datetime import timedelta
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import Animal, Toro, Corral, InventarioVT, VTAnimales, ListaInseminaciones
+from . import stock
+from .models import Animal, Toro, Corral, InventarioVT, VTAnimales, ListaInseminaciones, TrabajoSimulacion
 
 
 # --------------------------------------------------------------------------------------------------------------
@@ -372,8 +374,17 @@ class CorralSerializer(serializers.ModelSerializer):
 
         return value
 
+    # Si se indica en el contexto (CorralViewSet: "?incluir_animales=false"), no se muestran los animales del corral.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('incluir_animales') is False:
+            self.fields.pop('animales')
+
     # Se obtiene el número de animales que tiene el corral con el campo calculado.
+    # Si el corral viene de CorralViewSet, ya está calculado en la consulta (num_animales).
     def get_cantidad_animales(self, obj):
+        if hasattr(obj, 'num_animales'):
+            return obj.num_animales
         return obj.animales.count()
 
     # Se obtienen los animales que hay en el corral gracias a la relación con Animal.
@@ -554,7 +565,8 @@ class VTAnimalesSerializer(serializers.ModelSerializer):
                 )
 
         # Se comprueba que NO se repitan vacuna/tratamiento suministrados en el mismo año (<365 días)
-        if animal and inventario and fecha:
+        # En la creación en lote, se comprueba para todo el lote a la vez (VTAnimalesViewSet.validar_lote).
+        if animal and inventario and fecha and not self.context.get('lote'):
             intervalo = fecha - timedelta(days=365)
             mismo_anio = VTAnimales.objects.filter(
                 id_animal=animal,
@@ -576,19 +588,17 @@ class VTAnimalesSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         inventario = validated_data.get('inventario_vt')
 
-        if inventario.unidades < 1:
-            # Si no hay suficientes unidades (0) en el inventario cuando se va a suministrar la vacuna/tratamiento,
-            # se muestra un mensaje de error.
-            raise serializers.ValidationError({
-                 "inventario_vt": f"No hay suficientes unidades disponibles de "
-                                 f"{inventario.tipo.lower()} '{inventario.nombre}'."
-            })
-
-        # Cuando se crea esa vacuna, se resta automáticamente una unidad a su inventario.
-        inventario.unidades -= 1
-        inventario.save()
+        with transaction.atomic():
+            # Cuando se crea esa vacuna, se resta automáticamente una unidad a su inventario (si hay unidades).
+            if not stock.descontar(InventarioVT, inventario.pk, 'unidades'):
+                # Si no hay suficientes unidades (0) en el inventario cuando se va a suministrar la vacuna/tratamiento,
+                # se muestra un mensaje de error.
+                raise serializers.ValidationError({
+                     "inventario_vt": f"No hay suficientes unidades disponibles de "
+                                     f"{inventario.tipo.lower()} '{inventario.nombre}'."
+                })
             # Se crea el registro de VTAnimales como normalmente
-        return super().create(validated_data)
+            return super().create(validated_data)
 
     def update(self, instance, validated_data):
         # Se busca la vacuna/tratamiento que ha sido suministrada, por si ha habido algún cambio en la modificación.
@@ -606,21 +616,30 @@ class VTAnimalesSerializer(serializers.ModelSerializer):
         # -> Inventario de Vacuna "Y" tenía 5 y pasa a tener 4.
         # -> Inventario de Vacuna "X" tenía 9 y pasa a tener 10.
         # Se hacen suma/resta de las unidades de los inventarios, si ha cambiado esa vacuna/tratamiendo suministrado
-        if inventario_anterior != inventario_nuevo:
-            if inventario_nuevo.unidades < 1:
-                raise serializers.ValidationError({
-                    "inventario_vt": f"No hay suficientes unidades disponibles de {inventario_nuevo.tipo.lower()} '"
-                                     f"{inventario_nuevo.nombre}'."
-                })
-            # Se suma 1 a la unidad del inventario anterior
-            inventario_anterior.unidades += 1
-            inventario_anterior.save()
-
-            # Se resta 1 a la unidad del nuevo inventario
-            inventario_nuevo.unidades -= 1
-            inventario_nuevo.save()
+        with transaction.atomic():
+            if inventario_anterior != inventario_nuevo:
+                # Se resta 1 a la unidad del nuevo inventario (si tiene unidades).
+                if not stock.descontar(InventarioVT, inventario_nuevo.pk, 'unidades'):
+                    raise serializers.ValidationError({
+                        "inventario_vt": f"No hay suficientes unidades disponibles de {inventario_nuevo.tipo.lower()} '"
+                                         f"{inventario_nuevo.nombre}'."
+                    })
+                # Se suma 1 a la unidad del inventario anterior
+                if inventario_anterior:
+                    stock.devolver(InventarioVT, inventario_anterior.pk, 'unidades')
+
+            return super().update(instance, validated_data)
+
+# Serializer de solo lectura para los listados (GET) de VTAnimales: muestra los mismos datos que VTAnimalesSerializer,
+# pero sin validaciones. El nombre de la vacuna/tratamiento se obtiene del inventario que ya viene en la consulta
+# (VTAnimalesViewSet: select_related), por lo que no se hace una consulta por cada elemento.
+class VTAnimalesLecturaSerializer(serializers.ModelSerializer):
+    nombre_vt = serializers.CharField(source="inventario_vt.nombre", read_only=True)
 
-        return super().update(instance, validated_data)
+    class Meta:
+        model = VTAnimales
+        fields = '__all__'
+        read_only_fields = [campo.name for campo in VTAnimales._meta.concrete_fields]
 
 # --------------------------------------------------------------------------------------------------------------
 #                                       Serializer de LISTAINSEMINACIONES (Inventario de inseminaciones)
@@ -694,13 +713,13 @@ class ListaInseminacionesSerializer(serializers.ModelSerializer):
     # Una inseminación solo usa 1 cantidad de semen del toro.
     def create(self, validated_data):
         toro = validated_data["id_toro"]
-        if toro and toro.cantidad_semen <= 0:
-            raise serializers.ValidationError({
-                "id_toro": f"El toro {toro.codigo} no tiene suficiente cantidad de semen para inseminar."
-            })
-        toro.cantidad_semen -= 1 # Se decrementa la cantidad de semen a 1.
-        toro.save() # Se guarda la información actualizada del toro.
-        return super().create(validated_data)
+        with transaction.atomic():
+            # Se decrementa la cantidad de semen a 1 (si el toro tiene semen).
+            if toro and not stock.descontar(Toro, toro.pk, 'cantidad_semen'):
+                raise serializers.ValidationError({
+                    "id_toro": f"El toro {toro.codigo} no tiene suficiente cantidad de semen para inseminar."
+                })
+            return super().create(validated_data)
 
     def update(self, instance, validated_data):
         # Se busca al toro que ya estaba en la inseminación por si ha habido algún cambio en la modificación.
@@ -720,19 +739,38 @@ class ListaInseminacionesSerializer(serializers.ModelSerializer):
         # -> Cantidad semen del toro "T-12" tenía 9 y pasa a tener 10.
 
         # Si el toro ha cambiado, se modifica las cantidades del semen del toro antiguo y del toro nuevo.
-        if toro_anterior != toro_nuevo:
-            if toro_nuevo.cantidad_semen <= 0:
-                raise serializers.ValidationError({
-                    "id_toro": f"El toro {toro_nuevo.codigo} no tiene suficiente cantidad de semen para inseminar."
-                })
-            # Se suma 1 a la cantidad de semen del toro anterior.
-            toro_anterior.cantidad_semen += 1
-            toro_anterior.save()
-            # Se quita 1 a la cantidad de semen del nuevo toro.
-            toro_nuevo.cantidad_semen -= 1
-            toro_nuevo.save()
-
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            if toro_anterior != toro_nuevo:
+                # Se quita 1 a la cantidad de semen del nuevo toro (si tiene semen).
+                if toro_nuevo and not stock.descontar(Toro, toro_nuevo.pk, 'cantidad_semen'):
+                    raise serializers.ValidationError({
+                        "id_toro": f"El toro {toro_nuevo.codigo} no tiene suficiente cantidad de semen para inseminar."
+                    })
+                # Se suma 1 a la cantidad de semen del toro anterior.
+                if toro_anterior:
+                    stock.devolver(Toro, toro_anterior.pk, 'cantidad_semen')
+
+            return super().update(instance, validated_data)
+
+# Serializer de solo lectura para los listados (GET) de ListaInseminaciones: mismos datos que
+# ListaInseminacionesSerializer, pero sin validaciones.
+# La vaca y el toro se muestran con su identificador, que ya está en la propia fila (no se consultan).
+class ListaInseminacionesLecturaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ListaInseminaciones
+        fields = '__all__'
+        read_only_fields = [campo.name for campo in ListaInseminaciones._meta.concrete_fields]
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Serializer de TRABAJOSIMULACION (Simulaciones de crías en segundo plano)
+# --------------------------------------------------------------------------------------------------------------
+
+class TrabajoSimulacionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrabajoSimulacion
+        fields = ['id', 'estado', 'progreso', 'parametros', 'tipo_resultado', 'resultado', 'error',
+                  'fecha_creacion', 'fecha_fin']
+        read_only_fields = fields
 
 # --------------------------------------------------------------------------------------------------------------
 #                                       Serializer de CustonTokenObtainPain
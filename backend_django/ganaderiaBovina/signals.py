@@ -4,10 +4,24 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Perfil
+from .consanguinidad import actualizar_consanguinidad
+from .models import Perfil, Animal
 
 # Cuando se cree un usuario, se va a crear su perfil de manera automática.
 @receiver(post_save, sender=User)
 def crear_perfil_usuario(sender, instance, created, **kwargs):
     if created:
-        Perfil.objects.create(user=instance)
\ No newline at end of file
+        Perfil.objects.create(user=instance)
+
+
+# Cuando se crea un animal con madre o padre, o se cambian sus progenitores, se recalcula su coeficiente de
+# consanguinidad (y el de sus descendientes, si ya los tiene).
+@receiver(post_save, sender=Animal)
+def actualizar_consanguinidad_animal(sender, instance, created, raw=False, **kwargs):
+    progenitores = (instance.madre_id, instance.padre_id)
+    anteriores = (None, None) if created else getattr(instance, '_progenitores_guardados', progenitores)
+    instance._progenitores_guardados = progenitores
+    if raw or progenitores == anteriores:
+        return
+    coeficientes = actualizar_consanguinidad([instance.id], descendientes=not created)
+    instance.coeficiente_consanguinidad = coeficientes.get(instance.id, instance.coeficiente_consanguinidad)
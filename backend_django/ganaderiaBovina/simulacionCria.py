@@ -1,88 +1,532 @@
-
 # --------------------------------- simulacionCria.py: ---------------------------------
 # Funcionalidad: permite realizar la simulación y el reentrenamiento del modelo
 # --------------------------------------------------------------------------------------
 # Bibliotecas que se utilizan.
 import numpy as np # Biblioteca Numpy.
 import pandas as pd # Biblioteca Pandas.
-from sklearn.linear_model import LinearRegression # Modelo de Regresión Lineal.
+from scipy.optimize import linear_sum_assignment # Resolución del problema de asignación.
 import os # Construye automáticamente la ruta del archivo CSV.
+import threading # Para que varios hilos del mismo worker no entrenen el modelo a la vez.
+import csv # Para escribir las nuevas filas del archivo CSV.
+import io
+import json
+import logging
+from contextlib import contextmanager
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
 
-def simular_cria_optima(id_vacas, id_toro, atributo_prioridad):
+from .models import Animal, Toro, EntrenamientoCria
 
-    # Se carga el conjunto de datos almacenado en el archivo .csv (localizado en la misma carpeta).
-    ruta_csv = os.path.join(settings.BASE_DIR, 'backend_django', 'ganaderiaBovina', 'cria_ganado_dataset_05_03_25.csv')
-    print(" Ruta final del CSV:", ruta_csv)
-    crias_df = pd.read_csv(ruta_csv, delimiter=";")
+logger = logging.getLogger(__name__)
 
-    # A partir de aquí, se va a realizar el entrenamiento del modelo.
-    # Se definen las variables de entrada (input: X) y salida (output: Y)
-    x = crias_df[['cs_vaca', 'pl_vaca', 'pa_vaca', 'u_vaca', 'g_vaca', 'pr_vaca',
-                  'cs_toro', 'pl_toro', 'pa_toro', 'u_toro', 'g_toro', 'pr_toro']]
-    y = crias_df[['celulas_somaticas', 'produccion_leche', 'calidad_patas', 'calidad_ubres', 'grasa', 'proteinas']]
+# Bloqueo del archivo CSV entre distintos procesos (workers).
+try:
+    import fcntl # Linux/MacOs
+except ImportError:
+    fcntl = None
+    import msvcrt # Windows
 
-    # Se selecciona el modelo de aprendizaje: Regresión Lineal.
-    modelo = LinearRegression()
-    # Se entrena el modelo de aprendizaje.
-    modelo.fit(x, y)
+# Origen del conjunto de datos de entrenamiento (settings.py: SIMULACION_CRIA_ORIGEN):
+# - "csv" (por defecto): archivo .csv del conjunto de datos.
+# - "bd": tabla EntrenamientoCria, generada a partir de los animales (con madre y padre) y los toros.
+ORIGEN_CSV = 'csv'
+ORIGEN_BD = 'bd'
 
-    # Preparar vacas y toro seleccionados
-    vacas_df = crias_df[crias_df['id_vaca'].isin(id_vacas)]
-    toro_df = crias_df[crias_df['id_toro'] == id_toro]
+# Variables de entrada (input: X) y salida (output: Y) del modelo.
+COLUMNAS_ENTRADA = ['cs_vaca', 'pl_vaca', 'pa_vaca', 'u_vaca', 'g_vaca', 'pr_vaca',
+                    'cs_toro', 'pl_toro', 'pa_toro', 'u_toro', 'g_toro', 'pr_toro']
+COLUMNAS_SALIDA = ['celulas_somaticas', 'produccion_leche', 'calidad_patas', 'calidad_ubres', 'grasa', 'proteinas']
+COLUMNAS_VACA = COLUMNAS_ENTRADA[:6]
+COLUMNAS_TORO = COLUMNAS_ENTRADA[6:]
+# Códigos de la madre, del padre y de la cría (obligatorios para añadir una cría al conjunto de datos).
+COLUMNAS_CODIGOS = ['id_vaca', 'id_toro', 'id_cria']
 
-    # Lista para almacenar el resultado final: vaca, toro, cría más óptima y atributo.
-    resultados = []
+# Campos de Animal (vaca) y de Toro que corresponden a las características de la vaca y del toro (COLUMNAS_VACA
+# y COLUMNAS_TORO). La producción de leche del toro es la transmisión de producción de leche.
+CAMPOS_VACA = ['celulas_somaticas', 'produccion_leche', 'calidad_patas', 'calidad_ubres', 'grasa', 'proteinas']
+CAMPOS_TORO = ['celulas_somaticas', 'transmision_leche', 'calidad_patas', 'calidad_ubres', 'grasa', 'proteinas']
 
-    # Se predicen las características de la cría para "x" (_) vacas seleccionadas y un toro indicado.
-    for _, vaca in vacas_df.iterrows():
-        if toro_df.empty:
-            continue
+# Rangos permitidos de cada atributo de la cría (en el mismo orden que COLUMNAS_SALIDA).
+LIMITES_INFERIORES = np.array([50000, 0, 1, 1, 2.5, 2.8])
+LIMITES_SUPERIORES = np.array([2000000, 200000, 9, 9, 6, 4])
 
-        # Se selecciona el toro indicado.
-        toro = toro_df.iloc[0]
+# --------------------------------------------------------------------------------------------------------------
+#                                       Modelo de CRÍA (Regresión Lineal incremental)
+# --------------------------------------------------------------------------------------------------------------
+# Regresión lineal por mínimos cuadrados (como LinearRegression de scikit-learn) que guarda sus estadísticos suficientes:
+# número de filas, medias y productos cruzados centrados (X^T X, X^T Y). Además, guarda la inversa de X^T X
+# para que, al añadir una nueva cría, los coeficientes se actualicen en O(p^2) (fórmula de Sherman-Morrison)
+# sin volver a entrenar con todo el conjunto de datos.
+# Las entradas se escalan (desviación típica del entrenamiento inicial), ya que las células somáticas
+# (~10^5) y los porcentajes (~10^-1) tienen órdenes de magnitud muy distintos.
+class ModeloCria:
+
+    def fit(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        self.escala = x.std(axis=0)
+        self.escala[self.escala == 0] = 1.0
+        z = x / self.escala
+
+        self.n = len(z)
+        self.media_z = z.mean(axis=0)
+        self.media_y = y.mean(axis=0)
+        z_centrada = z - self.media_z
+        self.szz = z_centrada.T @ z_centrada
+        self.szy = z_centrada.T @ (y - self.media_y)
+        self.inversa_szz = np.linalg.pinv(self.szz)
+        self._actualizar_coeficientes()
+        return self
+
+    def actualizar(self, x_fila, y_fila):
+        # Se añade una nueva fila (cría) al modelo en O(p^2).
+        z = np.asarray(x_fila, dtype=float) / self.escala
+        y = np.asarray(y_fila, dtype=float)
+
+        self.n += 1
+        factor = (self.n - 1) / self.n
+        dz = z - self.media_z
+        dy = y - self.media_y
+        self.media_z = self.media_z + dz / self.n
+        self.media_y = self.media_y + dy / self.n
+        self.szz = self.szz + factor * np.outer(dz, dz)
+        self.szy = self.szy + factor * np.outer(dz, dy)
+
+        # Sherman-Morrison: (A + u u^T)^-1 = A^-1 - (A^-1 u)(A^-1 u)^T / (1 + u^T A^-1 u)
+        u = np.sqrt(factor) * dz
+        inversa_u = self.inversa_szz @ u
+        self.inversa_szz = self.inversa_szz - np.outer(inversa_u, inversa_u) / (1.0 + u @ inversa_u)
+        self._actualizar_coeficientes()
+        return self
+
+    def _actualizar_coeficientes(self):
+        # Mismos atributos que LinearRegression: coef_ (salidas x entradas) e intercept_ (salidas).
+        beta_z = self.inversa_szz @ self.szy
+        self.coef_ = (beta_z / self.escala[:, None]).T
+        self.intercept_ = self.media_y - self.media_z @ beta_z
+
+    def predict(self, x):
+        return np.asarray(x, dtype=float) @ self.coef_.T + self.intercept_
+
+
+def comprobar_consistencia(modelo, x, y, tolerancia=1e-6):
+    # Se comprueba que el modelo (actualizado de manera incremental) coincide con un entrenamiento completo
+    # por mínimos cuadrados sobre los mismos datos. Devuelve True si las predicciones coinciden.
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_con_termino_independiente = np.hstack([np.ones((len(x), 1)), x])
+    referencia = np.linalg.lstsq(x_con_termino_independiente, y, rcond=None)[0]
+    diferencia = np.abs(modelo.predict(x) - x_con_termino_independiente @ referencia).max(axis=0)
+    return bool(np.all(diferencia <= tolerancia * np.maximum(1.0, np.abs(y).max(axis=0))))
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Registro del modelo
+# --------------------------------------------------------------------------------------------------------------
+# El modelo se entrena una única vez por proceso (worker) y se guarda en memoria junto al conjunto de datos.
+# Solamente se vuelve a entrenar cuando cambia el conjunto de datos (fecha de modificación o tamaño del .csv, o
+# número de filas y último identificador de la tabla EntrenamientoCria) o cuando se invalida de manera
+# explícita (invalidar_modelo()).
+# Así, cada simulación solo paga el coste de la predicción y no el de leer el .csv y entrenar.
+# Las crías que se añaden solo actualizan el modelo (O(p^2)) y se guardan en "pendientes": se añaden al conjunto
+# de datos de una sola vez cuando se pide (obtener_modelo), no con cada cría.
+# Cada CRIAS_ENTRE_COMPROBACIONES crías añadidas, se compara el modelo con un entrenamiento completo
+# (comprobar_consistencia_modelo) y, si no coincide (ej: errores de redondeo acumulados), se vuelve a entrenar.
+_registro_modelo = {
+    "firma": None, # Identifica la versión del conjunto de datos con la que se ha entrenado el modelo.
+    "datos": None, # Conjunto de datos (DataFrame) ya cargado.
+    "pendientes": [], # Crías añadidas al modelo que todavía no están en "datos".
+    "actualizaciones": 0, # Crías añadidas desde la última comprobación del modelo.
+    "modelo": None, # Modelo ya entrenado.
+}
+_bloqueo_modelo = threading.Lock()
+CRIAS_ENTRE_COMPROBACIONES = 1000
+
+
+def obtener_ruta_csv():
+    # Se puede indicar otra ruta en settings.py (SIMULACION_CRIA_CSV). Si no, se usa el .csv de la misma carpeta.
+    return getattr(settings, 'SIMULACION_CRIA_CSV', os.path.join(
+        settings.BASE_DIR, 'backend_django', 'ganaderiaBovina', 'cria_ganado_dataset_05_03_25.csv'))
+
+
+def obtener_origen_datos():
+    return getattr(settings, 'SIMULACION_CRIA_ORIGEN', ORIGEN_CSV)
+
+
+def _firma_csv(ruta_csv):
+    # La firma cambia si se modifica el archivo (fecha de modificación en nanosegundos y tamaño).
+    estado = os.stat(ruta_csv)
+    return ruta_csv, estado.st_mtime_ns, estado.st_size
+
+
+def _firma_conjunto_datos():
+    # Identifica la versión actual del conjunto de datos (según su origen).
+    if obtener_origen_datos() == ORIGEN_BD:
+        resumen = EntrenamientoCria.objects.aggregate(filas=Count('id'), ultimo=Max('id'))
+        return ORIGEN_BD, resumen['filas'], resumen['ultimo']
+    return _firma_csv(obtener_ruta_csv())
+
+
+def _cargar_conjunto_datos():
+    # Se carga el conjunto de datos de entrenamiento (DataFrame con las mismas columnas que el .csv).
+    if obtener_origen_datos() == ORIGEN_BD:
+        columnas = ['id_vaca', 'id_toro', 'id_cria'] + COLUMNAS_SALIDA + COLUMNAS_ENTRADA
+        filas = EntrenamientoCria.objects.order_by('id').values_list(*columnas)
+        return pd.DataFrame.from_records(list(filas), columns=columnas)
+    return _cargar_csv(obtener_ruta_csv())
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Caché binaria del .csv
+# --------------------------------------------------------------------------------------------------------------
+# Para no tener que leer el .csv como texto cada vez que arranca un worker, se guarda una copia binaria
+# (NumPy .npy) en una carpeta junto al .csv ("<nombre del csv>.cache/"):
+# - rasgos.npy: matriz float64 (en orden de columnas) con todas las características; cada columna es un rasgo.
+# - ids.npy: códigos de la vaca, el toro y la cría.
+# - meta.json: firma del .csv con la que se generó la caché y nombre de las columnas de cada matriz.
+# Las matrices se abren con "mmap" (sin copiar ni interpretar texto). Si cambia el .csv, se vuelve a generar.
+# Se puede desactivar con SIMULACION_CRIA_CACHE = False en settings.py.
+COLUMNAS_IDS = ['id_vaca', 'id_toro', 'id_cria']
 
-        # Columnas usadas para el DataFrame
-        columnas = ['cs_vaca', 'pl_vaca', 'pa_vaca', 'u_vaca', 'g_vaca', 'pr_vaca',
-                    'cs_toro', 'pl_toro', 'pa_toro', 'u_toro', 'g_toro', 'pr_toro']
 
-        # Se crean las entradas para la predicción (características de la vaca y el toro)
-        x_input = pd.DataFrame([[
-            vaca['cs_vaca'], vaca['pl_vaca'], vaca['pa_vaca'], vaca['u_vaca'], vaca['g_vaca'], vaca['pr_vaca'],
-            toro['cs_toro'], toro['pl_toro'], toro['pa_toro'], toro['u_toro'], toro['g_toro'], toro['pr_toro']
-        ]], columns=columnas)
-
-        # Se predicen las características de la cría
-        pred = modelo.predict(x_input)[0]
-
-        # Se realiza el ajuste de las predicciones (dependiendo el atributo que se desea predecir)
-        atributos_cria_futura = {
-            'celulas_somaticas': np.clip(pred[0], 50000, 2000000),
-            'produccion_leche': np.clip(pred[1], 0, 200000),
-            'calidad_patas': np.clip(pred[2], 1, 9),
-            'calidad_ubres': np.clip(pred[3], 1, 9),
-            'grasa': np.clip(pred[4], 2.5, 6),
-            'proteinas': np.clip(pred[5], 2.8, 4),
+def obtener_ruta_cache(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".cache"
+
+
+def _cargar_csv(ruta_csv):
+    if not getattr(settings, 'SIMULACION_CRIA_CACHE', True):
+        return pd.read_csv(ruta_csv, delimiter=";")
+
+    firma = list(_firma_csv(ruta_csv)[1:])
+    crias_df = _leer_cache(ruta_csv, firma)
+    if crias_df is None:
+        crias_df = pd.read_csv(ruta_csv, delimiter=";")
+        _guardar_cache(ruta_csv, firma, crias_df)
+    return crias_df
+
+
+def _leer_cache(ruta_csv, firma):
+    # Devuelve el conjunto de datos desde la caché o None si no existe o no corresponde con el .csv actual.
+    ruta_cache = obtener_ruta_cache(ruta_csv)
+    try:
+        with open(os.path.join(ruta_cache, "meta.json"), encoding="utf-8") as fichero:
+            meta = json.load(fichero)
+        if meta["firma"] != firma:
+            return None
+        rasgos = np.load(os.path.join(ruta_cache, "rasgos.npy"), mmap_mode="r")
+        ids = np.load(os.path.join(ruta_cache, "ids.npy"), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+
+    crias_df = pd.DataFrame(rasgos, columns=meta["columnas_rasgos"], copy=False)
+    for i, columna in enumerate(meta["columnas_ids"]):
+        crias_df.insert(i, columna, ids[:, i].astype(str))
+    return crias_df
+
+
+def _guardar_cache(ruta_csv, firma, crias_df):
+    # Se guarda la caché (primero en archivos temporales y luego se renombran, para que otro worker nunca
+    # lea una caché a medias). Si no se puede escribir (ej: carpeta de solo lectura), se sigue sin caché.
+    ruta_cache = obtener_ruta_cache(ruta_csv)
+    columnas_ids = [columna for columna in COLUMNAS_IDS if columna in crias_df.columns]
+    columnas_rasgos = [columna for columna in crias_df.columns if columna not in columnas_ids]
+    try:
+        os.makedirs(ruta_cache, exist_ok=True)
+        sufijo = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        archivos = {
+            "rasgos.npy": np.asfortranarray(crias_df[columnas_rasgos].to_numpy(dtype=np.float64)),
+            "ids.npy": crias_df[columnas_ids].to_numpy(dtype=str),
         }
+        for nombre, matriz in archivos.items():
+            with open(os.path.join(ruta_cache, nombre + sufijo), "wb") as fichero:
+                np.save(fichero, matriz)
+            os.replace(os.path.join(ruta_cache, nombre + sufijo), os.path.join(ruta_cache, nombre))
+
+        # meta.json se escribe el último: solo se usa la caché si la firma coincide.
+        with open(os.path.join(ruta_cache, "meta.json" + sufijo), "w", encoding="utf-8") as fichero:
+            json.dump({"firma": firma, "columnas_rasgos": columnas_rasgos, "columnas_ids": columnas_ids}, fichero)
+        os.replace(os.path.join(ruta_cache, "meta.json" + sufijo), os.path.join(ruta_cache, "meta.json"))
+    except (OSError, ValueError):
+        pass
+
+
+def _entrenar_si_es_necesario(firma):
+    # Se entrena el modelo si no está en memoria o si ha cambiado el conjunto de datos (con _bloqueo_modelo).
+    if _registro_modelo["modelo"] is None or _registro_modelo["firma"] != firma:
+        # Se carga el conjunto de datos (.csv o tabla EntrenamientoCria)
+        crias_df = _cargar_conjunto_datos()
+
+        # Se selecciona el modelo de aprendizaje (Regresión Lineal) y se entrena.
+        modelo = ModeloCria()
+        modelo.fit(crias_df[COLUMNAS_ENTRADA].to_numpy(dtype=float), crias_df[COLUMNAS_SALIDA].to_numpy(dtype=float))
+
+        _registro_modelo["firma"] = firma
+        _registro_modelo["datos"] = crias_df
+        _registro_modelo["pendientes"] = []
+        _registro_modelo["actualizaciones"] = 0
+        _registro_modelo["modelo"] = modelo
+    return _registro_modelo["modelo"]
+
+
+def obtener_modelo_entrenado():
+    # Devuelve solo el modelo entrenado (para las simulaciones, que no necesitan el conjunto de datos).
+    firma = _firma_conjunto_datos()
+    with _bloqueo_modelo:
+        return _entrenar_si_es_necesario(firma)
+
+
+def obtener_modelo():
+    # Devuelve el conjunto de datos (con las crías añadidas) y el modelo entrenado.
+    firma = _firma_conjunto_datos()
+
+    with _bloqueo_modelo:
+        modelo = _entrenar_si_es_necesario(firma)
+        if _registro_modelo["pendientes"]:
+            datos = _registro_modelo["datos"]
+            nuevas = pd.DataFrame(_registro_modelo["pendientes"], columns=datos.columns)
+            _registro_modelo["datos"] = pd.concat([datos, nuevas], ignore_index=True)
+            _registro_modelo["pendientes"] = []
+        return _registro_modelo["datos"], modelo
+
+
+def comprobar_consistencia_modelo():
+    # Se compara el modelo del registro (con las crías añadidas de manera incremental) con un entrenamiento
+    # completo sobre el conjunto de datos actual.
+    crias_df, modelo = obtener_modelo()
+    return comprobar_consistencia(modelo, crias_df[COLUMNAS_ENTRADA].to_numpy(dtype=float),
+                                  crias_df[COLUMNAS_SALIDA].to_numpy(dtype=float))
+
+
+def invalidar_modelo():
+    # Obliga a que la próxima simulación vuelva a cargar el .csv y a entrenar el modelo.
+    with _bloqueo_modelo:
+        _registro_modelo["firma"] = None
+        _registro_modelo["datos"] = None
+        _registro_modelo["pendientes"] = []
+        _registro_modelo["actualizaciones"] = 0
+        _registro_modelo["modelo"] = None
+
+
+def predecir_crias(modelo, x):
+    # Se predicen de una sola vez las características de todas las crías (una fila de "x" por cada pareja vaca-toro)
+    # y se ajustan las predicciones a los rangos permitidos de cada atributo (columna a columna).
+    return np.clip(modelo.predict(x), LIMITES_INFERIORES, LIMITES_SUPERIORES)
+
+
+def simular_cria_optima(id_vacas, id_toro, atributo_prioridad):
 
-        # Se almacena el resultado: la combinación de vaca, toro y el índice combinado
-        resultados.append({
-            'id_vaca': vaca['id_vaca'],
-            'id_toro': toro['id_toro'],
-            'atributos': atributos_cria_futura,
-            'valor_prioridad': atributos_cria_futura[atributo_prioridad]
-        })
-
-    # Se ordenan las crías por el valor más alto del atributo que se ha querido potenciar (de mayor a menor)
-    resultados_ordenados = sorted(resultados, key=lambda r: r['valor_prioridad'], reverse=True)
-    print(" ID vacas recibidas:", id_vacas)
-    print(" ID toro recibido:", id_toro)
-    print(" Vacas encontradas en el CSV:", crias_df[crias_df['id_vaca'].isin(id_vacas)].shape[0])
-    print(" Toro encontrado en el CSV:", crias_df[crias_df['id_toro'] == id_toro].shape[0])
+    # Se obtiene el modelo ya entrenado (Regresión Lineal) del registro.
+    modelo = obtener_modelo_entrenado()
+
+    # Se obtienen las características de las vacas y del toro seleccionados de la base de datos.
+    codigos_vacas, rasgos_vacas = obtener_rasgos_vacas(id_vacas)
+    _, rasgos_toro = obtener_rasgos_toros([id_toro])
+    logger.debug("Simulación de crías: %d vacas pedidas, %d encontradas; toro %s encontrado: %s.",
+                 len(id_vacas), len(codigos_vacas), id_toro, bool(len(rasgos_toro)))
+
+    if not codigos_vacas or not len(rasgos_toro):
+        return None
+
+    # Se construye la matriz de entrada: características de cada vaca junto a las del toro indicado.
+    x = np.hstack([rasgos_vacas, np.broadcast_to(rasgos_toro[0], (len(rasgos_vacas), len(COLUMNAS_TORO)))])
+
+    # Se predicen las características de todas las crías en una única llamada al modelo.
+    crias = predecir_crias(modelo, x)
+
+    # Se escoge la cría con el valor más alto del atributo que se ha querido potenciar.
+    mejor = int(np.argmax(crias[:, COLUMNAS_SALIDA.index(atributo_prioridad)]))
+    atributos_cria_futura = {atributo: float(valor) for atributo, valor in zip(COLUMNAS_SALIDA, crias[mejor])}
 
     # Se devuelve el resultado de la cría más óptima dado el atributo que se ha querido mejorar.
-    return resultados_ordenados[0] if resultados_ordenados else None
+    return {
+        'id_vaca': codigos_vacas[mejor],
+        'id_toro': id_toro,
+        'atributos': atributos_cria_futura,
+        'valor_prioridad': atributos_cria_futura[atributo_prioridad]
+    }
+
+
+# Las características de las vacas y los toros se obtienen de la base de datos (Animal y Toro), así se pueden
+# simular también los animales que se han dado de alta en la aplicación (y que no están en el conjunto de datos).
+# Se hace una única consulta (values_list) por cada tipo de animal y se devuelven en el orden en el que se han pedido.
+def _obtener_rasgos(consulta, codigos, campos):
+    filas = {fila[0]: fila[1:] for fila in consulta.filter(codigo__in=codigos).values_list('codigo', *campos)}
+    encontrados = [codigo for codigo in dict.fromkeys(codigos) if codigo in filas]
+    rasgos = np.array([filas[codigo] for codigo in encontrados], dtype=float).reshape(len(encontrados), len(campos))
+    return encontrados, rasgos
+
+
+def obtener_rasgos_vacas(id_vacas):
+    # Devuelve los códigos de las vacas encontradas y la matriz con sus características (una fila por vaca).
+    return _obtener_rasgos(Animal.objects, id_vacas, CAMPOS_VACA)
+
+
+def obtener_rasgos_toros(id_toros):
+    # Devuelve los códigos de los toros encontrados y la matriz con sus características (una fila por toro).
+    return _obtener_rasgos(Toro.objects, id_toros, CAMPOS_TORO)
+
+
+# Número de vacas que se predicen en cada llamada al modelo (limita la memoria de la matriz de entrada).
+VACAS_POR_BLOQUE = 500
+
+
+def calcular_matriz_cria(id_vacas, id_toros, progreso=None):
+    # Se predicen las crías de todas las parejas (vaca, toro), por bloques de vacas.
+    # Devuelve los códigos de las vacas y toros encontrados y una matriz (vacas x toros x atributos de la cría).
+    # "progreso" (opcional) se llama con el número de vacas calculadas y el total de vacas después de cada bloque.
+    modelo = obtener_modelo_entrenado()
+    codigos_vacas, rasgos_vacas = obtener_rasgos_vacas(id_vacas)
+    codigos_toros, rasgos_toros = obtener_rasgos_toros(id_toros)
+
+    num_vacas, num_toros = len(codigos_vacas), len(codigos_toros)
+    crias = np.empty((num_vacas, num_toros, len(COLUMNAS_SALIDA)))
+    if not num_vacas or not num_toros:
+        return codigos_vacas, codigos_toros, crias
+
+    for inicio in range(0, num_vacas, VACAS_POR_BLOQUE):
+        bloque = rasgos_vacas[inicio:inicio + VACAS_POR_BLOQUE]
+        # Fila "i * num_toros + j" = vaca "i" (del bloque) con toro "j".
+        x = np.hstack([np.repeat(bloque, num_toros, axis=0), np.tile(rasgos_toros, (len(bloque), 1))])
+        crias[inicio:inicio + len(bloque)] = predecir_crias(modelo, x).reshape(len(bloque), num_toros, len(COLUMNAS_SALIDA))
+        if progreso:
+            progreso(inicio + len(bloque), num_vacas)
+    return codigos_vacas, codigos_toros, crias
+
+
+def _mejores_indices(valores, k):
+    # Índices de los "k" valores más altos de cada fila (de mayor a menor) sin ordenar la fila completa.
+    k = min(k, valores.shape[1])
+    mejores = np.argpartition(-valores, k - 1, axis=1)[:, :k]
+    orden = np.argsort(-np.take_along_axis(valores, mejores, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(mejores, orden, axis=1)
+
+
+def simular_matriz_cria(id_vacas, id_toros, atributo_prioridad, top_k=3, progreso=None):
+    # Se puntúan todas las vacas con todos los toros y se devuelven las "top_k" mejores crías
+    # para cada vaca (mejores toros) y para cada toro (mejores vacas) según el atributo que se quiere potenciar.
+    codigos_vacas, codigos_toros, crias = calcular_matriz_cria(id_vacas, id_toros, progreso)
+    indice_atributo = COLUMNAS_SALIDA.index(atributo_prioridad)
+
+    def resultado(i, j):
+        return {
+            'id_vaca': codigos_vacas[i],
+            'id_toro': codigos_toros[j],
+            'atributos': {atributo: float(valor) for atributo, valor in zip(COLUMNAS_SALIDA, crias[i, j])},
+            'valor_prioridad': float(crias[i, j, indice_atributo]),
+        }
+
+    por_vaca = []
+    por_toro = []
+    if codigos_vacas and codigos_toros:
+        valores = crias[:, :, indice_atributo]
+        mejores_toros = _mejores_indices(valores, top_k)
+        mejores_vacas = _mejores_indices(valores.T, top_k)
+        por_vaca = [{'id_vaca': codigo, 'mejores_crias': [resultado(i, j) for j in mejores_toros[i]]}
+                    for i, codigo in enumerate(codigos_vacas)]
+        por_toro = [{'id_toro': codigo, 'mejores_crias': [resultado(i, j) for i in mejores_vacas[j]]}
+                    for j, codigo in enumerate(codigos_toros)]
+
+    vacas_encontradas, toros_encontrados = set(codigos_vacas), set(codigos_toros)
+    return {
+        'atributo_prioridad': atributo_prioridad,
+        'vacas_no_encontradas': [codigo for codigo in id_vacas if codigo not in vacas_encontradas],
+        'toros_no_encontrados': [codigo for codigo in id_toros if codigo not in toros_encontrados],
+        'por_vaca': por_vaca,
+        'por_toro': por_toro,
+    }
+
+
+def asignar_toros_optimos(id_vacas, dosis_toros, atributo_prioridad, progreso=None):
+    # Se asigna un toro a cada vaca maximizando la suma del atributo que se quiere potenciar,
+    # sin usar más dosis de semen de las que tiene cada toro (dosis_toros: {codigo_toro: cantidad_semen}).
+    # Se resuelve como un problema de asignación: cada toro aparece tantas veces (columnas) como dosis
+    # puede usar, por lo que cada columna se asigna como mucho a una vaca.
+    toros_con_dosis = [codigo for codigo, dosis in dosis_toros.items() if dosis and dosis > 0]
+    codigos_vacas, codigos_toros, crias = calcular_matriz_cria(id_vacas, toros_con_dosis, progreso)
+    indice_atributo = COLUMNAS_SALIDA.index(atributo_prioridad)
 
+    asignaciones = []
+    dosis_restantes = {codigo: dosis_toros[codigo] for codigo in codigos_toros}
+    if codigos_vacas and codigos_toros:
+        # Un toro nunca necesita más dosis que vacas hay que asignar.
+        capacidades = np.minimum([dosis_toros[codigo] for codigo in codigos_toros], len(codigos_vacas))
+        columnas = np.repeat(np.arange(len(codigos_toros)), capacidades)
+        filas, huecos = linear_sum_assignment(crias[:, columnas, indice_atributo], maximize=True)
+
+        for i, hueco in zip(filas, huecos):
+            j = columnas[hueco]
+            dosis_restantes[codigos_toros[j]] -= 1
+            asignaciones.append({
+                'id_vaca': codigos_vacas[i],
+                'id_toro': codigos_toros[j],
+                'atributos': {atributo: float(valor) for atributo, valor in zip(COLUMNAS_SALIDA, crias[i, j])},
+                'valor_prioridad': float(crias[i, j, indice_atributo]),
+            })
+
+    vacas_asignadas = {asignacion['id_vaca'] for asignacion in asignaciones}
+    vacas_encontradas = set(codigos_vacas)
+    return {
+        'atributo_prioridad': atributo_prioridad,
+        'asignaciones': asignaciones,
+        'valor_total': float(sum(asignacion['valor_prioridad'] for asignacion in asignaciones)),
+        # Vacas encontradas que no se han podido asignar por falta de dosis.
+        'vacas_sin_toro': [codigo for codigo in codigos_vacas if codigo not in vacas_asignadas],
+        'vacas_no_encontradas': [codigo for codigo in id_vacas if codigo not in vacas_encontradas],
+        'dosis_restantes': dosis_restantes,
+    }
+
+
+def ejecutar_simulacion_matriz(parametros, progreso=None):
+    # Se realiza la simulación de la matriz de crías (vista SimulacionCriaMatrizView o trabajo en segundo plano)
+    # con los parámetros ya validados: codigo_vacas, codigo_toros, atributo_prioridad, top_k y modo.
+    # Devuelve la clave de la respuesta ("matriz_cria" o "asignacion_cria") y el resultado.
+    # Lanza ValueError si no se ha podido calcular ninguna cría.
+    vacas = parametros["codigo_vacas"]
+    toros = parametros.get("codigo_toros")
+    atributo = parametros["atributo_prioridad"]
+
+    # Si no se indican toros, se usan todos los toros vivos.
+    if not toros:
+        toros = list(Toro.objects.filter(estado='Vivo').values_list('codigo', flat=True))
+
+    if parametros.get("modo", "ranking") == "asignacion":
+        # Se obtiene la cantidad de semen que le queda a cada toro.
+        dosis_toros = dict(Toro.objects.filter(codigo__in=toros).values_list('codigo', 'cantidad_semen'))
+        resultado = asignar_toros_optimos(vacas, dosis_toros, atributo, progreso)
+        if not resultado["asignaciones"]:
+            raise ValueError("No se pudo asignar ningún toro (compruebe la cantidad de semen).")
+        return "asignacion_cria", resultado
+
+    resultado = simular_matriz_cria(vacas, toros, atributo, parametros.get("top_k", 3), progreso)
+    if not resultado["por_vaca"]:
+        raise ValueError("No se pudo calcular ninguna cría.")
+    return "matriz_cria", resultado
+
+
+# Bloqueo para que dos hilos del mismo proceso no escriban a la vez en el .csv.
+_bloqueo_csv = threading.Lock()
+
+
+@contextmanager
+def _bloquear_csv(fichero):
+    # Se bloquea el archivo de manera exclusiva para que dos procesos (workers) no escriban a la vez
+    # y no se pierda ninguna fila.
+    with _bloqueo_csv:
+        if fcntl:
+            fcntl.flock(fichero.fileno(), fcntl.LOCK_EX)
+        else:
+            fichero.seek(0)
+            msvcrt.locking(fichero.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fichero.fileno(), fcntl.LOCK_UN)
+            else:
+                fichero.seek(0)
+                msvcrt.locking(fichero.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 def agregar_y_reentrenar_cria(nueva_cria):
@@ -92,16 +536,126 @@ def agregar_y_reentrenar_cria(nueva_cria):
     # - cs_vaca, pl_vaca, pa_vaca, u_vaca, g_vaca, pr_vaca
     # - cs_toro, pl_toro, pa_toro, u_toro, g_toro, pr_toro
 
-    ruta_csv = os.path.join(settings.BASE_DIR, 'backend_django', 'ganaderiaBovina', 'cria_ganado_dataset_05_03_25.csv')
+    # La cría debe tener todos los datos numéricos del modelo. Si no, no se añade (el conjunto quedaría incompleto).
+    try:
+        x_fila = [float(nueva_cria[columna]) for columna in COLUMNAS_ENTRADA]
+        y_fila = [float(nueva_cria[columna]) for columna in COLUMNAS_SALIDA]
+    except (KeyError, TypeError, ValueError):
+        return False
+    # También debe tener los códigos de la madre, del padre y de la cría (ej: "V-1", "T-1", "C-1").
+    if not all(isinstance(nueva_cria.get(columna), str) and nueva_cria[columna].strip()
+               for columna in COLUMNAS_CODIGOS):
+        return False
+
+    if obtener_origen_datos() == ORIGEN_BD:
+        return _agregar_cria_bd(nueva_cria, x_fila, y_fila)
+
+    ruta_csv = obtener_ruta_csv()
+
+    # Se añade la nueva cría al final del archivo (sin leer ni volver a escribir el conjunto de datos completo).
+    # "a+b": se puede leer desde cualquier posición, pero siempre se escribe al final del archivo.
+    with open(ruta_csv, "a+b") as fichero, _bloquear_csv(fichero):
+        # Se lee la cabecera para escribir los campos en el mismo orden que las columnas del .csv.
+        fichero.seek(0)
+        columnas = fichero.readline().decode("utf-8").strip().split(";")
+
+        # Si la última fila no termina en salto de línea, se añade antes de la nueva fila.
+        fichero.seek(0, os.SEEK_END)
+        salto_inicial = b""
+        if fichero.tell() > 0:
+            fichero.seek(-1, os.SEEK_END)
+            if fichero.read(1) != b"\n":
+                salto_inicial = b"\n"
+
+        # Se convierte la nueva cría a una fila del .csv (los campos que no se indiquen quedan vacíos).
+        fila = io.StringIO()
+        csv.writer(fila, delimiter=";", lineterminator="\n").writerow(
+            ["" if nueva_cria.get(columna) is None else nueva_cria.get(columna) for columna in columnas])
+
+        # Se añade y se guarda esa fila al conjunto de datos.
+        firma_anterior = _firma_csv(ruta_csv)
+        fichero.write(salto_inicial + fila.getvalue().encode("utf-8"))
+        fichero.flush()
+        os.fsync(fichero.fileno())
+
+        # Se actualiza el modelo en memoria con la nueva cría (sin volver a entrenarlo con todo el .csv),
+        # de manera que la próxima simulación ya la tiene en cuenta.
+        _actualizar_modelo_con_cria(nueva_cria, x_fila, y_fila, firma_anterior, _firma_csv(ruta_csv))
+
+    return True
+
+
+def _agregar_cria_bd(nueva_cria, x_fila, y_fila):
+    # Se añade la nueva cría a la tabla EntrenamientoCria (si no estaba ya).
+    # Los códigos no pueden ser más largos que los campos de la tabla.
+    if any(len(nueva_cria[columna]) > EntrenamientoCria._meta.get_field(columna).max_length
+           for columna in COLUMNAS_CODIGOS):
+        return False
+    if EntrenamientoCria.objects.filter(id_cria=nueva_cria['id_cria']).exists():
+        return False
+
+    firma_anterior = _firma_conjunto_datos()
+    try:
+        # Si otra petición ha añadido la misma cría a la vez, no se añade dos veces (id_cria es único).
+        with transaction.atomic():
+            EntrenamientoCria.objects.create(
+                origen='API', **{columna: nueva_cria[columna] for columna in COLUMNAS_CODIGOS},
+                **dict(zip(COLUMNAS_ENTRADA, x_fila)), **dict(zip(COLUMNAS_SALIDA, y_fila))
+            )
+    except IntegrityError:
+        return False
+    _actualizar_modelo_con_cria(nueva_cria, x_fila, y_fila, firma_anterior, _firma_conjunto_datos())
+    return True
+
+
+def refrescar_entrenamiento_cria():
+    # Se vuelve a generar la tabla EntrenamientoCria a partir de las crías registradas (animales con madre y padre)
+    # y de las características de su madre (Animal) y su padre (Toro), con una única consulta.
+    # Solo se sustituyen las filas generadas a partir de los animales: las crías añadidas con la API se mantienen,
+    # salvo que ahora exista un animal con el mismo código (en ese caso, se usan los datos del animal).
+    # Devuelve el número de filas de la tabla.
+    crias = Animal.objects.filter(madre__isnull=False, padre__isnull=False).values_list(
+        'madre__codigo', 'padre__codigo', 'codigo',
+        *COLUMNAS_SALIDA,
+        *[f'madre__{campo}' for campo in CAMPOS_VACA],
+        *[f'padre__{campo}' for campo in CAMPOS_TORO],
+    ).order_by('id')
+
+    columnas = ['id_vaca', 'id_toro', 'id_cria'] + COLUMNAS_SALIDA + COLUMNAS_ENTRADA
+    filas = [
+        EntrenamientoCria(**{columna: valor if i < 3 else float(valor) for i, (columna, valor) in enumerate(zip(columnas, fila))})
+        for fila in crias.iterator(chunk_size=2000)
+    ]
+
+    with transaction.atomic():
+        EntrenamientoCria.objects.filter(origen='Animales').delete()
+        codigos = [fila.id_cria for fila in filas]
+        for inicio in range(0, len(codigos), 2000):
+            EntrenamientoCria.objects.filter(id_cria__in=codigos[inicio:inicio + 2000]).delete()
+        EntrenamientoCria.objects.bulk_create(filas, batch_size=2000)
+        num_filas = EntrenamientoCria.objects.count()
+
+    invalidar_modelo()
+    return num_filas
 
-    # Se carga el conjunto de datos actual.
-    df = pd.read_csv(ruta_csv, delimiter=";")
 
-    # Se convierte la nueva cría a un DataFrame de una fila.
-    nueva_fila = pd.DataFrame([nueva_cria])
+def _actualizar_modelo_con_cria(nueva_cria, x_fila, y_fila, firma_anterior, firma_nueva):
+    with _bloqueo_modelo:
+        modelo = _registro_modelo["modelo"]
+        # Si el modelo no estaba en memoria o se entrenó con otra versión del .csv (ej: otro worker ha añadido
+        # crías), se entrenará de nuevo con el .csv completo en la próxima simulación.
+        if modelo is None or _registro_modelo["firma"] != firma_anterior:
+            return
 
-    # Se añade y se guarda esa fila al conjunto de datos.
-    df = pd.concat([df, nueva_fila], ignore_index=True)
-    df.to_csv(ruta_csv, sep=";", index=False)
+        modelo.actualizar(x_fila, y_fila)
+        _registro_modelo["pendientes"].append([nueva_cria.get(columna) for columna in _registro_modelo["datos"].columns])
+        _registro_modelo["firma"] = firma_nueva
+        _registro_modelo["actualizaciones"] += 1
+        comprobar = _registro_modelo["actualizaciones"] >= CRIAS_ENTRE_COMPROBACIONES
+        if comprobar:
+            _registro_modelo["actualizaciones"] = 0
 
-    return True
\ No newline at end of file
+    if comprobar and not comprobar_consistencia_modelo():
+        logger.warning("El modelo de cría actualizado de manera incremental no coincide con un entrenamiento "
+                       "completo: se vuelve a entrenar.")
+        invalidar_modelo()
@@ -0,0 +1,35 @@
+# --------------------------------- stock.py: ---------------------------------
+# Funcionalidad: se encarga de actualizar las cantidades disponibles del inventario
+# (unidades de InventarioVT y cantidad de semen de Toro).
+# Las cantidades se modifican directamente en la base de datos con F() y solamente si hay cantidad
+# suficiente (ej: unidades__gte=1), en lugar de leer el valor, restarlo en Python y guardar toda la fila.
+# Así, dos peticiones a la vez no pueden usar la misma unidad (no se vende más de lo que hay).
+# Se debe llamar dentro de la misma transacción que la creación/modificación del elemento que usa el inventario.
+# -----------------------------------------------------------------------------------
+from django.db.models import Case, When, F, IntegerField
+
+
+def descontar(modelo, pk, campo, cantidad=1):
+    # Se resta "cantidad" al campo del elemento indicado. Devuelve False si no había cantidad suficiente.
+    return modelo.objects.filter(pk=pk, **{f"{campo}__gte": cantidad}).update(**{campo: F(campo) - cantidad}) == 1
+
+
+def devolver(modelo, pk, campo, cantidad=1):
+    # Se suma "cantidad" al campo del elemento indicado (ej: se cambia la vacuna de un suministro).
+    modelo.objects.filter(pk=pk).update(**{campo: F(campo) + cantidad})
+
+
+def descontar_lote(modelo, campo, cantidades):
+    # Se resta a cada elemento su cantidad ({pk: cantidad}) con una única actualización.
+    # Si algún elemento no tiene cantidad suficiente, no se modifica ninguno y se devuelven sus pk.
+    # Las filas quedan bloqueadas hasta el final de la transacción.
+    disponibles = dict(modelo.objects.select_for_update().filter(pk__in=list(cantidades)).values_list('pk', campo))
+    sin_stock = {pk for pk, cantidad in cantidades.items() if disponibles.get(pk, 0) < cantidad}
+    if not sin_stock:
+        modelo.objects.filter(pk__in=list(cantidades)).update(**{
+            campo: Case(
+                *[When(pk=pk, then=F(campo) - cantidad) for pk, cantidad in cantidades.items()],
+                output_field=IntegerField(),
+            )
+        })
+    return sin_stock
@@ -3,6 +3,9 @@
 # (ej: crear, modificar, eliminar, mostrar...)
 # -----------------------------------------------------------------------------------
 
+import csv
+import io
+
 import pytest
 from django.contrib.auth.models import User, Permission
 from rest_framework.test import APIClient
@@ -1266,3 +1269,267 @@ def test_filtrado_combinado_animales_por_tipo_y_calidad_ubres():
     assert response.status_code == 200
     assert len(response.data) == 1
     assert response.data[0]["nombre"] == "VacaBuena"
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de ANIMALES: CREACIÓN EN LOTE
+# --------------------------------------------------------------------------------------------------------------
+def datos_animal_lote(nombre, tipo="Vaca", **extra):
+    datos = {
+        "tipo": tipo, "estado": "Vacía" if tipo == "Vaca" else "Joven", "nombre": nombre,
+        "fecha_nacimiento": "2024-01-01", "celulas_somaticas": 100000, "produccion_leche": 10,
+        "calidad_patas": 7.25, "calidad_ubres": 6.5, "grasa": 4.0, "proteinas": 3.2,
+    }
+    datos.update(extra)
+    return datos
+
+
+# Se comprueba que se pueden crear varios animales a la vez con sus códigos (V-x y C-x).
+@pytest.mark.django_db
+def test_crear_animales_en_lote():
+    client = obtener_usuario_autenticado()
+    corral = Corral.objects.create(nombre="Corral 1")
+
+    datos = [
+        datos_animal_lote("Vaca A", corral=corral.id),
+        datos_animal_lote("Ternero A", tipo="Ternero", corral=corral.id),
+        datos_animal_lote("Vaca B", codigo="V-50", corral=corral.id),
+        datos_animal_lote("Vaca C", corral=corral.id),
+    ]
+    response = client.post("/api/animales/lote/", datos, format="json")
+
+    assert response.status_code == 201
+    assert [fila["codigo"] for fila in response.data] == ["V-51", "C-1", "V-50", "V-52"]
+    assert Animal.objects.count() == 4
+
+
+# Se comprueba que los nombres repetidos en el lote y los errores de cada animal se indican por posición.
+@pytest.mark.django_db
+def test_crear_animales_en_lote_con_errores():
+    client = obtener_usuario_autenticado()
+    corral = Corral.objects.create(nombre="Corral 1")
+
+    datos = [
+        datos_animal_lote("Vaca A", corral=corral.id),
+        datos_animal_lote("Vaca A", corral=corral.id),
+        datos_animal_lote("Vaca B", corral=corral.id, grasa=9),
+    ]
+    response = client.post("/api/animales/lote/", datos, format="json")
+
+    assert response.status_code == 400
+    errores = response.data["errores"]
+    assert [error["indice"] for error in errores] == [2]
+    assert "grasa" in errores[0]["errores"]
+
+    response = client.post("/api/animales/lote/", datos[:2], format="json")
+    assert response.status_code == 400
+    assert [error["indice"] for error in response.data["errores"]] == [0, 1]
+    assert not Animal.objects.exists()
+
+    # Si no se envía una lista, se muestra un mensaje de error.
+    response = client.post("/api/animales/lote/", datos[0], format="json")
+    assert response.status_code == 400
+
+
+# Se comprueba que un código o un nombre que ya existe se indica por posición y que el número de consultas
+# no depende del tamaño del lote.
+@pytest.mark.django_db
+def test_crear_animales_en_lote_consultas_constantes(django_assert_max_num_queries):
+    client = obtener_usuario_autenticado()
+    corral = Corral.objects.create(nombre="Corral 1")
+    # La primera vez se crea el contador de códigos.
+    client.post("/api/animales/lote/", [datos_animal_lote("Vaca 0", corral=corral.id)], format="json")
+
+    with django_assert_max_num_queries(25) as pocas:
+        response = client.post("/api/animales/lote/", [datos_animal_lote(f"Vaca {i}", corral=corral.id)
+                                                       for i in range(1, 5)], format="json")
+    assert response.status_code == 201
+    with django_assert_max_num_queries(25) as muchas:
+        response = client.post("/api/animales/lote/", [datos_animal_lote(f"Vaca {i}", corral=corral.id)
+                                                       for i in range(5, 45)], format="json")
+    assert response.status_code == 201
+    assert len(muchas) == len(pocas)
+
+    datos = [datos_animal_lote("Vaca 1", corral=corral.id), datos_animal_lote("Vaca nueva", codigo="V-3"),
+             datos_animal_lote("Vaca otra", corral=999)]
+    response = client.post("/api/animales/lote/", datos, format="json")
+    assert response.status_code == 400
+    errores = {error["indice"]: error["errores"] for error in response.data["errores"]}
+    assert list(errores) == [2]
+    assert "corral" in errores[2]
+
+    response = client.post("/api/animales/lote/", datos[:2], format="json")
+    errores = {error["indice"]: error["errores"] for error in response.data["errores"]}
+    assert errores == {0: {"nombre": ["Ya existe un animal (vaca/ternero) con este nombre."]},
+                       1: {"codigo": ["El código ya existe en el sistema."]}}
+    assert Animal.objects.count() == 45
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de ANIMALES: ELIMINACIÓN EN LOTE
+# --------------------------------------------------------------------------------------------------------------
+# Se comprueba que se pueden marcar varios animales como vendidos a la vez y que se indican los que fallan.
+@pytest.mark.django_db
+def test_eliminar_animales_en_lote(django_assert_max_num_queries):
+    client = obtener_usuario_autenticado()
+    corral = Corral.objects.create(nombre="Corral 1")
+    animales = [
+        Animal.objects.create(
+            nombre=f"Vaca {i}", tipo="Vaca", estado="Muerte" if i == 0 else "Vacía",
+            fecha_nacimiento="2025-06-01" if i == 1 else "2022-01-01", celulas_somaticas=100000,
+            produccion_leche=20.0, calidad_patas=Decimal("7.00"), calidad_ubres=Decimal("7.00"), grasa=4.0,
+            proteinas=3.5, corral=corral
+        )
+        for i in range(30)
+    ]
+    datos = {"animales": [animal.id for animal in animales] + [99999], "motivo": "vendida",
+             "fechaEliminacion": "2025-05-01", "comentario": "Venta"}
+
+    with django_assert_max_num_queries(12):
+        response = client.post("/api/animales/eliminar-lote/", datos, format="json")
+
+    assert response.status_code == 200
+    assert len(response.data["animales_eliminados"]) == 28
+    assert [error["id"] for error in response.data["animales_no_eliminados"]] == [animales[0].id, animales[1].id, 99999]
+
+    vendida = Animal.objects.get(id=animales[5].id)
+    assert vendida.estado == "Vendida"
+    assert str(vendida.fecha_eliminacion) == "2025-05-01"
+    assert vendida.comentario == "Venta"
+    assert vendida.corral is None
+    assert Animal.objects.get(id=animales[0].id).estado == "Muerte"
+
+
+# Se comprueba que el motivo y la fecha deben ser válidos.
+@pytest.mark.django_db
+def test_eliminar_animales_en_lote_datos_no_validos():
+    client = obtener_usuario_autenticado()
+
+    response = client.post("/api/animales/eliminar-lote/", {"animales": [1], "motivo": "ERROR"}, format="json")
+    assert response.status_code == 400
+
+    datos = {"animales": [1], "motivo": "MUERTE", "fechaEliminacion": "01/05/2025"}
+    response = client.post("/api/animales/eliminar-lote/", datos, format="json")
+    assert response.status_code == 400
+
+
+# Basta con el permiso de eliminar animales (no hace falta el de crear, aunque sea un POST). Si no se indica un
+# comentario, se mantiene el que tenía cada animal.
+@pytest.mark.django_db
+def test_eliminar_animales_en_lote_permisos_y_comentario():
+    user = User.objects.create_user(username="usuarioeliminar", password="usuarioeliminar1234")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    animal = Animal.objects.create(
+        nombre="Vaca con comentario", tipo="Vaca", estado="Vacía", fecha_nacimiento="2022-01-01",
+        celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+        calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, comentario="Cojea de la pata izquierda"
+    )
+    datos = {"animales": [animal.id], "motivo": "MUERTE", "fechaEliminacion": "2025-05-01"}
+
+    response = client.post("/api/animales/eliminar-lote/", datos, format="json")
+    assert response.status_code == 403
+
+    user.user_permissions.add(Permission.objects.get(codename="delete_animal"))
+    response = client.post("/api/animales/eliminar-lote/", datos, format="json")
+
+    assert response.status_code == 200
+    animal.refresh_from_db()
+    assert animal.estado == "Muerte"
+    assert animal.comentario == "Cojea de la pata izquierda"
+
+
+# Test donde se comprueba la paginación por cursor de los animales: por defecto se ordena por nombre (único) y se
+# respeta "?ordering=..." si se indica. El número máximo de elementos por página está limitado.
+@pytest.mark.django_db
+def test_listado_animales_paginacion_cursor():
+    client = obtener_usuario_autenticado()
+    for i in range(5):
+        Animal.objects.create(
+            nombre=f"Vaca {i}", tipo="Vaca", estado="Vacía", fecha_nacimiento="2022-01-01", celulas_somaticas=100000,
+            produccion_leche=20.0 + i, calidad_patas=Decimal("7.00"), calidad_ubres=Decimal("7.00"), grasa=4.0,
+            proteinas=3.5
+        )
+
+    response = client.get("/api/animales/?page_size=2")
+    assert response.status_code == 200
+    assert [fila["nombre"] for fila in response.data["results"]] == ["Vaca 0", "Vaca 1"]
+    assert response.data["previous"] is None
+
+    response = client.get(response.data["next"])
+    assert [fila["nombre"] for fila in response.data["results"]] == ["Vaca 2", "Vaca 3"]
+
+    response = client.get("/api/animales/?page_size=2&ordering=-produccion_leche")
+    assert [fila["nombre"] for fila in response.data["results"]] == ["Vaca 4", "Vaca 3"]
+
+    response = client.get("/api/animales/?page_size=100000")
+    assert len(response.data["results"]) == 5
+
+
+# Test donde se comprueba la exportación en CSV (con los mismos filtros que el listado y sin paginar).
+@pytest.mark.django_db
+def test_exportar_animales_csv():
+    client = obtener_usuario_autenticado()
+    for i in range(3):
+        Animal.objects.create(
+            nombre=f"Vaca exportada {i}", tipo="Vaca", estado="Vacía", fecha_nacimiento="2022-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0 + i, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5
+        )
+
+    response = client.get("/api/animales/?format=csv&produccion_leche__gte=21")
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"].startswith("text/csv")
+    filas = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert [fila["nombre"] for fila in filas] == ["Vaca exportada 1", "Vaca exportada 2"]
+    assert filas[0]["calidad_patas"] == "7.00"
+    assert filas[0]["corral"] == ""
+
+
+# Test donde se comprueba el árbol genealógico (ascendientes y descendientes) obtenido con una consulta recursiva.
+# Bisabuela -> abuela -> madre -> ternero, cada una con su toro. La madre tiene además otra cría.
+@pytest.mark.django_db
+def test_arbol_genealogico(django_assert_num_queries):
+    client = obtener_usuario_autenticado()
+
+    def crear(nombre, tipo="Vaca", madre=None, padre=None):
+        return Animal.objects.create(
+            nombre=nombre, tipo=tipo, estado="Vacía" if tipo == "Vaca" else "Joven", fecha_nacimiento="2022-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, madre=madre, padre=padre
+        )
+
+    toros = [Toro.objects.create(nombre=f"Toro árbol {i}", estado="Vivo", cantidad_semen=10,
+                                 transmision_leche=Decimal("1.5"), celulas_somaticas=Decimal("0.5"),
+                                 calidad_patas=Decimal("5.0"), calidad_ubres=Decimal("5.0"), grasa=0.1, proteinas=0.05)
+             for i in range(4)]
+    bisabuela = crear("Bisabuela", padre=toros[0])
+    abuela = crear("Abuela", madre=bisabuela, padre=toros[1])
+    madre = crear("Madre", madre=abuela, padre=toros[2])
+    ternero = crear("Ternero árbol", tipo="Ternero", madre=madre, padre=toros[3])
+    hermano = crear("Hermano árbol", tipo="Ternero", madre=madre, padre=toros[3])
+
+    # Usuario autenticado, el animal (get_object) y el árbol (1 consulta).
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/animales/{ternero.id}/arbol/?generaciones=2")
+
+    assert response.status_code == 200
+    nodos = {nodo["clave"]: nodo for nodo in response.data["nodos"]}
+    assert response.data["raiz"] == f"animal-{ternero.id}"
+    assert set(nodos) == {f"animal-{ternero.id}", f"animal-{madre.id}", f"animal-{abuela.id}",
+                          f"toro-{toros[3].id}", f"toro-{toros[2].id}"}
+    assert nodos[f"animal-{abuela.id}"]["generacion"] == 2
+    assert {"desde": f"animal-{madre.id}", "hasta": f"animal-{ternero.id}", "relacion": "madre"} in response.data["aristas"]
+    assert {"desde": f"toro-{toros[2].id}", "hasta": f"animal-{madre.id}", "relacion": "padre"} in response.data["aristas"]
+
+    response = client.get(f"/api/animales/{bisabuela.id}/descendientes/?generaciones=3")
+    assert response.status_code == 200
+    animales = {nodo["id"]: nodo["generacion"] for nodo in response.data["nodos"] if nodo["modelo"] == "animal"}
+    assert animales == {bisabuela.id: 0, abuela.id: -1, madre.id: -2, ternero.id: -3, hermano.id: -3}
+    assert f"toro-{toros[0].id}" not in {nodo["clave"] for nodo in response.data["nodos"]}
+    assert len(response.data["aristas"]) == 4 + 4  # madre y toro de cada descendiente
+
+    response = client.get(f"/api/animales/{ternero.id}/arbol/?generaciones=0")
+    assert response.status_code == 400
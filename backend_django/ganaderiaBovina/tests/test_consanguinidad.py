@@ -0,0 +1,106 @@
+# --------------------------------- test_consanguinidad.py: ---------------------------------
+# Funcionalidad: se encarga de comprobar el cálculo del coeficiente de consanguinidad
+# (ej: algoritmo, recálculo al crear o modificar animales, ranking de la API...)
+# -----------------------------------------------------------------------------------
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ganaderiaBovina.consanguinidad import coeficientes_consanguinidad
+from ganaderiaBovina.models import Animal, Toro
+
+
+def crear_toro(nombre):
+    return Toro.objects.create(nombre=nombre, estado="Vivo", cantidad_semen=10, transmision_leche=Decimal("1.5"),
+                               celulas_somaticas=Decimal("0.5"), calidad_patas=Decimal("5.0"),
+                               calidad_ubres=Decimal("5.0"), grasa=0.1, proteinas=0.05)
+
+
+def crear_animal(nombre, madre=None, padre=None, tipo="Vaca"):
+    return Animal.objects.create(
+        nombre=nombre, tipo=tipo, estado="Vacía" if tipo == "Vaca" else "Joven", fecha_nacimiento="2022-01-01",
+        celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+        calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, madre=madre, padre=padre
+    )
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de CONSANGUINIDAD: LÓGICA
+# --------------------------------------------------------------------------------------------------------------
+# Genealogía de ejemplo de Mrode (Linear Models for the Prediction of Animal Breeding Values, tabla 2.1):
+# 3 = 1 x 2, 4 = 1 x ?, 5 = 4 x 3, 6 = 5 x 2. Los animales 5 y 6 tienen un coeficiente de 0.125.
+# El orden de entrada no importa (los progenitores se ordenan antes que los hijos).
+def test_coeficientes_genealogia_de_ejemplo():
+    pedigri = {6: (5, 2), 5: (4, 3), 4: (1, None), 3: (1, 2), 2: (None, None), 1: (None, None)}
+
+    coeficientes = coeficientes_consanguinidad(pedigri)
+
+    assert coeficientes == {1: 0, 2: 0, 3: 0, 4: 0, 5: 0.125, 6: 0.125}
+
+
+# Un ciclo en la genealogía (datos erróneos) no bloquea el cálculo.
+def test_coeficientes_genealogia_con_ciclo():
+    coeficientes = coeficientes_consanguinidad({1: (None, 2), 2: (None, 1), 3: (1, 2)})
+    assert set(coeficientes) == {1, 2, 3}
+
+
+# El coeficiente se calcula al crear una cría y se recalcula (también en sus descendientes) al cambiar un progenitor.
+@pytest.mark.django_db
+def test_consanguinidad_incremental():
+    toro, otro_toro = crear_toro("Toro consanguinidad"), crear_toro("Otro toro consanguinidad")
+    hija = crear_animal("Hija del toro", padre=toro)
+    nieta = crear_animal("Nieta del toro", madre=hija, padre=toro)  # Hija de padre e hija.
+    bisnieta = crear_animal("Bisnieta del toro", madre=nieta, padre=toro, tipo="Ternero")
+
+    assert nieta.coeficiente_consanguinidad == 0.25
+    assert Animal.objects.get(id=bisnieta.id).coeficiente_consanguinidad == 0.375
+    assert Animal.objects.get(id=hija.id).coeficiente_consanguinidad == 0
+
+    hija = Animal.objects.get(id=hija.id)
+    hija.padre = otro_toro
+    hija.save()
+
+    assert Animal.objects.get(id=nieta.id).coeficiente_consanguinidad == 0
+    assert Animal.objects.get(id=bisnieta.id).coeficiente_consanguinidad == 0.25
+
+
+# El comando recalcula todos los animales (ej: si se han guardado con bulk_create).
+@pytest.mark.django_db
+def test_comando_calcular_consanguinidad():
+    toro = crear_toro("Toro comando")
+    hija = crear_animal("Hija comando", padre=toro)
+    nieta = crear_animal("Nieta comando", madre=hija, padre=toro)
+    Animal.objects.update(coeficiente_consanguinidad=0)
+
+    call_command("calcular_consanguinidad")
+
+    assert Animal.objects.get(id=nieta.id).coeficiente_consanguinidad == 0.25
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de CONSANGUINIDAD: API
+# --------------------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_ranking_consanguinidad():
+    user, _ = User.objects.get_or_create(username="usuarioconsanguinidad")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    toro = crear_toro("Toro ranking")
+    hija = crear_animal("Hija ranking", padre=toro)
+    nieta = crear_animal("Nieta ranking", madre=hija, padre=toro)
+    bisnieta = crear_animal("Bisnieta ranking", madre=nieta, padre=toro, tipo="Ternero")
+
+    response = client.get("/api/animales/ranking-consanguinidad/")
+    assert response.status_code == 200
+    assert [fila["id"] for fila in response.data] == [bisnieta.id, nieta.id]
+    assert response.data[0]["coeficiente_consanguinidad"] == 0.375
+
+    response = client.get("/api/animales/ranking-consanguinidad/?tipo=Vaca")
+    assert [fila["id"] for fila in response.data] == [nieta.id]
+
+    response = client.get(f"/api/animales/{nieta.id}/")
+    assert response.data["coeficiente_consanguinidad"] == 0.25
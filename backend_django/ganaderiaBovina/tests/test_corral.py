@@ -3,6 +3,8 @@
 # (ej: crear, modificar, eliminar, mostrar...)
 # -----------------------------------------------------------------------------------
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from ganaderiaBovina.models import Animal, Corral, Perfil
 from decimal import Decimal
@@ -430,3 +432,107 @@ def test_filtrado_corrales_por_rango_animales():
     assert "Corral Prueba 2" not in nombres
     assert "Corral Prueba 3" in nombres
     assert "Corral Prueba 4" not in nombres
+
+
+# Test para comprobar que se pueden mover varios animales a un corral con una única petición.
+@pytest.mark.django_db
+def test_mover_animales_a_corral(django_assert_max_num_queries):
+    client = obtener_usuario_autenticado()
+    origen = Corral.objects.create(nombre="Corral Origen")
+    destino = Corral.objects.create(nombre="Corral Destino")
+    animales = [
+        Animal.objects.create(
+            nombre=f"Vaca {i}", tipo="Vaca", estado="Vendida" if i == 0 else "Vacía", fecha_nacimiento="2022-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, corral=origen
+        )
+        for i in range(40)
+    ]
+    ids = [animal.id for animal in animales] + [99999]
+
+    # El número de consultas no depende del número de animales (permisos, corral, animales y actualización).
+    # El corral se obtiene sin contar ni obtener sus animales (sin GROUP BY ni prefetch).
+    with django_assert_max_num_queries(12) as consultas:
+        response = client.post(f"/api/corrales/{destino.id}/mover/", {"animales": ids}, format="json")
+    assert not any("GROUP BY" in consulta["sql"] for consulta in consultas.captured_queries)
+    tabla_animales = Animal._meta.db_table
+    assert sum(tabla_animales in consulta["sql"] for consulta in consultas.captured_queries) == 3
+
+    assert response.status_code == 200
+    assert response.data["cantidad_animales"] == 39
+    assert response.data["animales_no_movidos"] == [animales[0].id, 99999]
+    assert destino.animales.count() == 39
+    assert origen.animales.count() == 1 # El animal vendido no se mueve.
+
+
+# Test para comprobar que se debe indicar una lista de animales.
+@pytest.mark.django_db
+def test_mover_animales_a_corral_sin_lista():
+    client = obtener_usuario_autenticado()
+    destino = Corral.objects.create(nombre="Corral Destino")
+
+    response = client.post(f"/api/corrales/{destino.id}/mover/", {"animales": "1,2"}, format="json")
+    assert response.status_code == 400
+
+    response = client.post("/api/corrales/99999/mover/", {"animales": [1]}, format="json")
+    assert response.status_code == 404
+
+
+# Test para comprobar que para mover animales basta con el permiso de modificar animales (no el de crear corrales).
+@pytest.mark.django_db
+def test_mover_animales_a_corral_permisos():
+    user = User.objects.create_user(username="usuariomover", password="usuariomover1234")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    destino = Corral.objects.create(nombre="Corral Destino")
+    animal = Animal.objects.create(
+        nombre="Vaca a mover", tipo="Vaca", estado="Vacía", fecha_nacimiento="2022-01-01",
+        celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+        calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5
+    )
+
+    response = client.post(f"/api/corrales/{destino.id}/mover/", {"animales": [animal.id]}, format="json")
+    assert response.status_code == 403
+
+    user.user_permissions.add(Permission.objects.get(codename="change_animal"))
+    response = client.post(f"/api/corrales/{destino.id}/mover/", {"animales": [animal.id]}, format="json")
+
+    assert response.status_code == 200
+    assert Animal.objects.get(id=animal.id).corral_id == destino.id
+
+
+# Test para comprobar que el listado de corrales tiene el mismo número de consultas sin importar cuántos corrales
+# y animales haya (no se hace una consulta por cada corral).
+@pytest.mark.django_db
+def test_listado_corrales_numero_consultas_constante():
+    client = obtener_usuario_autenticado()
+
+    def crear_corrales(inicio, num_corrales):
+        for i in range(inicio, inicio + num_corrales):
+            corral = Corral.objects.create(nombre=f"Corral {i}")
+            for j in range(3):
+                Animal.objects.create(
+                    nombre=f"Vaca {i}-{j}", tipo="Vaca", estado="Vacía", fecha_nacimiento="2022-01-01",
+                    celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+                    calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, corral=corral
+                )
+
+    def consultas_listado(url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(consultas), response.data
+
+    crear_corrales(0, 2)
+    pocas, _ = consultas_listado("/api/corrales/")
+    crear_corrales(2, 10)
+    muchas, datos = consultas_listado("/api/corrales/")
+
+    assert pocas == muchas
+    assert len(datos) == 12
+    assert all(corral["cantidad_animales"] == 3 and len(corral["animales"]) == 3 for corral in datos)
+
+    # Sin la lista de animales, hay una consulta menos (no se obtienen los animales).
+    sin_animales, datos = consultas_listado("/api/corrales/?incluir_animales=false&min_animales=3")
+    assert sin_animales == muchas - 1
+    assert "animales" not in datos[0] and datos[0]["cantidad_animales"] == 3
@@ -0,0 +1,135 @@
+# --------------------------------- test_importacion.py: ---------------------------------
+# Funcionalidad: se encarga de comprobar la importación de archivos .csv con COPY (solo PostgreSQL)
+# (ej: validación de las filas, inserción, permisos de la API...)
+# -----------------------------------------------------------------------------------
+import io
+
+import pytest
+from django.contrib.auth.models import User, Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ganaderiaBovina.importacion import importar_csv, ErrorImportacion
+from ganaderiaBovina.models import Animal, Corral, ContadorCodigo
+
+solo_postgresql = pytest.mark.skipif(connection.vendor != "postgresql", reason="COPY solo existe en PostgreSQL.")
+
+CABECERA = ("codigo;tipo;estado;nombre;fecha_nacimiento;madre;corral;celulas_somaticas;produccion_leche;"
+            "calidad_patas;calidad_ubres;grasa;proteinas\n")
+
+
+def obtener_cliente(administrador=True):
+    # Se crea a un usuario (administrador o no)
+    user, _ = User.objects.get_or_create(username="usuarioimportacion")
+    if administrador:
+        grupo_admin, _ = Group.objects.get_or_create(name="Administrador")
+        user.groups.add(grupo_admin)
+
+    # Se autentica al usuario
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de IMPORTACIÓN: LÓGICA
+# --------------------------------------------------------------------------------------------------------------
+# Se importan vacas y terneros (la madre está en el mismo archivo). Si se repite, no se duplica nada.
+@solo_postgresql
+@pytest.mark.django_db
+def test_importar_animales():
+    Corral.objects.create(codigo="CORRAL-1", nombre="Corral 1")
+    datos = CABECERA + (
+        "V-500;Vaca;Vacía;Vaca importada;2020-01-01;;CORRAL-1;100000;25.5;7.5;6;4;3.5\n"
+        "C-900;Ternero;Joven;Ternero importado;2025-01-01;V-500;CORRAL-1;60000;0;5;5;3;3\n"
+    )
+
+    resultado = importar_csv("animales", io.StringIO(datos), ";")
+
+    assert resultado == {"filas": 2, "insertados": 2, "omitidos": 0}
+    ternero = Animal.objects.get(codigo="C-900")
+    assert ternero.madre.codigo == "V-500"
+    assert ternero.corral.codigo == "CORRAL-1"
+    assert ContadorCodigo.objects.get(prefijo="V").ultimo >= 500
+
+    assert importar_csv("animales", io.StringIO(datos), ";") == {"filas": 2, "insertados": 0, "omitidos": 2}
+
+
+# Si alguna fila no es válida no se importa ninguna y se indica la fila y el campo de cada error.
+@solo_postgresql
+@pytest.mark.django_db
+def test_importar_animales_con_errores():
+    datos = CABECERA + (
+        "V-501;Vaca;Vacía;Vaca válida;2020-01-01;;;100000;25;7;6;4;3.5\n"
+        "V-502;Vaca;Perdida;Vaca estado;2020-01-01;;;100000;25;7;6;4;3.5\n"
+        "C-503;Vaca;Vacía;Vaca rangos;2020-01-01;;CORRAL-99;10;-1;7;6;4;3.5\n"
+    )
+
+    with pytest.raises(ErrorImportacion) as error:
+        importar_csv("animales", io.StringIO(datos), ";")
+
+    errores = {(e["fila"], e["campo"]) for e in error.value.errores}
+    assert (3, "estado") in errores
+    assert {(4, "codigo"), (4, "corral"), (4, "celulas_somaticas"), (4, "produccion_leche")} <= errores
+    assert not any(fila == 2 for fila, _ in errores)
+    assert Animal.objects.count() == 0
+
+
+# Un nombre que ya tiene otro animal (con otro código) es un error, no una fila omitida.
+@solo_postgresql
+@pytest.mark.django_db
+def test_importar_animales_nombre_existente():
+    Animal.objects.create(codigo="V-1", tipo="Vaca", estado="Vacía", nombre="Vaca existente",
+                          fecha_nacimiento="2020-01-01", celulas_somaticas=100000, produccion_leche=25,
+                          calidad_patas=7, calidad_ubres=6, grasa=4, proteinas=3.5)
+    datos = CABECERA + (
+        "V-599;Vaca;Vacía;Vaca nueva;2020-01-01;;;100000;25;7;6;4;3.5\n"
+        "V-600;Vaca;Vacía;Vaca existente;2020-01-01;;;100000;25;7;6;4;3.5\n"
+    )
+
+    with pytest.raises(ErrorImportacion) as error:
+        importar_csv("animales", io.StringIO(datos), ";")
+
+    assert [(e["fila"], e["campo"]) for e in error.value.errores] == [(3, "nombre")]
+    assert Animal.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_importar_cabecera_no_valida():
+    if connection.vendor != "postgresql":
+        pytest.skip("COPY solo existe en PostgreSQL.")
+    with pytest.raises(ErrorImportacion, match="Columnas no válidas"):
+        importar_csv("animales", io.StringIO("codigo;color\n"), ";")
+    # Los campos calculados (no editables) tampoco se pueden importar.
+    with pytest.raises(ErrorImportacion, match="Columnas no válidas: coeficiente_consanguinidad"):
+        importar_csv("animales", io.StringIO(CABECERA.strip() + ";coeficiente_consanguinidad\n"), ";")
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de IMPORTACIÓN: API
+# --------------------------------------------------------------------------------------------------------------
+# Solo los administradores pueden importar datos.
+@pytest.mark.django_db
+def test_importar_api_solo_administradores():
+    client = obtener_cliente(administrador=False)
+    archivo = SimpleUploadedFile("animales.csv", CABECERA.encode())
+
+    response = client.post("/api/importar/animales/", {"archivo": archivo, "delimitador": ";"}, format="multipart")
+
+    assert response.status_code == 403
+
+
+# Con otra base de datos (ej: SQLite) se indica que la importación no está disponible.
+@pytest.mark.django_db
+def test_importar_api_sin_postgresql():
+    if connection.vendor == "postgresql":
+        pytest.skip("Solo con bases de datos distintas de PostgreSQL.")
+    client = obtener_cliente()
+    archivo = SimpleUploadedFile("animales.csv", CABECERA.encode())
+
+    response = client.post("/api/importar/animales/", {"archivo": archivo, "delimitador": ";"}, format="multipart")
+
+    assert response.status_code == 400
+    assert "PostgreSQL" in response.data["ERROR"]
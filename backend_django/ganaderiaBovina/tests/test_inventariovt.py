@@ -527,3 +527,21 @@ def test_filtrado_combinado_inventariovt_por_tipo_y_estado():
     assert response.status_code == 200
     assert len(response.data) == 1
     assert response.data[0]["nombre"] == "Vacuna Prueba 1"
+
+
+# Test donde se comprueba que los campos con opciones se filtran por igualdad si el valor es una opción
+# ("activa" no devuelve "Inactiva") y con icontains si es solo una parte del valor.
+@pytest.mark.django_db
+def test_filtrar_inventario_opcion_exacta():
+    client = obtener_usuario_autenticado()
+    InventarioVT.objects.create(nombre="Vacuna Activa", tipo="Vacuna", unidades=3, cantidad="Botella", estado="Activa")
+    InventarioVT.objects.create(nombre="Vacuna Inactiva", tipo="Vacuna", unidades=3, cantidad="Botella",
+                                estado="Inactiva")
+
+    response = client.get("/api/inventariovt/?estado=activa")
+    assert response.status_code == 200
+    assert [fila["nombre"] for fila in response.data] == ["Vacuna Activa"]
+
+    response = client.get("/api/inventariovt/?estado=ACTIV")
+    assert response.status_code == 200
+    assert len(response.data) == 2
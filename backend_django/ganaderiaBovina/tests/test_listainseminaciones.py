@@ -645,4 +645,109 @@ def test_filtrado_combinado_listainseminaciones_por_tipo_y_ruta():
 
     assert response.status_code == 200
     assert len(response.data) == 1
-    assert response.data[0]["codigo"] == "I-100"
\ No newline at end of file
+    assert response.data[0]["codigo"] == "I-100"
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de ListaInseminaciones: CREACIÓN EN LOTE
+# --------------------------------------------------------------------------------------------------------------
+# Test para comprobar que se pueden crear varias inseminaciones a la vez y que se descuenta el semen de cada toro.
+@pytest.mark.django_db
+def test_crear_listainseminaciones_en_lote():
+    client = obtener_usuario_autenticado()
+    vacas = [
+        Animal.objects.create(
+            tipo="Vaca", estado="Vacía", nombre=f"Vaca Lote {i}", fecha_nacimiento="2024-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5
+        )
+        for i in range(4)
+    ]
+    toros = [
+        Toro.objects.create(
+            nombre=f"Toro Lote {i}", cantidad_semen=cantidad, transmision_leche=Decimal("3.0"),
+            celulas_somaticas=Decimal("1.0"), calidad_patas=Decimal("7.00"), calidad_ubres=Decimal("7.00"),
+            grasa=3.5, proteinas=3.2
+        )
+        for i, cantidad in enumerate([3, 1])
+    ]
+    inseminacion = lambda vaca, toro: {
+        "razon": "Programada", "fecha_inseminacion": "2025-03-15", "hora_inseminacion": "10:20",
+        "responsable": "Pepe", "id_vaca": vaca.id, "id_toro": toro.id,
+    }
+
+    # El segundo toro solamente tiene una dosis: no se crea ninguna inseminación.
+    datos = [inseminacion(vacas[0], toros[0]), inseminacion(vacas[1], toros[1]), inseminacion(vacas[2], toros[1])]
+    response = client.post("/api/listainseminaciones/lote/", datos, format="json")
+    assert response.status_code == 400
+    assert [error["indice"] for error in response.data["errores"]] == [1, 2]
+    assert not ListaInseminaciones.objects.exists()
+
+    datos = [inseminacion(vacas[0], toros[0]), inseminacion(vacas[1], toros[0]), inseminacion(vacas[2], toros[1])]
+    response = client.post("/api/listainseminaciones/lote/", datos, format="json")
+    assert response.status_code == 201
+    assert [fila["codigo"] for fila in response.data] == ["I-1", "I-2", "I-3"]
+
+    for toro in toros:
+        toro.refresh_from_db()
+    assert [toro.cantidad_semen for toro in toros] == [1, 0]
+
+
+# Test para comprobar que al cambiar el toro de una inseminación se devuelve la dosis al toro anterior.
+@pytest.mark.django_db
+def test_modificar_listainseminaciones_cambia_cantidad_semen():
+    client = obtener_usuario_autenticado()
+    vaca = Animal.objects.create(
+        tipo="Vaca", estado="Vacía", nombre="Vaca Prueba 1", fecha_nacimiento="2024-01-01",
+        celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+        calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5
+    )
+    toros = [
+        Toro.objects.create(
+            nombre=f"Toro Prueba {i}", cantidad_semen=cantidad, transmision_leche=Decimal("3.0"),
+            celulas_somaticas=Decimal("1.0"), calidad_patas=Decimal("7.00"), calidad_ubres=Decimal("7.00"),
+            grasa=3.5, proteinas=3.2
+        )
+        for i, cantidad in enumerate([5, 0, 2])
+    ]
+    datos = {"razon": "Celo", "fecha_inseminacion": "2025-03-15", "hora_inseminacion": "10:20",
+             "responsable": "Pepe", "id_vaca": vaca.id, "id_toro": toros[0].id}
+    id_inseminacion = client.post("/api/listainseminaciones/", datos, format="json").data["id"]
+
+    # El segundo toro no tiene semen: no se modifica nada.
+    datos["id_toro"] = toros[1].id
+    response = client.put(f"/api/listainseminaciones/{id_inseminacion}/", datos, format="json")
+    assert response.status_code == 400
+
+    datos["id_toro"] = toros[2].id
+    response = client.put(f"/api/listainseminaciones/{id_inseminacion}/", datos, format="json")
+    assert response.status_code == 200
+
+    for toro in toros:
+        toro.refresh_from_db()
+    assert [toro.cantidad_semen for toro in toros] == [5, 0, 1]
+
+
+# Test para comprobar que el listado de inseminaciones tiene el mismo número de consultas sin importar cuántas haya.
+@pytest.mark.django_db
+def test_listado_listainseminaciones_numero_consultas_constante(django_assert_num_queries):
+    client = obtener_usuario_autenticado()
+    toro = Toro.objects.create(
+        nombre="Toro Prueba 1", cantidad_semen=50, transmision_leche=Decimal("3.0"), celulas_somaticas=Decimal("1.0"),
+        calidad_patas=Decimal("7.00"), calidad_ubres=Decimal("7.00"), grasa=3.5, proteinas=3.2
+    )
+    for i in range(10):
+        vaca = Animal.objects.create(
+            tipo="Vaca", estado="Vacía", nombre=f"Vaca Prueba {i}", fecha_nacimiento="2024-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5
+        )
+        ListaInseminaciones.objects.create(razon="Celo", fecha_inseminacion="2025-03-15", hora_inseminacion="10:20",
+                                           responsable="Pepe", id_vaca=vaca, id_toro=toro)
+
+    # Usuario autenticado (1 consulta) y el listado (1 consulta).
+    with django_assert_num_queries(2):
+        response = client.get("/api/listainseminaciones/")
+
+    assert response.status_code == 200
+    assert len(response.data) == 10
+    assert response.data[0]["id_toro"] == toro.id
@@ -2,3 +2,160 @@
 # Funcionalidad: se encarga de comprobar la lógica interna de los modelos
 # (ej: save, __str__, ...)
 # -----------------------------------------------------------------------------------
+
+import pytest
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from ganaderiaBovina.models import (Animal, Toro, Corral, VTAnimales, ListaInseminaciones, ContadorCodigo,
+                                   reservar_codigos)
+from ganaderiaBovina.scripts import cargar_conjunto_de_datos
+from ganaderiaBovina.scripts.cargar_conjunto_de_datos import cargar_dataset
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de MODELOS: GENERACIÓN DE CÓDIGOS
+# --------------------------------------------------------------------------------------------------------------
+def crear_vaca(nombre, codigo=None):
+    return Animal.objects.create(
+        codigo=codigo, tipo="Vaca", nombre=nombre, fecha_nacimiento="2023-01-01", celulas_somaticas=100000,
+        produccion_leche=25, calidad_patas=7, calidad_ubres=6, grasa=4, proteinas=3.5
+    )
+
+
+def crear_toro(nombre, codigo=None):
+    return Toro(
+        codigo=codigo, nombre=nombre, cantidad_semen=10, celulas_somaticas=Decimal("0.5"),
+        transmision_leche=Decimal("1.5"), calidad_patas=Decimal("5.0"), calidad_ubres=Decimal("5.0"),
+        grasa=0.1, proteinas=0.05
+    )
+
+
+# Se comprueba que los códigos se generan de manera consecutiva para cada prefijo.
+@pytest.mark.django_db
+def test_codigos_consecutivos():
+    assert crear_vaca("Vaca 1").codigo == "V-1"
+    assert crear_vaca("Vaca 2").codigo == "V-2"
+    assert Corral.objects.create(nombre="Corral 1").codigo == "CORRAL-1"
+    assert ContadorCodigo.objects.get(prefijo="V").ultimo == 2
+
+
+# Se comprueba que si se indica un código a mano, los siguientes códigos son mayores.
+@pytest.mark.django_db
+def test_codigo_indicado_actualiza_contador():
+    crear_vaca("Vaca 1")
+    crear_vaca("Vaca 100", codigo="V-100")
+    assert crear_vaca("Vaca 101").codigo == "V-101"
+
+
+# Se comprueba que el contador se inicia con el mayor código que ya existe (ej: datos importados sin save()).
+@pytest.mark.django_db
+def test_contador_se_inicia_con_los_datos_existentes():
+    Toro.objects.bulk_create([crear_toro("Toro 7", "T-7"), crear_toro("Toro 3", "T-3")])
+    toro = crear_toro("Toro nuevo")
+    toro.save()
+    assert toro.codigo == "T-8"
+
+
+# Se comprueba que se pueden reservar varios códigos a la vez y que el coste no depende del número de filas.
+@pytest.mark.django_db
+def test_reservar_codigos(django_assert_max_num_queries):
+    assert reservar_codigos("I", 3) == ["I-1", "I-2", "I-3"]
+    assert reservar_codigos("I") == ["I-4"]
+
+    for i in range(20):
+        Corral.objects.create(nombre=f"Corral {i}")
+    # Si el contador ya existe, no se recorren los códigos de la tabla: solo se consulta para la inserción.
+    tabla = connection.ops.quote_name(Corral._meta.db_table)
+    with django_assert_max_num_queries(6) as consultas:
+        assert Corral.objects.create(nombre="Corral nuevo").codigo == "CORRAL-21"
+    assert [c["sql"].split()[0] for c in consultas.captured_queries if tabla in c["sql"]] == ["INSERT"]
+
+
+# Se comprueba que el comando calcula los contadores a partir de los datos y que no disminuyen.
+@pytest.mark.django_db
+def test_comando_sembrar_contadores_codigo():
+    reservar_codigos("I", 5)
+    Toro.objects.bulk_create([crear_toro("Toro 12", "T-12")])
+    ContadorCodigo.objects.create(prefijo="T", ultimo=2)
+
+    call_command("sembrar_contadores_codigo")
+
+    assert ContadorCodigo.objects.get(prefijo="T").ultimo == 12
+    assert ContadorCodigo.objects.get(prefijo="I").ultimo == 5
+    assert ContadorCodigo.objects.get(prefijo="CORRAL").ultimo == 0
+    assert not ListaInseminaciones.objects.exists()
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de MODELOS: ÍNDICES
+# --------------------------------------------------------------------------------------------------------------
+# Se comprueba que el benchmark muestra los planes sin y con índices y que no modifica la base de datos.
+# Sobre la base de datos principal solo se ejecuta si se confirma (bloquea las tablas mientras se ejecuta).
+@pytest.mark.django_db
+def test_comando_benchmark_indices():
+    with pytest.raises(CommandError, match="--confirmar"):
+        call_command("benchmark_indices", animales=300, repeticiones=1)
+    with pytest.raises(CommandError, match="no está definida"):
+        call_command("benchmark_indices", animales=300, repeticiones=1, base_datos="no_existe")
+
+    salida = StringIO()
+    call_command("benchmark_indices", animales=300, repeticiones=2, confirmar=True, stdout=salida)
+
+    assert "Sin índices" in salida.getvalue()
+    assert "Con índices" in salida.getvalue()
+    # El índice que elige cada base de datos depende del tamaño de las tablas (ej: PostgreSQL prefiere
+    # recorrer una tabla pequeña), pero alguna consulta debe usar uno de los índices de los modelos.
+    nombres = {indice.name for modelo in [Animal, Toro, VTAnimales, ListaInseminaciones] for indice in modelo._meta.indexes}
+    assert any(nombre in salida.getvalue() for nombre in nombres)
+    assert Animal.objects.count() == 0
+    with connection.cursor() as cursor:
+        indices = connection.introspection.get_constraints(cursor, Animal._meta.db_table)
+    assert "animal_estado_tipo_idx" in indices
+
+
+# Los índices trigram de los filtros de texto (icontains) solo se crean en PostgreSQL.
+@pytest.mark.django_db
+def test_indices_trigram_postgresql():
+    if connection.vendor != "postgresql":
+        pytest.skip("Los índices trigram solo se crean en PostgreSQL.")
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE indexname LIKE '%%_trgm_idx'")
+        indices = {fila[0] for fila in cursor.fetchall()}
+    assert {"animal_nombre_trgm_idx", "toro_nombre_trgm_idx", "vtanimales_responsable_trgm_idx"} <= indices
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de la CARGA DEL CONJUNTO DE DATOS
+# --------------------------------------------------------------------------------------------------------------
+# Se comprueba que la carga crea los toros, vacas y crías del .csv y que al repetirla no se duplica nada.
+@pytest.mark.django_db
+def test_cargar_dataset_idempotente(django_assert_max_num_queries, monkeypatch):
+    ruta = Path(__file__).resolve().parent.parent / "cria_ganado_dataset_05_03_25.csv"
+    resultado = cargar_dataset(ruta)
+
+    assert resultado == {"toros": 15, "vacas": 667, "crias": 10004}
+    assert Animal.objects.filter(tipo="Ternero", madre__isnull=False, padre__isnull=False).count() == 10004
+    assert ContadorCodigo.objects.get(prefijo="C").ultimo == 10004
+
+    # Los 10671 códigos de vacas y crías se buscan en 3 bloques de TAMANYO_CONSULTA (una consulta más por bloque).
+    with django_assert_max_num_queries(13):
+        assert cargar_dataset(ruta) == {"toros": 0, "vacas": 0, "crias": 0}
+    assert Animal.objects.count() == 667 + 10004
+
+    # Los códigos existentes se buscan por bloques: ninguna consulta tiene más de TAMANYO_CONSULTA códigos.
+    monkeypatch.setattr(cargar_conjunto_de_datos, "TAMANYO_CONSULTA", 1000)
+    parametros = []
+
+    def contar_parametros(execute, sql, params, many, context):
+        if sql.startswith("SELECT"):
+            parametros.append(len(params or ()))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(contar_parametros):
+        assert cargar_dataset(ruta) == {"toros": 0, "vacas": 0, "crias": 0}
+    assert 0 < max(parametros) <= 1000
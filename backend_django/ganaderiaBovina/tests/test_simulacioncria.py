@@ -0,0 +1,608 @@
+# --------------------------------- test_simulacioncria.py: ---------------------------------
+# Funcionalidad: se encarga de comprobar la simulación de las crías y el reentrenamiento del modelo
+# (ej: registro del modelo, predicción, API...)
+# -----------------------------------------------------------------------------------
+import itertools
+import os
+import shutil
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import User, Group
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ganaderiaBovina import simulacionCria
+from ganaderiaBovina.models import Toro, Animal, EntrenamientoCria, TrabajoSimulacion
+from ganaderiaBovina.simulacionCria import obtener_modelo, invalidar_modelo, simular_cria_optima, simular_matriz_cria, \
+    asignar_toros_optimos, agregar_y_reentrenar_cria, comprobar_consistencia_modelo, ModeloCria, \
+    refrescar_entrenamiento_cria
+from ganaderiaBovina.trabajosSimulacion import ejecutar_trabajo_simulacion
+
+# Conjunto de datos original (se copia para que los test no lo modifiquen).
+RUTA_CSV_ORIGINAL = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cria_ganado_dataset_05_03_25.csv')
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de SIMULACIONCRIA: LÓGICA
+# --------------------------------------------------------------------------------------------------------------
+# Cada test trabaja con una copia del .csv y con el registro del modelo vacío.
+@pytest.fixture
+def ruta_csv(tmp_path, settings):
+    ruta = tmp_path / "cria_ganado_test.csv"
+    shutil.copy(RUTA_CSV_ORIGINAL, ruta)
+    settings.SIMULACION_CRIA_CSV = str(ruta)
+    invalidar_modelo()
+    yield ruta
+    invalidar_modelo()
+
+
+# Las características de las vacas y de los toros se obtienen de la base de datos: se dan de alta las vacas
+# y los toros del .csv (con las características de su primera fila).
+@pytest.fixture
+def rebanyo_csv(db):
+    crias_df = pd.read_csv(RUTA_CSV_ORIGINAL, sep=';')
+    vacas_df = crias_df.drop_duplicates('id_vaca')
+    toros_df = crias_df.drop_duplicates('id_toro')
+    decimal = lambda valor: Decimal(str(round(valor, 2)))
+
+    Animal.objects.bulk_create([
+        Animal(codigo=fila.id_vaca, nombre=f"Vaca {fila.id_vaca}", fecha_nacimiento="2020-01-01",
+               celulas_somaticas=int(fila.cs_vaca), produccion_leche=fila.pl_vaca, calidad_patas=decimal(fila.pa_vaca),
+               calidad_ubres=decimal(fila.u_vaca), grasa=fila.g_vaca, proteinas=fila.pr_vaca)
+        for fila in vacas_df.itertuples()
+    ])
+    Toro.objects.bulk_create([
+        Toro(codigo=fila.id_toro, nombre=f"Toro {fila.id_toro}", cantidad_semen=10,
+             celulas_somaticas=decimal(fila.cs_toro), transmision_leche=decimal(fila.pl_toro),
+             calidad_patas=decimal(fila.pa_toro), calidad_ubres=decimal(fila.u_toro),
+             grasa=fila.g_toro, proteinas=fila.pr_toro)
+        for fila in toros_df.itertuples()
+    ])
+    return crias_df
+
+
+# Test para comprobar que el modelo se entrena una sola vez y se reutiliza en las siguientes simulaciones.
+def test_modelo_se_reutiliza_entre_simulaciones(ruta_csv, rebanyo_csv, monkeypatch):
+    entrenamientos = []
+    fit_original = simulacionCria.ModeloCria.fit
+
+    def fit_contado(self, x, y):
+        entrenamientos.append(1)
+        return fit_original(self, x, y)
+
+    monkeypatch.setattr(simulacionCria.ModeloCria, "fit", fit_contado)
+
+    _, modelo_1 = obtener_modelo()
+    _, modelo_2 = obtener_modelo()
+    simular_cria_optima(["V-549"], "T-5", "produccion_leche")
+
+    assert modelo_1 is modelo_2
+    assert len(entrenamientos) == 1
+
+
+# Test para comprobar que el modelo se vuelve a entrenar si cambia el .csv.
+def test_modelo_se_reentrena_si_cambia_el_csv(ruta_csv):
+    _, modelo_1 = obtener_modelo()
+
+    # Se modifica la fecha de modificación del archivo.
+    estado = os.stat(ruta_csv)
+    os.utime(ruta_csv, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000_000))
+
+    _, modelo_2 = obtener_modelo()
+    assert modelo_1 is not modelo_2
+
+
+# Test para comprobar que se puede invalidar el modelo de manera explícita.
+def test_invalidar_modelo(ruta_csv):
+    _, modelo_1 = obtener_modelo()
+    invalidar_modelo()
+    _, modelo_2 = obtener_modelo()
+    assert modelo_1 is not modelo_2
+
+
+# Test para comprobar que la simulación devuelve la cría más óptima con los atributos dentro de los rangos.
+def test_simular_cria_optima(ruta_csv, rebanyo_csv):
+    resultado = simular_cria_optima(["V-549", "V-279"], "T-5", "produccion_leche")
+
+    assert resultado is not None
+    assert resultado["id_vaca"] in ["V-549", "V-279"]
+    assert resultado["id_toro"] == "T-5"
+    assert resultado["valor_prioridad"] == resultado["atributos"]["produccion_leche"]
+    assert 1 <= resultado["atributos"]["calidad_patas"] <= 9
+    assert 2.8 <= resultado["atributos"]["proteinas"] <= 4
+
+
+# Test para comprobar que no hay resultado si el toro no existe.
+def test_simular_cria_toro_inexistente(ruta_csv, rebanyo_csv):
+    assert simular_cria_optima(["V-549"], "T-99999", "grasa") is None
+
+
+# Test para comprobar que la predicción en lote coincide con la predicción vaca a vaca.
+def test_simulacion_en_lote_coincide_con_prediccion_individual(ruta_csv, rebanyo_csv):
+    crias_df, modelo = obtener_modelo()
+    id_vacas = list(crias_df['id_vaca'].unique()[:50])
+    resultado = simular_cria_optima(id_vacas, "T-12", "calidad_ubres")
+
+    toro = crias_df[crias_df['id_toro'] == "T-12"].iloc[0]
+    mejor_valor = None
+    for id_vaca in id_vacas:
+        vaca = crias_df[crias_df['id_vaca'] == id_vaca].iloc[0]
+        x = [[*vaca[simulacionCria.COLUMNAS_VACA], *toro[simulacionCria.COLUMNAS_TORO]]]
+        valor = min(max(modelo.predict(x)[0][3], 1), 9)
+        mejor_valor = valor if mejor_valor is None else max(mejor_valor, valor)
+
+    assert resultado["valor_prioridad"] == pytest.approx(mejor_valor)
+
+
+# Test para comprobar que la matriz vaca x toro devuelve las mejores crías ordenadas para cada vaca y cada toro.
+def test_simular_matriz_cria(ruta_csv, rebanyo_csv):
+    resultado = simular_matriz_cria(["V-549", "V-279", "V-NO-EXISTE"], ["T-5", "T-12", "T-1"], "grasa", top_k=2)
+
+    assert resultado["vacas_no_encontradas"] == ["V-NO-EXISTE"]
+    assert len(resultado["por_vaca"]) == 2
+    assert len(resultado["por_toro"]) == 3
+    for fila in resultado["por_vaca"]:
+        valores = [cria["valor_prioridad"] for cria in fila["mejores_crias"]]
+        assert len(valores) == 2
+        assert valores == sorted(valores, reverse=True)
+        assert all(cria["id_vaca"] == fila["id_vaca"] for cria in fila["mejores_crias"])
+
+    # La mejor cría de cada vaca coincide con la simulación de esa vaca con cada toro por separado.
+    for fila in resultado["por_vaca"]:
+        mejor = max((simular_cria_optima([fila["id_vaca"]], toro, "grasa") for toro in ["T-5", "T-12", "T-1"]),
+                    key=lambda r: r["valor_prioridad"])
+        assert fila["mejores_crias"][0]["valor_prioridad"] == pytest.approx(mejor["valor_prioridad"])
+
+
+# Test para comprobar que la asignación respeta las dosis de cada toro y es la mejor posible.
+def test_asignar_toros_optimos_respeta_dosis(ruta_csv, rebanyo_csv):
+    vacas = ["V-549", "V-279", "V-1", "V-2"]
+    dosis = {"T-5": 1, "T-12": 2, "T-1": 0}
+    resultado = asignar_toros_optimos(vacas, dosis, "calidad_patas")
+
+    asignaciones = resultado["asignaciones"]
+    assert len(asignaciones) == 3 # Solo hay 3 dosis disponibles.
+    assert len(resultado["vacas_sin_toro"]) == 1
+    assert sum(1 for a in asignaciones if a["id_toro"] == "T-5") <= 1
+    assert sum(1 for a in asignaciones if a["id_toro"] == "T-12") <= 2
+    assert all(a["id_toro"] != "T-1" for a in asignaciones)
+    assert resultado["dosis_restantes"]["T-5"] >= 0 and resultado["dosis_restantes"]["T-12"] >= 0
+
+    # Se comprueba con todas las combinaciones posibles (fuerza bruta) que la asignación es la óptima.
+    valor = {(v, t): simular_cria_optima([v], t, "calidad_patas")["valor_prioridad"]
+             for v in vacas for t in ["T-5", "T-12"]}
+    mejor_total = max(
+        sum(valor[(v, t)] for v, t in zip(orden, ["T-5", "T-12", "T-12"]))
+        for orden in itertools.permutations(vacas, 3)
+    )
+    assert resultado["valor_total"] == pytest.approx(mejor_total)
+
+
+# Nueva cría de ejemplo para añadirla al conjunto de datos.
+def nueva_cria(id_cria):
+    return {
+        "id_vaca": "V-549", "id_toro": "T-5", "id_cria": id_cria,
+        "celulas_somaticas": 60000.0, "produccion_leche": 25.5, "calidad_patas": 6.1, "calidad_ubres": 7.2,
+        "grasa": 3.9, "proteinas": 3.3,
+        "cs_vaca": 478658.0, "pl_vaca": 0.0, "pa_vaca": 7.07, "u_vaca": 8.61, "g_vaca": 3.64, "pr_vaca": 3.61,
+        "cs_toro": -2.31, "pl_toro": 1.68, "pa_toro": 2.5, "u_toro": 8.56, "g_toro": 0.15, "pr_toro": 0.03,
+    }
+
+
+# Test para comprobar que la nueva cría se añade al final del .csv con las columnas en su orden.
+def test_agregar_cria_al_final_del_csv(ruta_csv):
+    filas_antes = len(pd.read_csv(ruta_csv, delimiter=";"))
+
+    assert agregar_y_reentrenar_cria(nueva_cria("C-TEST-1"))
+
+    df = pd.read_csv(ruta_csv, delimiter=";")
+    assert len(df) == filas_antes + 1
+    ultima = df.iloc[-1]
+    assert ultima["id_cria"] == "C-TEST-1"
+    assert ultima["produccion_leche"] == pytest.approx(25.5)
+    assert ultima["pr_toro"] == pytest.approx(0.03)
+
+
+# Test para comprobar que no se pierde ninguna fila si se añaden crías a la vez.
+def test_agregar_crias_concurrentes_no_pierde_filas(ruta_csv):
+    filas_antes = len(pd.read_csv(ruta_csv, delimiter=";"))
+    hilos = [threading.Thread(target=agregar_y_reentrenar_cria, args=(nueva_cria(f"C-TEST-{i}"),)) for i in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    df = pd.read_csv(ruta_csv, delimiter=";")
+    assert len(df) == filas_antes + 20
+    assert set(df["id_cria"].iloc[-20:]) == {f"C-TEST-{i}" for i in range(20)}
+
+
+# Test para comprobar que el modelo coincide con un entrenamiento completo por mínimos cuadrados.
+def test_modelo_cria_coincide_con_regresion_lineal(ruta_csv):
+    assert comprobar_consistencia_modelo()
+
+
+# Test para comprobar que la nueva cría actualiza el modelo en memoria sin volver a entrenarlo
+# y que el resultado coincide con un entrenamiento completo.
+def test_agregar_cria_actualiza_modelo_de_manera_incremental(ruta_csv, monkeypatch):
+    _, modelo_antes = obtener_modelo()
+    coeficientes_antes = modelo_antes.coef_.copy()
+
+    entrenamientos = []
+    fit_original = ModeloCria.fit
+    monkeypatch.setattr(ModeloCria, "fit", lambda self, x, y: entrenamientos.append(1) or fit_original(self, x, y))
+
+    # El conjunto de datos en memoria no se copia con cada cría (solo se actualiza el modelo).
+    concatenaciones = []
+    concat_original = pd.concat
+    monkeypatch.setattr(simulacionCria.pd, "concat", lambda *a, **k: concatenaciones.append(1) or concat_original(*a, **k))
+
+    for i in range(5):
+        cria = nueva_cria(f"C-TEST-{i}")
+        cria["produccion_leche"] = 400.0 + i # Valores muy distintos para que cambien los coeficientes.
+        agregar_y_reentrenar_cria(cria)
+    assert not concatenaciones
+
+    crias_df, modelo_despues = obtener_modelo()
+    assert len(concatenaciones) == 1 # Las 5 crías se añaden de una vez.
+    assert modelo_despues is modelo_antes
+    assert not entrenamientos # No se ha vuelto a entrenar con el .csv completo.
+    assert not (modelo_despues.coef_ == coeficientes_antes).all()
+    assert crias_df["id_cria"].iloc[-1] == "C-TEST-4"
+    monkeypatch.undo()
+    assert comprobar_consistencia_modelo()
+
+
+# Test para comprobar que cada cierto número de crías se compara el modelo con un entrenamiento completo
+# y que, si no coincide, se vuelve a entrenar.
+def test_agregar_cria_comprueba_consistencia_periodicamente(ruta_csv, monkeypatch):
+    monkeypatch.setattr(simulacionCria, "CRIAS_ENTRE_COMPROBACIONES", 2)
+    comprobaciones = []
+    monkeypatch.setattr(simulacionCria, "comprobar_consistencia", lambda *args: comprobaciones.append(1) and False)
+    modelo_antes = simulacionCria.obtener_modelo_entrenado()
+
+    agregar_y_reentrenar_cria(nueva_cria("C-TEST-0"))
+    assert not comprobaciones and simulacionCria.obtener_modelo_entrenado() is modelo_antes
+
+    agregar_y_reentrenar_cria(nueva_cria("C-TEST-1"))
+    assert comprobaciones == [1]
+    assert simulacionCria.obtener_modelo_entrenado() is not modelo_antes # Se ha vuelto a entrenar.
+
+
+# Test para comprobar que si la cría no tiene todos los datos, no se añade al .csv.
+def test_agregar_cria_incompleta_no_se_anyade(ruta_csv):
+    contenido_antes = ruta_csv.read_bytes()
+    cria = nueva_cria("C-TEST-INCOMPLETA")
+    del cria["pr_toro"]
+
+    assert agregar_y_reentrenar_cria(cria) is False
+    assert ruta_csv.read_bytes() == contenido_antes
+
+
+# Test para comprobar que el .csv se guarda en una caché binaria y que se usa en lugar del texto.
+def test_cache_binaria_del_csv(ruta_csv, monkeypatch):
+    datos_csv, modelo_csv = obtener_modelo()
+    ruta_cache = simulacionCria.obtener_ruta_cache(str(ruta_csv))
+    assert os.path.exists(os.path.join(ruta_cache, "rasgos.npy"))
+
+    # Si se vuelve a cargar (ej: nuevo worker), no se lee el .csv como texto.
+    invalidar_modelo()
+    monkeypatch.setattr(simulacionCria.pd, "read_csv", lambda *args, **kwargs: pytest.fail("Se ha leído el .csv"))
+    datos_cache, modelo_cache = obtener_modelo()
+
+    assert list(datos_cache.columns) == list(datos_csv.columns)
+    assert datos_cache["id_vaca"].tolist() == datos_csv["id_vaca"].tolist()
+    assert (datos_cache[simulacionCria.COLUMNAS_ENTRADA].to_numpy() ==
+            datos_csv[simulacionCria.COLUMNAS_ENTRADA].to_numpy()).all()
+    assert (modelo_cache.coef_ == modelo_csv.coef_).all()
+
+
+# Test para comprobar que la caché se vuelve a generar si cambia el .csv.
+def test_cache_binaria_se_regenera_si_cambia_el_csv(ruta_csv):
+    obtener_modelo()
+    agregar_y_reentrenar_cria(nueva_cria("C-TEST-CACHE"))
+
+    invalidar_modelo()
+    crias_df, _ = obtener_modelo()
+    assert crias_df["id_cria"].iloc[-1] == "C-TEST-CACHE"
+
+    invalidar_modelo()
+    crias_df, _ = obtener_modelo() # Se lee de la caché regenerada.
+    assert crias_df["id_cria"].iloc[-1] == "C-TEST-CACHE"
+
+
+# Test para comprobar que se pueden simular los animales que solo están en la base de datos (no en el .csv).
+@pytest.mark.django_db
+def test_simular_cria_con_animales_solo_en_bd(ruta_csv, django_assert_num_queries):
+    crear_animal("V-9001", celulas_somaticas=60000, produccion_leche=45.0)
+    crear_animal("V-9002", celulas_somaticas=900000, produccion_leche=10.0)
+    crear_toro("T-9001")
+
+    resultado = simular_cria_optima(["V-9001", "V-9002"], "T-9001", "produccion_leche")
+    assert resultado is not None
+    assert resultado["id_vaca"] in ["V-9001", "V-9002"]
+
+    # Las características se leen en una única consulta por cada tipo de animal.
+    with django_assert_num_queries(1):
+        codigos, rasgos = simulacionCria.obtener_rasgos_vacas(["V-9002", "V-NO-EXISTE", "V-9001", "V-9002"])
+    assert codigos == ["V-9002", "V-9001"]
+    assert rasgos[1].tolist() == [60000, 45.0, 6.0, 7.0, 3.5, 3.2]
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de SIMULACIONCRIA: TABLA DE ENTRENAMIENTO (BD)
+# --------------------------------------------------------------------------------------------------------------
+def crear_animal(codigo, tipo="Vaca", madre=None, padre=None, **rasgos):
+    datos = {
+        "celulas_somaticas": 200000, "produccion_leche": 30.0, "calidad_patas": Decimal("6.00"),
+        "calidad_ubres": Decimal("7.00"), "grasa": 3.5, "proteinas": 3.2,
+    }
+    datos.update(rasgos)
+    return Animal.objects.create(codigo=codigo, nombre=f"Animal {codigo}", tipo=tipo, fecha_nacimiento="2022-01-01",
+                                 madre=madre, padre=padre, **datos)
+
+
+# Se generan varias familias (madre, padre y cría) para entrenar el modelo desde la base de datos.
+def crear_familias(num_crias=20):
+    toros = [crear_toro(f"T-{i}") for i in range(1, 4)]
+    for i in range(num_crias):
+        madre = crear_animal(f"V-{i + 1}", celulas_somaticas=100000 + 5000 * i, produccion_leche=20.0 + i,
+                             grasa=3.0 + (i % 5) / 10)
+        crear_animal(f"C-{i + 1}", tipo="Ternero", madre=madre, padre=toros[i % 3],
+                     celulas_somaticas=90000 + 4000 * i, produccion_leche=18.0 + i * 0.9, grasa=3.1 + (i % 4) / 10)
+    return toros
+
+
+# Test para comprobar que la tabla de entrenamiento se genera a partir de los animales y toros.
+@pytest.mark.django_db
+def test_refrescar_entrenamiento_cria():
+    crear_familias(5)
+
+    assert refrescar_entrenamiento_cria() == 5
+    fila = EntrenamientoCria.objects.get(id_cria="C-1")
+    assert (fila.id_vaca, fila.id_toro) == ("V-1", "T-1")
+    assert fila.cs_vaca == 100000
+    assert fila.pl_toro == pytest.approx(1.5) # Transmisión de leche del toro.
+    assert fila.produccion_leche == pytest.approx(18.0)
+
+    # Se puede volver a generar sin duplicar filas.
+    assert refrescar_entrenamiento_cria() == 5
+    assert EntrenamientoCria.objects.count() == 5
+
+
+# Test para comprobar que con el origen "bd" el modelo se entrena con la tabla de entrenamiento
+# y las nuevas crías se añaden a la tabla.
+@pytest.mark.django_db
+def test_simulacion_con_origen_bd(settings):
+    settings.SIMULACION_CRIA_ORIGEN = "bd"
+    invalidar_modelo()
+    crear_familias(20)
+    refrescar_entrenamiento_cria()
+
+    crias_df, modelo = obtener_modelo()
+    assert len(crias_df) == 20
+
+    cria = nueva_cria("C-NUEVA")
+    cria.update(id_vaca="V-1", id_toro="T-1")
+    assert agregar_y_reentrenar_cria(cria)
+    assert EntrenamientoCria.objects.filter(id_cria="C-NUEVA").exists()
+    assert agregar_y_reentrenar_cria(cria) is False # No se añade dos veces.
+
+    crias_df, modelo_despues = obtener_modelo()
+    assert modelo_despues is modelo # Se ha actualizado de manera incremental.
+    assert len(crias_df) == 21
+    invalidar_modelo()
+
+
+# Test para comprobar que las crías añadidas con la API (sin un Animal detrás) se mantienen al volver a generar
+# la tabla, salvo que después se registre un animal con el mismo código (se usan los datos del animal).
+@pytest.mark.django_db
+def test_refrescar_entrenamiento_cria_mantiene_crias_de_la_api(settings):
+    settings.SIMULACION_CRIA_ORIGEN = "bd"
+    toros = crear_familias(5)
+    refrescar_entrenamiento_cria()
+    for codigo in ("C-API", "C-6"):
+        cria = nueva_cria(codigo)
+        cria.update(id_vaca="V-1", id_toro="T-1")
+        assert agregar_y_reentrenar_cria(cria)
+    assert EntrenamientoCria.objects.get(id_cria="C-API").origen == "API"
+
+    crear_animal("C-6", tipo="Ternero", madre=Animal.objects.get(codigo="V-2"), padre=toros[0])
+    assert refrescar_entrenamiento_cria() == 7
+
+    assert EntrenamientoCria.objects.filter(id_cria="C-API", origen="API").exists()
+    fila = EntrenamientoCria.objects.get(id_cria="C-6")
+    assert (fila.origen, fila.id_vaca) == ("Animales", "V-2")
+    invalidar_modelo()
+
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de SIMULACIONCRIA: API
+# --------------------------------------------------------------------------------------------------------------
+# Para poder realizar la simulación, el usuario solamente debe estar autenticado.
+def obtener_usuario_autenticado():
+    # Se crea a un usuario
+    user, _ = User.objects.get_or_create(username="usuariotest")
+    user.set_password("usuariotest1234")
+    user.save()
+
+    # Se crea el token para la autenticación
+    refresh = RefreshToken.for_user(user)
+    token = str(refresh.access_token)
+
+    # Se autentica al usuario
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def crear_toro(codigo, estado="Vivo"):
+    return Toro.objects.create(
+        codigo=codigo, nombre=f"Toro {codigo}", estado=estado, cantidad_semen=10,
+        transmision_leche=Decimal("1.5"), celulas_somaticas=Decimal("0.5"), calidad_patas=Decimal("5.0"),
+        calidad_ubres=Decimal("5.0"), grasa=0.1, proteinas=0.05
+    )
+
+
+# Test para comprobar que si no se indican toros, se usan todos los toros vivos.
+@pytest.mark.django_db
+def test_api_simular_matriz_cria_toros_vivos(ruta_csv, rebanyo_csv):
+    client = obtener_usuario_autenticado()
+    Toro.objects.exclude(codigo__in=["T-5", "T-12"]).update(estado="Muerte")
+
+    datos = {"codigo_vacas": ["V-549", "V-279"], "atributo_prioridad": "produccion_leche", "top_k": 1}
+    response = client.post("/api/simular-cria/matriz/", datos, format="json")
+
+    assert response.status_code == 200
+    matriz = response.data["matriz_cria"]
+    assert sorted(fila["id_toro"] for fila in matriz["por_toro"]) == ["T-12", "T-5"]
+    assert all(len(fila["mejores_crias"]) == 1 for fila in matriz["por_vaca"])
+
+
+# Test para comprobar que el atributo a potenciar debe ser válido.
+@pytest.mark.django_db
+def test_api_simular_matriz_cria_atributo_no_valido(ruta_csv, rebanyo_csv):
+    client = obtener_usuario_autenticado()
+
+    datos = {"codigo_vacas": ["V-549"], "codigo_toros": ["T-5"], "atributo_prioridad": "color"}
+    response = client.post("/api/simular-cria/matriz/", datos, format="json")
+
+    assert response.status_code == 400
+
+
+# Test para comprobar que el modo "asignacion" usa la cantidad de semen de los toros.
+@pytest.mark.django_db
+def test_api_asignacion_cria(ruta_csv, rebanyo_csv):
+    client = obtener_usuario_autenticado()
+    Toro.objects.filter(codigo="T-5").update(cantidad_semen=1)
+
+    datos = {"codigo_vacas": ["V-549", "V-279"], "codigo_toros": ["T-5"],
+             "atributo_prioridad": "grasa", "modo": "asignacion"}
+    response = client.post("/api/simular-cria/matriz/", datos, format="json")
+
+    assert response.status_code == 200
+    asignacion = response.data["asignacion_cria"]
+    assert len(asignacion["asignaciones"]) == 1
+    assert len(asignacion["vacas_sin_toro"]) == 1
+    assert asignacion["dosis_restantes"] == {"T-5": 0}
+
+
+# Test para comprobar que la simulación se puede enviar como trabajo y consultar su resultado.
+@pytest.mark.django_db
+def test_api_trabajo_simulacion(ruta_csv, rebanyo_csv, settings, monkeypatch):
+    settings.SIMULACION_CRIA_TRABAJOS_SINCRONOS = True
+    monkeypatch.setattr(simulacionCria, "VACAS_POR_BLOQUE", 2) # Se calcula en varios bloques.
+    client = obtener_usuario_autenticado()
+
+    datos = {"codigo_vacas": ["V-549", "V-279", "V-1", "V-2", "V-3"], "codigo_toros": ["T-5", "T-12"],
+             "atributo_prioridad": "grasa", "top_k": 1}
+    response = client.post("/api/simular-cria/trabajos/", datos, format="json")
+    assert response.status_code == 202
+    id_trabajo = response.data["trabajo"]["id"]
+
+    response = client.get(f"/api/simular-cria/trabajos/{id_trabajo}/")
+    assert response.status_code == 200
+    trabajo = response.data["trabajo"]
+    assert trabajo["estado"] == "Completado"
+    assert trabajo["progreso"] == 100
+    assert trabajo["tipo_resultado"] == "matriz_cria"
+
+    # El resultado es el mismo que el de la simulación directa.
+    directa = client.post("/api/simular-cria/matriz/", datos, format="json").data["matriz_cria"]
+    assert trabajo["resultado"] == directa
+
+    # Un trabajo que no se puede calcular termina con error.
+    datos = {"codigo_vacas": ["V-NO-EXISTE"], "codigo_toros": ["T-5"], "atributo_prioridad": "grasa"}
+    id_trabajo = client.post("/api/simular-cria/trabajos/", datos, format="json").data["trabajo"]["id"]
+    trabajo = client.get(f"/api/simular-cria/trabajos/{id_trabajo}/").data["trabajo"]
+    assert trabajo["estado"] == "Error"
+    assert trabajo["error"] == "No se pudo calcular ninguna cría."
+
+
+# Test para comprobar que el trabajo se ejecuta en los hilos en segundo plano (sin SIMULACION_CRIA_TRABAJOS_SINCRONOS).
+# transaction=True: el hilo usa su propia conexión y solo ve el trabajo cuando se ha confirmado.
+@pytest.mark.django_db(transaction=True)
+def test_api_trabajo_simulacion_en_segundo_plano(ruta_csv, rebanyo_csv):
+    client = obtener_usuario_autenticado()
+    datos = {"codigo_vacas": ["V-549", "V-279"], "codigo_toros": ["T-5", "T-12"], "atributo_prioridad": "grasa"}
+
+    response = client.post("/api/simular-cria/trabajos/", datos, format="json")
+    assert response.status_code == 202
+    id_trabajo = response.data["trabajo"]["id"]
+
+    for _ in range(300):
+        trabajo = client.get(f"/api/simular-cria/trabajos/{id_trabajo}/").data["trabajo"]
+        if trabajo["estado"] in ("Completado", "Error"):
+            break
+        time.sleep(0.1)
+    assert trabajo["estado"] == "Completado"
+    assert trabajo["resultado"] == client.post("/api/simular-cria/matriz/", datos, format="json").data["matriz_cria"]
+    assert TrabajoSimulacion.objects.get(id=id_trabajo).fecha_actualizacion is not None
+
+
+# Test para comprobar que los trabajos sin progreso (ej: se reinició el proceso) se vuelven a ejecutar al consultarlos
+# y que un trabajo que ya ha empezado otro hilo no se ejecuta dos veces.
+@pytest.mark.django_db
+def test_recuperar_trabajos_simulacion(ruta_csv, rebanyo_csv, settings):
+    settings.SIMULACION_CRIA_TRABAJOS_SINCRONOS = True
+    client = obtener_usuario_autenticado()
+    usuario = User.objects.get(username="usuariotest")
+    parametros = {"codigo_vacas": ["V-549"], "codigo_toros": ["T-5"], "atributo_prioridad": "grasa",
+                  "top_k": 1, "modo": "ranking"}
+    hace_una_hora = timezone.now() - timedelta(hours=1)
+    perdido = TrabajoSimulacion.objects.create(usuario=usuario, parametros=parametros, estado="En curso",
+                                              progreso=50, fecha_actualizacion=hace_una_hora)
+    activo = TrabajoSimulacion.objects.create(usuario=usuario, parametros=parametros, estado="En curso",
+                                              progreso=50, fecha_actualizacion=timezone.now())
+
+    assert client.get(f"/api/simular-cria/trabajos/{perdido.id}/").data["trabajo"]["estado"] == "Completado"
+    assert client.get(f"/api/simular-cria/trabajos/{activo.id}/").data["trabajo"]["estado"] == "En curso"
+
+    ejecutar_trabajo_simulacion(activo.id)
+    activo.refresh_from_db()
+    assert (activo.estado, activo.progreso) == ("En curso", 50)
+
+
+# Test para comprobar que los datos del trabajo se validan y que solo su usuario puede consultarlo.
+@pytest.mark.django_db
+def test_api_trabajo_simulacion_validacion_y_permisos(ruta_csv, rebanyo_csv, settings):
+    settings.SIMULACION_CRIA_TRABAJOS_SINCRONOS = True
+    client = obtener_usuario_autenticado()
+
+    datos = {"codigo_vacas": ["V-549"], "atributo_prioridad": "grasa", "modo": "otro"}
+    assert client.post("/api/simular-cria/trabajos/", datos, format="json").status_code == 400
+
+    datos["modo"] = "ranking"
+    id_trabajo = client.post("/api/simular-cria/trabajos/", datos, format="json").data["trabajo"]["id"]
+
+    otro = User.objects.create_user(username="otrousuario", password="otrousuario1234")
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(otro).access_token}')
+    assert client.get(f"/api/simular-cria/trabajos/{id_trabajo}/").status_code == 404
+
+
+# Test para comprobar que una cría sin los códigos (ej: sin id_cria) no se añade y la API responde 400 (no 500).
+@pytest.mark.django_db
+def test_api_reentrenar_cria_sin_codigos(settings):
+    settings.SIMULACION_CRIA_ORIGEN = "bd"
+    user, _ = User.objects.get_or_create(username="usuarioreentrenar")
+    user.groups.add(Group.objects.get_or_create(name="Administrador")[0])
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    for cria in (nueva_cria(None), nueva_cria(""), nueva_cria("C-CODIGO-DEMASIADO-LARGO")):
+        response = client.post("/api/reentrenar-cria/", cria, format="json")
+        assert response.status_code == 400
+    cria = nueva_cria("C-SIN-MADRE")
+    del cria["id_vaca"]
+    assert client.post("/api/reentrenar-cria/", cria, format="json").status_code == 400
+    assert not EntrenamientoCria.objects.exists()
+
+    assert client.post("/api/reentrenar-cria/", nueva_cria("C-VALIDA"), format="json").status_code == 200
+    assert EntrenamientoCria.objects.filter(id_cria="C-VALIDA").exists()
+    invalidar_modelo()
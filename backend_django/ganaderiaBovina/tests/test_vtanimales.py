@@ -2,9 +2,13 @@
 # Funcionalidad: se encarga de comprobar la API
 # (ej: crear, modificar, eliminar, mostrar...)
 # -----------------------------------------------------------------------------------
+import json
+
 import pytest
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 from ganaderiaBovina.models import Animal, Corral, InventarioVT, VTAnimales, Perfil
+from ganaderiaBovina.serializers import VTAnimalesSerializer
 from decimal import Decimal
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
@@ -1124,4 +1128,187 @@ def test_filtrado_combinado_vtanimales_por_tipo_y_ruta():
 
     assert response.status_code == 200
     assert len(response.data) == 1
-    assert response.data[0]["codigo"] == "VTA-100"
\ No newline at end of file
+    assert response.data[0]["codigo"] == "VTA-100"
+
+# --------------------------------------------------------------------------------------------------------------
+#                                       Test de VTANIMALES: CREACIÓN EN LOTE
+# --------------------------------------------------------------------------------------------------------------
+def crear_vacas_lote(num_vacas):
+    corral = Corral.objects.create(nombre="Corral Lote")
+    return [
+        Animal.objects.create(
+            tipo="Vaca", estado="Vacía", nombre=f"Vaca Lote {i}", fecha_nacimiento="2024-01-01",
+            celulas_somaticas=100000, produccion_leche=20.0, calidad_patas=Decimal("7.00"),
+            calidad_ubres=Decimal("7.00"), grasa=4.0, proteinas=3.5, corral=corral
+        )
+        for i in range(num_vacas)
+    ]
+
+
+def datos_vacunacion(animal, inventario, fecha="2025-03-10"):
+    return {
+        "tipo": "Vacuna", "ruta": "Intramuscular", "fecha_inicio": fecha, "fecha_finalizacion": fecha,
+        "responsable": "Pepe", "id_animal": animal.id, "inventario_vt": inventario.id,
+    }
+
+
+# Test para comprobar que se puede vacunar a varios animales en una única petición.
+@pytest.mark.django_db
+def test_crear_vtanimales_en_lote():
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(30)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna Lote", unidades=30, estado="Activa")
+    otra = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna Lote 2", unidades=5, estado="Activa")
+
+    datos = [datos_vacunacion(vaca, vacuna) for vaca in vacas[:28]] + [datos_vacunacion(vaca, otra) for vaca in vacas[28:]]
+    response = client.post("/api/vtanimales/lote/", datos, format="json")
+
+    assert response.status_code == 201
+    assert len(response.data) == 30
+    codigos = [fila["codigo"] for fila in response.data]
+    assert len(set(codigos)) == 30 and all(codigo.startswith("VTA-") for codigo in codigos)
+    assert VTAnimales.objects.count() == 30
+
+    # Se descuenta una unidad del inventario por cada animal.
+    vacuna.refresh_from_db()
+    otra.refresh_from_db()
+    assert (vacuna.unidades, otra.unidades) == (2, 3)
+
+
+# Test para comprobar que si algún elemento no es válido, no se crea ninguno y se indica dónde está el error.
+@pytest.mark.django_db
+def test_crear_vtanimales_en_lote_con_errores():
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(3)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna Lote", unidades=2, estado="Activa")
+    VTAnimales.objects.create(tipo="Vacuna", ruta="Oral", fecha_inicio="2025-01-10", fecha_finalizacion="2025-01-10",
+                              responsable="Pepe", id_animal=vacas[0], inventario_vt=vacuna)
+
+    # La primera vaca ya se vacunó hace menos de un año y la tercera se repite dentro del lote.
+    datos = [datos_vacunacion(vacas[0], vacuna), datos_vacunacion(vacas[1], vacuna),
+             datos_vacunacion(vacas[2], vacuna), datos_vacunacion(vacas[2], vacuna, "2025-04-10")]
+    response = client.post("/api/vtanimales/lote/", datos, format="json")
+
+    assert response.status_code == 400
+    assert [error["indice"] for error in response.data["errores"]] == [0, 3]
+    assert "inventario_vt" in response.data["errores"][0]["errores"]
+
+    # Sin unidades suficientes para todo el lote (3 vacunas y 2 unidades), no se crea ninguna.
+    datos = [datos_vacunacion(vaca, vacuna, "2026-03-10") for vaca in vacas]
+    response = client.post("/api/vtanimales/lote/", datos, format="json")
+
+    assert response.status_code == 400
+    assert len(response.data["errores"]) == 3
+    assert VTAnimales.objects.count() == 1
+    vacuna.refresh_from_db()
+    assert vacuna.unidades == 2
+
+
+# Test para comprobar que el número de consultas no depende del tamaño del lote (relaciones y campos únicos
+# se comprueban con una consulta para todo el lote).
+@pytest.mark.django_db
+def test_crear_vtanimales_en_lote_consultas_constantes(django_assert_max_num_queries):
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(45)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna Lote", unidades=100, estado="Activa")
+    # La primera vez se crea el contador de códigos.
+    client.post("/api/vtanimales/lote/", [datos_vacunacion(vacas[-1], vacuna)], format="json")
+
+    with django_assert_max_num_queries(20) as pocas:
+        response = client.post("/api/vtanimales/lote/", [datos_vacunacion(vaca, vacuna) for vaca in vacas[:4]],
+                               format="json")
+    assert response.status_code == 201
+    with django_assert_max_num_queries(20) as muchas:
+        response = client.post("/api/vtanimales/lote/", [datos_vacunacion(vaca, vacuna) for vaca in vacas[4:-1]],
+                               format="json")
+    assert response.status_code == 201
+    assert len(muchas) == len(pocas)
+
+
+# Test para comprobar que dos suministros validados a la vez no pueden usar la última unidad del inventario.
+@pytest.mark.django_db
+def test_vtanimales_no_usar_dos_veces_la_ultima_unidad():
+    vacas = crear_vacas_lote(2)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna Lote", unidades=1, estado="Activa")
+
+    # Ambas peticiones leen el inventario con 1 unidad antes de guardar.
+    serializers = [VTAnimalesSerializer(data=datos_vacunacion(vaca, vacuna)) for vaca in vacas]
+    assert all(serializer.is_valid() for serializer in serializers)
+
+    serializers[0].save()
+    with pytest.raises(ValidationError):
+        serializers[1].save()
+
+    vacuna.refresh_from_db()
+    assert vacuna.unidades == 0
+    assert VTAnimales.objects.count() == 1
+
+
+# Test para comprobar que el listado de vacunas/tratamientos suministrados tiene el mismo número de consultas
+# sin importar cuántos elementos haya, y que muestra los mismos datos que el serializer de creación.
+@pytest.mark.django_db
+def test_listado_vtanimales_numero_consultas_constante(django_assert_num_queries):
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(10)
+    vacunas = [InventarioVT.objects.create(tipo="Vacuna", nombre=f"Vacuna {i}", unidades=30, estado="Activa")
+               for i in range(10)]
+    for vaca, vacuna in zip(vacas, vacunas):
+        VTAnimales.objects.create(tipo="Vacuna", ruta="Oral", fecha_inicio="2025-01-10", fecha_finalizacion="2025-01-10",
+                                  responsable="Pepe", id_animal=vaca, inventario_vt=vacuna)
+
+    # Usuario autenticado (1 consulta) y el listado (1 consulta).
+    with django_assert_num_queries(2):
+        response = client.get("/api/vtanimales/")
+
+    assert response.status_code == 200
+    assert len(response.data) == 10
+    esperado = VTAnimalesSerializer(VTAnimales.objects.all(), many=True).data
+    assert sorted(response.data, key=lambda fila: fila["id"]) == sorted(esperado, key=lambda fila: fila["id"])
+
+
+# Test donde se comprueba la paginación por cursor: sin "page_size"/"cursor" se devuelve la lista completa y con ellos
+# se recorren todas las páginas (más recientes primero) sin repetir ni perder elementos.
+@pytest.mark.django_db
+def test_listado_vtanimales_paginacion_cursor():
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(7)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna paginada", unidades=30, estado="Activa")
+    for vaca in vacas:
+        VTAnimales.objects.create(tipo="Vacuna", ruta="Oral", fecha_inicio="2025-01-10", fecha_finalizacion="2025-01-10",
+                                  responsable="Pepe", id_animal=vaca, inventario_vt=vacuna)
+
+    response = client.get("/api/vtanimales/")
+    assert response.status_code == 200
+    assert isinstance(response.data, list)
+    assert len(response.data) == 7
+
+    ids = []
+    url = "/api/vtanimales/?page_size=3"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.data["results"]) <= 3
+        ids += [fila["id"] for fila in response.data["results"]]
+        url = response.data["next"]
+
+    assert ids == sorted(VTAnimales.objects.values_list("id", flat=True), reverse=True)
+
+
+# Test donde se comprueba la exportación en NDJSON: un objeto JSON por línea, igual que en el listado.
+@pytest.mark.django_db
+def test_exportar_vtanimales_ndjson():
+    client = obtener_usuario_autenticado()
+    vacas = crear_vacas_lote(3)
+    vacuna = InventarioVT.objects.create(tipo="Vacuna", nombre="Vacuna exportada", unidades=30, estado="Activa")
+    for vaca in vacas:
+        VTAnimales.objects.create(tipo="Vacuna", ruta="Oral", fecha_inicio="2025-01-10", fecha_finalizacion="2025-01-10",
+                                  responsable="Pepe", id_animal=vaca, inventario_vt=vacuna)
+
+    response = client.get("/api/vtanimales/?format=ndjson")
+
+    assert response.status_code == 200
+    assert response["Content-Disposition"] == 'attachment; filename="vtanimales.ndjson"'
+    filas = [json.loads(linea) for linea in b"".join(response.streaming_content).decode().splitlines()]
+    assert sorted(filas, key=lambda fila: fila["id"]) == sorted(client.get("/api/vtanimales/").data,
+                                                                 key=lambda fila: fila["id"])
+    assert filas[0]["nombre_vt"] == "Vacuna exportada"
@@ -0,0 +1,119 @@
+# --------------------------------- trabajosSimulacion.py: ---------------------------------
+# Funcionalidad: permite ejecutar las simulaciones de crías de rebaños grandes en segundo plano,
+# sin bloquear el worker de Django que ha recibido la petición.
+# - Cada simulación se guarda en la tabla TrabajoSimulacion (parámetros, estado, progreso y resultado).
+# - Se ejecuta en un conjunto de hilos del propio proceso (ThreadPoolExecutor), por lo que no hace falta
+#   ningún servicio externo (ej: Celery o Redis). Los cálculos del modelo (NumPy) liberan el GIL.
+# - Número de hilos: SIMULACION_CRIA_TRABAJADORES en settings.py (por defecto, 2).
+# - Si SIMULACION_CRIA_TRABAJOS_SINCRONOS = True (ej: test), el trabajo se ejecuta en la propia petición.
+# - El trabajo se envía a los hilos cuando se confirma la transacción en la que se ha creado (on_commit).
+# - Un hilo solo ejecuta el trabajo si consigue pasarlo de "Pendiente" a "En curso" (una única actualización),
+#   por lo que un trabajo no se ejecuta dos veces aunque se envíe más de una vez.
+# - Mientras se ejecuta, se actualiza fecha_actualizacion con cada progreso. Si se reinicia el proceso, los trabajos
+#   que se quedan "Pendiente" o "En curso" sin actualizarse durante SIMULACION_CRIA_TIEMPO_SIN_PROGRESO segundos
+#   (por defecto, 600) se vuelven a enviar: la primera vez que cada proceso usa los hilos y cuando se consulta
+#   el trabajo (GET /simular-cria/trabajos/{id}/).
+# ------------------------------------------------------------------------------------------
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TrabajoSimulacion
+from .simulacionCria import ejecutar_simulacion_matriz
+
+_ejecutor = None
+_bloqueo_ejecutor = threading.Lock()
+
+
+def obtener_ejecutor():
+    # El conjunto de hilos se crea una única vez por proceso (worker), la primera vez que se necesita.
+    # En ese momento se recuperan los trabajos que se han quedado sin terminar (ej: reinicio del proceso).
+    global _ejecutor
+    with _bloqueo_ejecutor:
+        if _ejecutor is not None:
+            return _ejecutor
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "SIMULACION_CRIA_TRABAJADORES", 2),
+            thread_name_prefix="simulacion_cria",
+        )
+    recuperar_trabajos_simulacion()
+    return _ejecutor
+
+
+def crear_trabajo_simulacion(usuario, parametros):
+    # Se guarda el trabajo como "Pendiente" y se envía al conjunto de hilos. Se devuelve el trabajo creado.
+    trabajo = TrabajoSimulacion.objects.create(usuario=usuario, parametros=parametros)
+    _enviar(trabajo.id)
+    if getattr(settings, "SIMULACION_CRIA_TRABAJOS_SINCRONOS", False):
+        trabajo.refresh_from_db()
+    return trabajo
+
+
+def _enviar(id_trabajo):
+    if getattr(settings, "SIMULACION_CRIA_TRABAJOS_SINCRONOS", False):
+        ejecutar_trabajo_simulacion(id_trabajo)
+        return
+    # Si se envía antes de confirmar la transacción, el hilo podría no encontrar el trabajo.
+    transaction.on_commit(lambda: obtener_ejecutor().submit(_ejecutar_en_segundo_plano, id_trabajo))
+
+
+def _trabajos_sin_progreso():
+    limite = timezone.now() - timedelta(seconds=getattr(settings, "SIMULACION_CRIA_TIEMPO_SIN_PROGRESO", 600))
+    return Q(estado='Pendiente', fecha_creacion__lt=limite) | Q(estado='En curso', fecha_actualizacion__lt=limite)
+
+
+def recuperar_trabajos_simulacion(ids=None):
+    # Se vuelven a enviar los trabajos sin progreso (de todos los usuarios o solo los indicados).
+    # Devuelve el número de trabajos enviados.
+    trabajos = TrabajoSimulacion.objects.filter(_trabajos_sin_progreso())
+    if ids is not None:
+        trabajos = trabajos.filter(id__in=ids)
+    pendientes = list(trabajos.values_list('id', flat=True))
+    if not pendientes:
+        return 0
+
+    # Solo se reinician si siguen sin progreso (el hilo que lo ejecutaba podría haberlo actualizado).
+    TrabajoSimulacion.objects.filter(_trabajos_sin_progreso(), id__in=pendientes, estado='En curso').update(
+        estado='Pendiente', progreso=0
+    )
+    for id_trabajo in pendientes:
+        _enviar(id_trabajo)
+    return len(pendientes)
+
+
+def _ejecutar_en_segundo_plano(id_trabajo):
+    # Cada hilo usa su propia conexión a la base de datos, que se cierra al terminar el trabajo.
+    try:
+        ejecutar_trabajo_simulacion(id_trabajo)
+    finally:
+        close_old_connections()
+
+
+def ejecutar_trabajo_simulacion(id_trabajo):
+    # Si otro hilo (o proceso) ya lo ha empezado o terminado, no se hace nada.
+    if not TrabajoSimulacion.objects.filter(id=id_trabajo, estado='Pendiente').update(
+        estado='En curso', fecha_actualizacion=timezone.now()
+    ):
+        return
+    trabajo = TrabajoSimulacion.objects.get(id=id_trabajo)
+
+    def progreso(calculadas, total):
+        # Se guarda el porcentaje de vacas calculadas (el 100% se guarda al terminar).
+        TrabajoSimulacion.objects.filter(id=id_trabajo).update(
+            progreso=min(99, calculadas * 100 // total), fecha_actualizacion=timezone.now()
+        )
+
+    try:
+        clave, resultado = ejecutar_simulacion_matriz(trabajo.parametros, progreso)
+    except Exception as e:
+        TrabajoSimulacion.objects.filter(id=id_trabajo).update(estado='Error', error=str(e), fecha_fin=timezone.now())
+        return
+
+    TrabajoSimulacion.objects.filter(id=id_trabajo).update(
+        estado='Completado', progreso=100, tipo_resultado=clave, resultado=resultado, fecha_fin=timezone.now()
+    )
@@ -8,7 +8,8 @@ from .views import (
     InventarioVTViewSet,
     VTAnimalesViewSet,
     ListaInseminacionesViewSet,
-    inventario_por_tipo, SimulacionCriaView, ReentrenarCriaView
+    inventario_por_tipo, SimulacionCriaView, SimulacionCriaMatrizView, ReentrenarCriaView,
+    SimulacionCriaTrabajoView, SimulacionCriaTrabajoDetalleView, ImportarDatosView
 )
 
 # Creamos un router y registramos nuestras vistas (viewsets)
@@ -25,5 +26,9 @@ urlpatterns = [
     path('', include(router.urls)),
     path('inventario_por_tipo/', inventario_por_tipo),
     path('simular-cria/', SimulacionCriaView.as_view(), name="simular-cria"),
+    path('simular-cria/matriz/', SimulacionCriaMatrizView.as_view(), name="simular-cria-matriz"),
+    path('simular-cria/trabajos/', SimulacionCriaTrabajoView.as_view(), name="simular-cria-trabajos"),
+    path('simular-cria/trabajos/<int:pk>/', SimulacionCriaTrabajoDetalleView.as_view(), name="simular-cria-trabajo"),
     path('reentrenar-cria/', ReentrenarCriaView.as_view(), name="reentrenar-cria"),
+    path('importar/<str:modelo>/', ImportarDatosView.as_view(), name="importar-datos"),
 ]
\ No newline at end of file
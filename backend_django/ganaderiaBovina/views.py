@@ -19,9 +19,12 @@
 #
 # También, se verifica los permisos que tiene el usuario.
 # -----------------------------------------------------------------------------------
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
+import io
 
-from django.db.models import ProtectedError
+from django.db import transaction
+from django.db.models import ProtectedError, Count, Prefetch
 from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
@@ -35,21 +38,31 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 
 from .filters import AnimalFilter, ToroFilter, CorralFilter, InventarioVTFilter, VTAnimalesFilter, \
     ListaInseminacionesFilter
-from .models import Animal, Toro, Corral, InventarioVT, VTAnimales, ListaInseminaciones
+from .models import Animal, Toro, Corral, InventarioVT, VTAnimales, ListaInseminaciones, TrabajoSimulacion
+from .exportacion import ExportarMixin
+from .consanguinidad import actualizar_consanguinidad
+from .genealogia import arbol_ascendentes, arbol_descendientes, MAX_GENERACIONES
+from .importacion import importar_csv, ErrorImportacion
+from .lotes import CrearEnLoteMixin
 from .permisos import EsAdministrador, PermisosPorModelo
 from .serializers import AnimalSerializer, ToroSerializer, CorralSerializer, InventarioVTSerializer, \
-    VTAnimalesSerializer, ListaInseminacionesSerializer, CustomTokenObtainPairSerializer
-from .simulacionCria import simular_cria_optima, agregar_y_reentrenar_cria
+    VTAnimalesSerializer, ListaInseminacionesSerializer, CustomTokenObtainPairSerializer, TrabajoSimulacionSerializer, \
+    VTAnimalesLecturaSerializer, ListaInseminacionesLecturaSerializer
+from .simulacionCria import simular_cria_optima, agregar_y_reentrenar_cria, ejecutar_simulacion_matriz, \
+    COLUMNAS_SALIDA
+from .trabajosSimulacion import crear_trabajo_simulacion, recuperar_trabajos_simulacion
 
 import traceback
 # --------------------------------------------------------------------------------------------------------------
 #                                       Vista de ANIMAL
 # --------------------------------------------------------------------------------------------------------------
 
-class AnimalViewSet(viewsets.ModelViewSet):
+class AnimalViewSet(CrearEnLoteMixin, ExportarMixin, viewsets.ModelViewSet):
     # Se usan los permisos del modelo.
     # Django se encarga de asignar el permiso según la petición que se realice.
     permission_classes = [PermisosPorModelo]
+    # Eliminar varios animales (POST) necesita el mismo permiso que eliminar un animal (no el de crear).
+    permisos_por_accion = {'eliminar_animales_lote': ['ganaderiaBovina.delete_animal']}
     queryset = Animal.objects.all()
     serializer_class = AnimalSerializer
 
@@ -72,6 +85,7 @@ class AnimalViewSet(viewsets.ModelViewSet):
                        'calidad_ubres','grasa','proteinas','corral','padre','madre', 'fecha_nacimiento',
                        'fecha_eliminacion']
     ordering = ['nombre'] # Ordenación por defecto.
+    ordering_cursor = 'nombre' # Campo único para la paginación por cursor (?page_size=...).
 
     # get_object: obtiene la instancia del modelo en la base de datos y lanza excepción si no lo encuentra.
     def get_object(self):
@@ -83,6 +97,15 @@ class AnimalViewSet(viewsets.ModelViewSet):
             raise NotFound({"ERROR": f"El Animal {pk} no ha sido encontrado. "
                                      f"Comprueba el identificador introducido."})
 
+    # Creación de varios animales a la vez (POST /animales/lote/): prefijo del código según el tipo (V-x o C-x).
+    prefijo_lote = staticmethod(lambda datos: 'V' if datos.get('tipo', 'Vaca') == 'Vaca' else 'C')
+
+    # Se calcula el coeficiente de consanguinidad de los animales del lote que tienen madre o padre.
+    def despues_de_crear_lote(self, objetos):
+        coeficientes = actualizar_consanguinidad(objeto.id for objeto in objetos if objeto.madre_id or objeto.padre_id)
+        for objeto in objetos:
+            objeto.coeficiente_consanguinidad = coeficientes.get(objeto.id, objeto.coeficiente_consanguinidad)
+
     # Eliminar usando el botón "ELIMINAR".
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -171,11 +194,98 @@ class AnimalViewSet(viewsets.ModelViewSet):
             return Response({"ERROR": "Error inesperado.", "MOTIVO DE ERROR": str(e)},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # Árbol genealógico de un animal (GET /animales/{id}/arbol/?generaciones=N): madres, abuelas... y sus toros.
+    # Descendientes (GET /animales/{id}/descendientes/?generaciones=N): hijos, nietos... y el toro de cada cría.
+    # Se obtiene con una única consulta recursiva (genealogia.py). Por defecto, 3 generaciones.
+    @action(detail=True, methods=['get'], url_path='arbol')
+    def arbol(self, request, pk=None):
+        return self._respuesta_genealogia(request, arbol_ascendentes)
+
+    @action(detail=True, methods=['get'], url_path='descendientes')
+    def descendientes(self, request, pk=None):
+        return self._respuesta_genealogia(request, arbol_descendientes)
+
+    def _respuesta_genealogia(self, request, obtener_arbol):
+        generaciones = request.query_params.get('generaciones', '3')
+        if not generaciones.isdigit() or not 1 <= int(generaciones) <= MAX_GENERACIONES:
+            return Response({"ERROR": f"El número de generaciones debe estar entre 1 y {MAX_GENERACIONES}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        animal = self.get_object()
+        return Response(obtener_arbol(animal.id, int(generaciones)), status=status.HTTP_200_OK)
+
+    # Ranking de consanguinidad (GET /animales/ranking-consanguinidad/?limite=N): animales con mayor coeficiente de
+    # consanguinidad (se pueden usar los filtros del listado, ej: ?tipo=Vaca&estado=Vacía). Por defecto, 50.
+    @action(detail=False, methods=['get'], url_path='ranking-consanguinidad')
+    def ranking_consanguinidad(self, request):
+        limite = request.query_params.get('limite', '50')
+        if not limite.isdigit() or not 1 <= int(limite) <= 500:
+            return Response({"ERROR": "El límite debe estar entre 1 y 500."}, status=status.HTTP_400_BAD_REQUEST)
+        animales = (self.filter_queryset(self.get_queryset()).filter(coeficiente_consanguinidad__gt=0)
+                    .order_by('-coeficiente_consanguinidad', 'nombre')[:int(limite)])
+        return Response([{"id": animal.id, "codigo": animal.codigo, "nombre": animal.nombre, "tipo": animal.tipo,
+                          "estado": animal.estado, "madre": animal.madre_id, "padre": animal.padre_id,
+                          "coeficiente_consanguinidad": animal.coeficiente_consanguinidad} for animal in animales])
+
+    # Eliminar varios animales a la vez por MUERTE o VENDIDA (POST /animales/eliminar-lote/), ej: venta de un camión.
+    # Datos: {"animales": [id1, id2, ...], "motivo": "VENDIDA", "fechaEliminacion": "AAAA-MM-DD", "comentario": "..."}
+    # Se necesita el permiso de eliminar animales (permisos_por_accion).
+    # Todos los animales se actualizan con una única consulta (estado, fecha de eliminación, comentario y sin corral).
+    # Se indican los animales que no se han podido eliminar y el motivo.
+    @action(detail=False, methods=['post'], url_path='eliminar-lote')
+    def eliminar_animales_lote(self, request):
+        ids = request.data.get('animales')
+        if not isinstance(ids, list) or not ids or not all(isinstance(id_animal, int) for id_animal in ids):
+            return Response({"ERROR": "Debe indicar una lista con los identificadores de los animales a eliminar."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        motivo = str(request.data.get('motivo', '')).upper()
+        if motivo not in ["MUERTE", "VENDIDA"]:
+            return Response({"ERROR": "El motivo seleccionado no es correcto. Usa 'MUERTE' o 'VENDIDA'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Si no se indica la fecha de eliminación, se toma la del día actual.
+        fecha_eliminacion = request.data.get('fechaEliminacion')
+        if fecha_eliminacion:
+            try:
+                fecha_eliminacion = datetime.strptime(fecha_eliminacion, "%Y-%m-%d").date()
+            except (TypeError, ValueError):
+                return Response({
+                    "ERROR": "Formato de fecha inválido. Usa AAAA-MM-DD (ejemplo: 2025-04-20)."
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            fecha_eliminacion = datetime.now().date()
+
+        with transaction.atomic():
+            animales = Animal.objects.select_for_update().filter(id__in=ids).values_list('id', 'estado', 'fecha_nacimiento')
+            errores = {id_animal: "El animal no existe." for id_animal in ids}
+            eliminados = []
+            for id_animal, estado, fecha_nacimiento in animales:
+                if estado in ["Muerte", "Vendida"]:
+                    errores[id_animal] = f"El animal ya tiene el estado {estado}."
+                elif fecha_nacimiento > fecha_eliminacion:
+                    errores[id_animal] = "La fecha de eliminación debe ser posterior o igual a la fecha de nacimiento."
+                else:
+                    del errores[id_animal]
+                    eliminados.append(id_animal)
+
+            cambios = {"estado": motivo.capitalize(), "fecha_eliminacion": fecha_eliminacion,
+                       "corral": None} # Se eliminan del corral.
+            # El comentario solo se modifica si se indica (si no, se mantiene el que tenía cada animal).
+            if 'comentario' in request.data:
+                cambios["comentario"] = request.data['comentario']
+            Animal.objects.filter(id__in=eliminados).update(**cambios)
+
+        return Response({
+            "mensaje": f"{len(eliminados)} animales han actualizado su Estado a {motivo}. Se han eliminado de su corral.",
+            "animales_eliminados": eliminados,
+            "animales_no_eliminados": [{"id": id_animal, "ERROR": error} for id_animal, error in errores.items()],
+        }, status=status.HTTP_200_OK)
+
 # --------------------------------------------------------------------------------------------------------------
 #                                       Vista de TORO
 # --------------------------------------------------------------------------------------------------------------
 
-class ToroViewSet(viewsets.ModelViewSet):
+class ToroViewSet(ExportarMixin, viewsets.ModelViewSet):
     # Se usan los permisos del modelo.
     # Django se encarga de asignar el permiso según la petición que se realice.
     permission_classes = [PermisosPorModelo]
@@ -199,6 +309,7 @@ class ToroViewSet(viewsets.ModelViewSet):
     ordering_fields = ['nombre', 'celulas_somaticas','transmision_leche', 'cantidad_semen',
                        'calidad_patas', 'calidad_ubres','grasa','proteinas']
     ordering = ['nombre'] # Ordenación por defecto.
+    ordering_cursor = 'nombre' # Campo único para la paginación por cursor (?page_size=...).
 
     # get_object: obtiene la instancia del modelo en la base de datos y lanza excepción si no lo encuentra.
     def get_object(self):
@@ -261,9 +372,33 @@ class CorralViewSet(viewsets.ModelViewSet):
     # Se usan los permisos del modelo.
     # Django se encarga de asignar el permiso según la petición que se realice.
     permission_classes = [PermisosPorModelo]
+    # Mover animales (POST) es modificar los animales, no crear un corral: se necesita el permiso de modificar animales.
+    permisos_por_accion = {'mover_animales': ['ganaderiaBovina.change_animal']}
     queryset = Corral.objects.all()
     serializer_class = CorralSerializer
 
+    # El número de animales de cada corral se calcula en la misma consulta (annotate) y los animales (solo su
+    # código y nombre) se obtienen con una única consulta para todos los corrales (prefetch).
+    # Así, el listado de corrales tiene siempre el mismo número de consultas, independientemente del número de corrales.
+    # Con "?incluir_animales=false" no se obtiene la lista de animales de cada corral (solo su número).
+    def incluir_animales(self):
+        return self.request.query_params.get('incluir_animales', '').lower() not in ['false', '0', 'no']
+
+    def get_queryset(self):
+        # Para mover animales solo se necesita el corral (sin contar ni obtener sus animales), bloqueado hasta que
+        # termine la transacción.
+        if self.action == 'mover_animales':
+            return super().get_queryset().select_for_update()
+        queryset = super().get_queryset().annotate(num_animales=Count('animales'))
+        if self.incluir_animales():
+            queryset = queryset.prefetch_related(
+                Prefetch('animales', queryset=Animal.objects.only('id', 'codigo', 'nombre', 'corral'))
+            )
+        return queryset
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'incluir_animales': self.incluir_animales()}
+
     # Para realizar filtrado de los datos mediante la URL
     # filter_backends y filterset_class son clases predefinidas (NO CAMBIAR EL NOMBRE) de Django REST.
     # filter_backend: indica que clase se encarga de aplicar los filtros y activa el filtrado. También, permite que la información se ordene de manera
@@ -278,6 +413,7 @@ class CorralViewSet(viewsets.ModelViewSet):
     # Descentente: corrales/?ordering= - ... (Se le indica un símbolo "-")
     ordering_fields = ['nombre']
     ordering = ['nombre'] # Ordenación por defecto.
+    ordering_cursor = 'nombre' # Campo único para la paginación por cursor (?page_size=...).
 
     # get_object: obtiene la instancia del modelo en la base de datos y lanza excepción si no lo encuentra.
     def get_object(self):
@@ -305,6 +441,36 @@ class CorralViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+    # Mover varios animales a este corral (POST /corrales/{id}/mover/ con {"animales": [id1, id2, ...]}).
+    # Se hace con una única actualización (UPDATE ... WHERE id IN (...)) en lugar de modificar cada animal.
+    # No se mueven los animales que no existen o que están muertos o vendidos.
+    # Se bloquean el corral y los animales (select_for_update) hasta terminar, por lo que dos movimientos a la vez
+    # (o una eliminación de los mismos animales) se hacen uno detrás de otro y la cantidad devuelta es la real.
+    @action(detail=True, methods=['post'], url_path='mover')
+    def mover_animales(self, request, pk=None):
+        ids = request.data.get('animales')
+        if not isinstance(ids, list) or not ids or not all(isinstance(id_animal, int) for id_animal in ids):
+            return Response({"ERROR": "Debe indicar una lista con los identificadores de los animales a mover."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            corral = self.get_object() # Con select_for_update (ver get_queryset).
+            movidos = list(
+                Animal.objects.select_for_update().filter(id__in=ids).exclude(estado__in=['Muerte', 'Vendida'])
+                .values_list('id', flat=True)
+            )
+            Animal.objects.filter(id__in=movidos).update(corral=corral)
+            cantidad_animales = Animal.objects.filter(corral=corral).count()
+        conjunto_movidos = set(movidos)
+
+        return Response({
+            "mensaje": f"Se han movido {len(movidos)} animales al corral {corral.codigo}.",
+            "corral": corral.id,
+            "cantidad_animales": cantidad_animales,
+            "animales_movidos": movidos,
+            "animales_no_movidos": [id_animal for id_animal in ids if id_animal not in conjunto_movidos],
+        }, status=status.HTTP_200_OK)
+
 # --------------------------------------------------------------------------------------------------------------
 #                                       Vista de INVENTARIOVT (Vacunas y tratamientos del inventario)
 # --------------------------------------------------------------------------------------------------------------
@@ -333,6 +499,7 @@ class InventarioVTViewSet(viewsets.ModelViewSet):
     # Descentente: inventariovt/?ordering= - ... (Se le indica un símbolo "-")
     ordering_fields = ['nombre', 'cantidad','cantidad', 'unidades']
     ordering = ['nombre'] # Ordenación por defecto.
+    ordering_cursor = 'nombre' # Campo único para la paginación por cursor (?page_size=...).
 
     # get_object: obtiene la instancia del modelo en la base de datos y lanza excepción si no lo encuentra.
     def get_object(self):
@@ -419,12 +586,22 @@ def inventario_por_tipo(request):
 #                                       Vista de VTANIMALES (Vacunas y tratamientos suministrados a los animales)
 # --------------------------------------------------------------------------------------------------------------
 
-class VTAnimalesViewSet(viewsets.ModelViewSet):
+class VTAnimalesViewSet(CrearEnLoteMixin, ExportarMixin, viewsets.ModelViewSet):
     # Se usan los permisos del modelo.
     # Django se encarga de asignar el permiso según la petición que se realice.
     permission_classes = [PermisosPorModelo]
     queryset = VTAnimales.objects.all()
     serializer_class = VTAnimalesSerializer
+
+    # Los listados (GET) usan un serializer de solo lectura y obtienen el inventario en la misma consulta
+    # (select_related), para que el número de consultas no dependa del número de elementos.
+    def get_queryset(self):
+        return super().get_queryset().select_related('inventario_vt')
+
+    def get_serializer_class(self):
+        if self.action in ['list', 'retrieve']:
+            return VTAnimalesLecturaSerializer
+        return super().get_serializer_class()
     # Para realizar filtrado de los datos mediante la URL
     # filter_backends y filterset_class son clases predefinidas (NO CAMBIAR EL NOMBRE) de Django REST.
     # filter_backend: indica que clase se encarga de aplicar los filtros y activa el filtrado. También, permite que la información se ordene de manera
@@ -453,6 +630,45 @@ class VTAnimalesViewSet(viewsets.ModelViewSet):
             raise NotFound({"ERROR": f"El tratamiento/la vacuna suministrada {pk} no se ha encontrado. "
                                      f"Comprueba el identificador introducido."})
 
+    # Creación de varios suministros a la vez (POST /vtanimales/lote/): se resta una unidad del inventario por cada uno.
+    stock_lote = ('inventario_vt', 'unidades',
+                  lambda inventario: f"No hay suficientes unidades disponibles de "
+                                     f"{inventario.tipo.lower()} '{inventario.nombre}'.")
+    prefijo_lote = 'VTA'
+
+    # Se comprueba con una única consulta que no se repitan vacuna/tratamiento suministrados al mismo animal
+    # en el mismo año (<365 días), ni con los ya guardados ni dentro del propio lote.
+    def validar_lote(self, filas):
+        filas_vt = [(i, fila) for i, fila in enumerate(filas)
+                    if fila.get('id_animal') and fila.get('inventario_vt') and fila.get('fecha_inicio')]
+        if not filas_vt:
+            return {}
+
+        fechas = [fila['fecha_inicio'] for _, fila in filas_vt]
+        suministradas = defaultdict(list)
+        for animal, inventario, fecha in VTAnimales.objects.filter(
+            id_animal__in={fila['id_animal'].pk for _, fila in filas_vt},
+            inventario_vt__in={fila['inventario_vt'].pk for _, fila in filas_vt},
+            fecha_inicio__gte=min(fechas) - timedelta(days=365),
+            fecha_inicio__lte=max(fechas),
+        ).values_list('id_animal', 'inventario_vt', 'fecha_inicio'):
+            suministradas[(animal, inventario)].append(fecha)
+        for _, fila in filas_vt:
+            suministradas[(fila['id_animal'].pk, fila['inventario_vt'].pk)].append(fila['fecha_inicio'])
+
+        errores = {}
+        for i, fila in filas_vt:
+            animal, inventario, fecha = fila['id_animal'], fila['inventario_vt'], fila['fecha_inicio']
+            # La propia fila aparece una vez en la lista de fechas.
+            mismo_anio = [f for f in suministradas[(animal.pk, inventario.pk)] if fecha - timedelta(days=365) <= f <= fecha]
+            if len(mismo_anio) > 1:
+                errores[i] = {
+                    "inventario_vt": [f"Est{'e tratamiento' if inventario.tipo.lower() == 'tratamiento' else 'a vacuna'} "
+                                      f"ya fue suministrad{'o' if inventario.tipo.lower() == 'tratamiento' else 'a'} "
+                                      f"a {animal.codigo} en los últimos 365 días."]
+                }
+        return errores
+
     # Eliminar usando el botón "ELIMINAR".
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -477,13 +693,19 @@ class VTAnimalesViewSet(viewsets.ModelViewSet):
 #                                       Vista de LISTAINSEMINACIONES (Inventario de inseminaciones)
 # --------------------------------------------------------------------------------------------------------------
 
-class ListaInseminacionesViewSet(viewsets.ModelViewSet):
+class ListaInseminacionesViewSet(CrearEnLoteMixin, ExportarMixin, viewsets.ModelViewSet):
     # Se usan los permisos del modelo.
     # Django se encarga de asignar el permiso según la petición que se realice.
     permission_classes = [PermisosPorModelo]
     queryset = ListaInseminaciones.objects.all()
     serializer_class = ListaInseminacionesSerializer
 
+    # Los listados (GET) usan un serializer de solo lectura.
+    def get_serializer_class(self):
+        if self.action in ['list', 'retrieve']:
+            return ListaInseminacionesLecturaSerializer
+        return super().get_serializer_class()
+
     # Para realizar filtrado de los datos mediante la URL
     # filter_backends y filterset_class son clases predefinidas (NO CAMBIAR EL NOMBRE) de Django REST.
     # filter_backend: indica que clase se encarga de aplicar los filtros y activa el filtrado.
@@ -503,6 +725,12 @@ class ListaInseminacionesViewSet(viewsets.ModelViewSet):
             raise NotFound({"ERROR": f"La Inseminación {pk} no se ha encontrado. "
                                      f"Comprueba el identificador introducido."})
 
+    # Creación de varias inseminaciones a la vez (POST /listainseminaciones/lote/): se resta una dosis de semen
+    # del toro por cada inseminación.
+    stock_lote = ('id_toro', 'cantidad_semen',
+                  lambda toro: f"El toro {toro.codigo} no tiene suficiente cantidad de semen para inseminar.")
+    prefijo_lote = 'I'
+
     # Eliminar usando el botón "ELIMINAR".
     def destroy(self, request, *args, **kwargs):
             instance = self.get_object()
@@ -543,6 +771,84 @@ class SimulacionCriaView(APIView):
 
         return Response({"cria_mas_optima":resultado})
 
+# Se validan los parámetros de la simulación de la matriz de crías (petición directa o trabajo en segundo plano).
+# Devuelve los parámetros validados y el mensaje de error (None si son correctos).
+def validar_parametros_matriz(datos):
+    parametros = {
+        "codigo_vacas": datos.get("codigo_vacas"),
+        "codigo_toros": datos.get("codigo_toros"),
+        "atributo_prioridad": datos.get("atributo_prioridad"),
+        "top_k": datos.get("top_k", 3),
+        "modo": datos.get("modo", "ranking"),
+    }
+
+    if not parametros["codigo_vacas"] or not parametros["atributo_prioridad"]:
+        return parametros, "Faltan datos obligatorios."
+
+    if parametros["atributo_prioridad"] not in COLUMNAS_SALIDA:
+        return parametros, f"El atributo a potenciar debe ser uno de: {', '.join(COLUMNAS_SALIDA)}."
+
+    try:
+        parametros["top_k"] = int(parametros["top_k"])
+    except (TypeError, ValueError):
+        parametros["top_k"] = 0
+    if parametros["top_k"] < 1:
+        return parametros, "El número de mejores crías (top_k) debe ser un entero mayor que 0."
+
+    if parametros["modo"] not in ["ranking", "asignacion"]:
+        return parametros, "El modo debe ser 'ranking' o 'asignacion'."
+
+    return parametros, None
+
+# Simulación de todas las vacas seleccionadas con todos los toros seleccionados (o con todos los toros vivos).
+# Modos:
+# - "ranking" (por defecto): devuelve las mejores crías ("top_k") para cada vaca y para cada toro en una sola petición.
+# - "asignacion": asigna un toro a cada vaca maximizando el atributo a potenciar, sin superar la cantidad de semen
+#   de cada toro.
+class SimulacionCriaMatrizView(APIView):
+    # Solamente se indica que el usuario debe estar autenticado para poder realizar la simulación.
+    permission_classes = [IsAuthenticated]
+    def post(self, request):
+        parametros, error = validar_parametros_matriz(request.data)
+        if error:
+            return Response({"simulacion_cria": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            clave, resultado = ejecutar_simulacion_matriz(parametros)
+        except ValueError as e:
+            return Response({"simulacion_cria": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({clave: resultado})
+
+# Simulación de la matriz de crías en segundo plano (para rebaños grandes), sin bloquear la petición:
+# - POST /simular-cria/trabajos/: recibe los mismos datos que SimulacionCriaMatrizView y devuelve el trabajo creado (202).
+# - GET /simular-cria/trabajos/{id}/: devuelve el estado, el progreso y, cuando ha terminado, el resultado.
+# El resultado se guarda en la base de datos, por lo que se puede volver a descargar las veces que sea necesario.
+class SimulacionCriaTrabajoView(APIView):
+    # Solamente se indica que el usuario debe estar autenticado para poder realizar la simulación.
+    permission_classes = [IsAuthenticated]
+    def post(self, request):
+        parametros, error = validar_parametros_matriz(request.data)
+        if error:
+            return Response({"simulacion_cria": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        trabajo = crear_trabajo_simulacion(request.user, parametros)
+        return Response({"trabajo": TrabajoSimulacionSerializer(trabajo).data}, status=status.HTTP_202_ACCEPTED)
+
+class SimulacionCriaTrabajoDetalleView(APIView):
+    # Cada usuario solamente puede consultar sus propios trabajos.
+    permission_classes = [IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            trabajo = TrabajoSimulacion.objects.get(pk=pk, usuario=request.user)
+        except TrabajoSimulacion.DoesNotExist:
+            raise NotFound({"simulacion_cria": "El trabajo de simulación no existe."})
+
+        # Si el trabajo se ha quedado sin progreso (ej: se ha reiniciado el proceso que lo ejecutaba), se vuelve a enviar.
+        if trabajo.estado in ('Pendiente', 'En curso') and recuperar_trabajos_simulacion(ids=[trabajo.id]):
+            trabajo.refresh_from_db()
+        return Response({"trabajo": TrabajoSimulacionSerializer(trabajo).data})
+
 class ReentrenarCriaView(APIView):
     # Solo pueden acceder administradores.
     permission_classes = [EsAdministrador]
@@ -563,5 +869,30 @@ class ReentrenarCriaView(APIView):
             }, status=500)
 
 
+# --------------------------------------------------------------------------------------------------------------
+#                                       Vista de IMPORTACIÓN de datos (PostgreSQL)
+# --------------------------------------------------------------------------------------------------------------
+# POST /importar/<modelo>/ con un archivo .csv ("archivo") y, opcionalmente, el delimitador (",", ";" o tabulador).
+# modelo: animales, toros, vtanimales o listainseminaciones (ver importacion.py).
+class ImportarDatosView(APIView):
+    # Solo pueden acceder administradores.
+    permission_classes = [EsAdministrador]
+
+    def post(self, request, modelo):
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"ERROR": "Debe enviar el archivo .csv en el campo 'archivo'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fichero = io.TextIOWrapper(archivo.file, encoding="utf-8", newline="")
+            resultado = importar_csv(modelo, fichero, request.data.get("delimitador", ","))
+        except ErrorImportacion as e:
+            return Response({"ERROR": str(e), "errores": e.errores}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({"ERROR": "El archivo debe estar codificado en UTF-8."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
@@ -59,6 +59,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Paginación por cursor (solo si se indica ?cursor=... o ?page_size=... en la URL)
+    'DEFAULT_PAGINATION_CLASS': 'ganaderiaBovina.paginacion.PaginacionCursor',
 }
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # Añadido para permitir la conexión entre diferentes puertos (backend y frontend)